@@ -0,0 +1,161 @@
+# This file contains the archive reader. Tournament directors often send a zip
+# (or tarball) of QBJs and packets; rather than extracting it, QBJtool indexes
+# each archive's members once and reads them straight out of the archive.
+#
+# A member is named by the archive's path and the member's path joined with a
+# "!", e.g. "results.zip!Round 1/Room 3.qbj", so it can go anywhere a file
+# path can in the rest of the loader.
+
+import tarfile
+import zipfile
+from os import path
+from typing import IO, Dict, List, Optional, Tuple, Union
+
+ARCHIVE_EXTENSIONS = (".zip", ".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz")
+
+SEPARATOR = "!"
+"""What goes between an archive's path and a member's path."""
+
+Member = Union[zipfile.ZipInfo, tarfile.TarInfo]
+
+def isArchive(filePath: str) -> bool:
+    """Checks whether a path is (named like) a zip or tar archive."""
+    return filePath.lower().endswith(ARCHIVE_EXTENSIONS)
+
+class ArchiveIndex:
+    """The QBJs and packets in some zip/tar archives.
+
+    Each archive's list of members is read once, when it's added. The index can
+    be pickled (e.g. to send to worker processes), in which case the archives
+    are reopened on first use, but their members aren't listed again.
+    """
+
+    archivePaths: List[str]
+
+    members: Dict[str, Tuple[int, Member]]
+    """(which archive, archive entry) for each member, by member name ("archive!path"), in archive order."""
+
+    _byFileName: Dict[str, List[str]]
+    """The member names with each file name (e.g. "Round 1.json"), in archive order."""
+
+    _handles: Dict[int, Union[zipfile.ZipFile, tarfile.TarFile]]
+    """The archives that are open in this process."""
+
+    def __init__(self) -> None:
+        self.archivePaths = []
+        self.members = {}
+        self._byFileName = {}
+        self._handles = {}
+
+    def add(self, archivePath: str) -> List[str]:
+        """Indexes an archive's members.
+
+        Args:
+            archivePath (str): path of the .zip or .tar(.gz/.bz2/.xz) file
+
+        Raises:
+            ValueError: if the file isn't a zip or tar archive
+
+        Returns:
+            List[str]: the member names of the QBJs in the archive, in archive order
+        """
+        archive = len(self.archivePaths)
+        self.archivePaths.append(archivePath)
+        entries: List[Tuple[str, Member]]
+        if zipfile.is_zipfile(archivePath):
+            zipHandle = self._handles[archive] = zipfile.ZipFile(archivePath)
+            entries = [(info.filename, info) for info in zipHandle.infolist() if not info.is_dir()]
+        elif tarfile.is_tarfile(archivePath):
+            tarHandle = self._handles[archive] = tarfile.open(archivePath)
+            entries = [(info.name, info) for info in tarHandle.getmembers() if info.isfile()]
+        else:
+            raise ValueError(f"{archivePath} isn't a zip or tar archive")
+
+        qbjs = []
+        for memberPath, entry in entries:
+            name = f"{archivePath}{SEPARATOR}{memberPath}"
+            self.members[name] = (archive, entry)
+            self._byFileName.setdefault(path.basename(memberPath), []).append(name)
+            if memberPath.endswith(".qbj"):
+                qbjs.append(name)
+        return qbjs
+
+    def __contains__(self, name: object) -> bool:
+        return name in self.members
+
+    def open(self, name: str) -> IO[bytes]:
+        """Opens a member for reading, without extracting it.
+
+        Raises:
+            FileNotFoundError: if there's no such member
+        """
+        if name not in self.members:
+            raise FileNotFoundError(name)
+        archive, entry = self.members[name]
+        handle = self._handles.get(archive)
+        if handle is None:
+            archivePath = self.archivePaths[archive]
+            handle = self._handles[archive] = (
+                zipfile.ZipFile(archivePath) if isinstance(entry, zipfile.ZipInfo) else tarfile.open(archivePath)
+            )
+        if isinstance(handle, zipfile.ZipFile):
+            assert isinstance(entry, zipfile.ZipInfo)
+            return handle.open(entry)
+        assert isinstance(entry, tarfile.TarInfo)
+        f = handle.extractfile(entry)
+        assert f is not None # only regular files are indexed
+        return f
+
+    def archiveOf(self, name: str) -> str:
+        """Gets the path of the archive a member is in."""
+        return self.archivePaths[self.members[name][0]]
+
+    def findPacket(self, packetName: str, qbjName: str) -> Optional[str]:
+        """Finds the packet .json a QBJ was played on.
+
+        The packet next to the QBJ is preferred, then one with the right file name
+        anywhere in the QBJ's archive, then one in any other archive.
+
+        Args:
+            packetName (str): the QBJ's "packets" field
+            qbjName (str): the member name of the QBJ (or a path on disk)
+
+        Returns:
+            Optional[str]: the member name of the packet, or None if no archive has it
+        """
+        fileName = f"{packetName}.json"
+        if qbjName in self.members:
+            archivePath = self.archiveOf(qbjName)
+            qbjDir = path.dirname(qbjName[len(archivePath) + len(SEPARATOR):])
+            sibling = f"{archivePath}{SEPARATOR}{path.join(qbjDir, fileName)}"
+            if sibling in self.members:
+                return sibling
+        candidates = self._byFileName.get(path.basename(fileName), [])
+        if len(candidates) == 0:
+            return None
+        if qbjName in self.members:
+            archive = self.members[qbjName][0]
+            for candidate in candidates:
+                if self.members[candidate][0] == archive:
+                    return candidate
+        return candidates[0]
+
+    def detach(self) -> None:
+        """Forgets the open archives without closing them.
+
+        A forked worker process has to do this before reading anything, since it
+        shares the positions of its parent's open files.
+        """
+        self._handles = {}
+
+    def close(self) -> None:
+        """Closes every open archive."""
+        for handle in self._handles.values():
+            handle.close()
+        self._handles = {}
+
+    def __getstate__(self) -> Dict[str, object]:
+        # open archives can't be pickled; they're reopened when they're next needed
+        state = self.__dict__.copy()
+        state["_handles"] = {}
+        return state
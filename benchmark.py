@@ -0,0 +1,182 @@
+# This file times (and measures the memory use of) each phase of QBJtool on
+# made-up tournaments of a few different sizes, so that speedups and
+# regressions can be tracked over time.
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+from datetime import datetime
+from io import StringIO
+from os import path
+from typing import Any, Callable, Dict, List, Optional
+from parsing import QBJ, PacketJSON
+from statstore import STAT_BACKENDS
+from synthetic import SyntheticConfig, writeTournament
+from tournament import Tournament
+
+SCALES: Dict[str, SyntheticConfig] = {
+    "small": SyntheticConfig(rooms=4, rounds=4),
+    "medium": SyntheticConfig(rooms=16, rounds=8),
+    "large": SyntheticConfig(rooms=48, rounds=12, buzzesPerTossup=3),
+    "season": SyntheticConfig(rooms=200, rounds=12, buzzesPerTossup=3, benchPerTeam=2, substitutions=2),
+}
+
+PHASES = ["parse", "addQBJAndPacket", "generateCombinedStats", "statsToHTML", "buzzpointsToHTML"]
+
+PhaseResult = Dict[str, float]
+"""{"wall": seconds, "cpu": seconds, "peakMemory": bytes}"""
+
+def runPhases(qbjPaths: List[str], statsBackend: str, measureMemory: bool) -> Dict[str, PhaseResult]:
+    """Runs QBJtool's pipeline once, timing each phase.
+
+    Args:
+        qbjPaths (List[str]): the QBJs to load (their packets should be in the working directory)
+        statsBackend (str): which stats backend to use
+        measureMemory (bool): whether to trace memory allocations (which slows everything down)
+
+    Returns:
+        Dict[str, PhaseResult]: how each phase went, by phase name
+    """
+    results: Dict[str, PhaseResult] = {}
+    state: Dict[str, Any] = {}
+
+    def parse() -> None:
+        qbjs: List[QBJ] = []
+        packets: Dict[str, PacketJSON] = {}
+        for qbjPath in qbjPaths:
+            with open(qbjPath) as f:
+                qbj: QBJ = json.load(f)
+            if qbj["packets"] not in packets:
+                with open(f"{qbj['packets']}.json") as f:
+                    packets[qbj["packets"]] = json.load(f)
+            qbjs.append(qbj)
+        state["qbjs"], state["packets"] = qbjs, packets
+
+    def ingest() -> None:
+        t = Tournament(statsBackend)
+        for qbj in state["qbjs"]:
+            t.addQBJAndPacket(qbj, state["packets"][qbj["packets"]])
+        state["tournament"] = t
+
+    phases: Dict[str, Callable[[], None]] = {
+        "parse": parse,
+        "addQBJAndPacket": ingest,
+        "generateCombinedStats": lambda: state["tournament"].generateCombinedStats(),
+        "statsToHTML": lambda: state["tournament"].statsToHTML("Benchmark"),
+        "buzzpointsToHTML": lambda: state["tournament"].buzzpointsToHTML("Benchmark", 100),
+    }
+    for phase in PHASES:
+        if measureMemory:
+            tracemalloc.start()
+        wallStart, cpuStart = time.perf_counter(), time.process_time()
+        # problems with the data go in Tournament.diagnostics rather than being printed, but if anything
+        # does print, we don't want to time the terminal
+        with redirect_stdout(StringIO()):
+            phases[phase]()
+        results[phase] = {"wall": time.perf_counter() - wallStart, "cpu": time.process_time() - cpuStart}
+        if measureMemory:
+            results[phase]["peakMemory"] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+    return results
+
+def benchmarkScale(config: SyntheticConfig, statsBackend: str, repeat: int, measureMemory: bool) -> Dict[str, Any]:
+    """Benchmarks QBJtool on a made-up tournament.
+
+    Times are the best of `repeat` runs; memory is measured in a separate run, so
+    that tracing allocations doesn't slow down the timed runs.
+    """
+    with tempfile.TemporaryDirectory() as tmpDir:
+        qbjPaths = writeTournament(config, tmpDir)
+        oldDir = os.getcwd()
+        os.chdir(tmpDir)
+        try:
+            runs = [runPhases(qbjPaths, statsBackend, False) for _ in range(repeat)]
+            memory = runPhases(qbjPaths, statsBackend, True) if measureMemory else None
+        finally:
+            os.chdir(oldDir)
+
+    phases: Dict[str, PhaseResult] = {}
+    for phase in PHASES:
+        phases[phase] = {
+            "wall": min(run[phase]["wall"] for run in runs),
+            "cpu": min(run[phase]["cpu"] for run in runs),
+        }
+        if memory is not None:
+            phases[phase]["peakMemory"] = memory[phase]["peakMemory"]
+    return {
+        "config": {k: v for k, v in config._asdict().items() if k != "categoryMix"},
+        "qbjs": len(qbjPaths),
+        "phases": phases,
+    }
+
+def gitCommit() -> Optional[str]:
+    """Gets the commit QBJtool is at, if it's in a git repo."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=path.dirname(path.realpath(__file__)),
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def printResults(results: Dict[str, Any], baseline: Optional[Dict[str, Any]]) -> None:
+    """Prints a table of benchmark results, compared to a baseline if there is one."""
+    for scale, result in results["scales"].items():
+        print(f"== {scale} ({result['qbjs']} QBJs) ==")
+        for phase, numbers in result["phases"].items():
+            line = f"  {phase:<22} {numbers['wall']*1000:10.1f} ms wall {numbers['cpu']*1000:10.1f} ms CPU"
+            if "peakMemory" in numbers:
+                line += f" {numbers['peakMemory'] / (1 << 20):9.1f} MiB peak"
+            old = (baseline or {}).get("scales", {}).get(scale, {}).get("phases", {}).get(phase)
+            if old is not None and old["wall"] > 0:
+                line += f"  ({numbers['wall'] / old['wall']:.2f}x baseline)"
+            print(line)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmarks QBJtool on made-up tournaments.")
+    parser.add_argument(
+        "--scales", default="small,medium,large",
+        help=f"comma-separated sizes of tournament to benchmark (options: {', '.join(SCALES)}; default: small,medium,large)",
+    )
+    parser.add_argument("--stats-backend", choices=list(STAT_BACKENDS), default="dict")
+    parser.add_argument("--repeat", type=int, default=3, help="number of timed runs per scale (default: 3)")
+    parser.add_argument("--no-memory", action="store_true", help="don't measure memory use")
+    parser.add_argument("--output", metavar="RESULTS", help="where to save the results as JSON (default: they're only printed)")
+    parser.add_argument("--compare", metavar="RESULTS", help="results of an earlier benchmark run to compare against")
+    args = parser.parse_args()
+
+    scales = args.scales.split(",")
+    for scale in scales:
+        if scale not in SCALES:
+            parser.error(f"unknown scale '{scale}'")
+
+    results: Dict[str, Any] = {
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "commit": gitCommit(),
+        "python": platform.python_version(),
+        "statsBackend": args.stats_backend,
+        "scales": {},
+    }
+    for scale in scales:
+        print(f"Benchmarking {scale}...", file=sys.stderr)
+        results["scales"][scale] = benchmarkScale(SCALES[scale], args.stats_backend, args.repeat, not args.no_memory)
+
+    baseline = None
+    if args.compare is not None:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    printResults(results, baseline)
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Saved results to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+# This file contains bonus statistics. They're counted in the same pass over
+# each QBJ as the tossup stats: every bonus adds to a small fixed-size array of
+# counters for the team that heard it and for each category it counts towards,
+# so keeping them costs a few integer additions per bonus.
+
+from array import array
+from typing import Dict, Iterable, Optional, Sequence
+from ids import CategoryID, TeamID
+
+DIFFICULTIES = ("e", "m", "h")
+"""The difficulty modifiers packets give bonus parts (easy, medium, hard)."""
+
+OTHER_DIFFICULTY = len(DIFFICULTIES)
+"""The difficulty index of parts with a missing or unknown difficulty modifier."""
+
+# where each count is in a BonusCounts' array; parts heard/converted come in
+# pairs, one per difficulty (and one for OTHER_DIFFICULTY)
+HEARD = 0
+POINTS = 1
+PARTS = 2
+NUM_COUNTS = PARTS + 2 * (len(DIFFICULTIES) + 1)
+
+def difficultyIndex(modifier: str) -> int:
+    """Gets the index in DIFFICULTIES of a difficulty modifier (or OTHER_DIFFICULTY)."""
+    modifier = modifier.strip().lower()
+    return DIFFICULTIES.index(modifier) if modifier in DIFFICULTIES else OTHER_DIFFICULTY
+
+class BonusCounts:
+    """The bonuses heard by a team, or in a category."""
+
+    __slots__ = ("counts",)
+
+    counts: "array[int]"
+    """Bonuses heard, points, and then parts heard and parts converted for each difficulty."""
+
+    def __init__(self) -> None:
+        self.counts = array('q', bytes(8 * NUM_COUNTS))
+
+    def add(self, delta: Sequence[int]) -> None:
+        """Adds a bonus's counts (laid out like self.counts)."""
+        counts = self.counts
+        for i, n in enumerate(delta):
+            counts[i] += n
+
+    @property
+    def heard(self) -> int:
+        return self.counts[HEARD]
+
+    @property
+    def points(self) -> int:
+        return self.counts[POINTS]
+
+    def ppb(self) -> Optional[float]:
+        """Gets the points per bonus heard, or None if no bonuses were heard."""
+        return self.counts[POINTS] / self.counts[HEARD] if self.counts[HEARD] > 0 else None
+
+    def conversion(self, difficulty: int) -> Optional[float]:
+        """Gets the fraction of parts of a difficulty that were converted.
+
+        Args:
+            difficulty (int): the index of the difficulty in DIFFICULTIES (or OTHER_DIFFICULTY)
+
+        Returns:
+            Optional[float]: the fraction, or None if no parts of that difficulty were heard
+        """
+        heard = self.counts[PARTS + 2 * difficulty]
+        return self.counts[PARTS + 2 * difficulty + 1] / heard if heard > 0 else None
+
+class BonusStats:
+    """Bonus conversion for each team, and in each category."""
+
+    byTeam: Dict[TeamID, BonusCounts]
+    """Each team's bonuses, over every category."""
+
+    byCategory: Dict[CategoryID, BonusCounts]
+    """Every team's bonuses in each category (and OVERALL)."""
+
+    def __init__(self) -> None:
+        self.byTeam = {}
+        self.byCategory = {}
+
+    def addBonus(self, team: TeamID, categories: Iterable[CategoryID], difficulties: Sequence[int], partPoints: Sequence[int]) -> None:
+        """Records a bonus.
+
+        Args:
+            team (TeamID): the team that heard the bonus
+            categories (Iterable[CategoryID]): the categories the bonus counts towards
+            difficulties (Sequence[int]): the difficulty index of each part (see difficultyIndex)
+            partPoints (Sequence[int]): the points the team got on each part
+        """
+        delta = [0] * NUM_COUNTS
+        delta[HEARD] = 1
+        delta[POINTS] = sum(partPoints)
+        for difficulty, points in zip(difficulties, partPoints):
+            delta[PARTS + 2 * difficulty] += 1
+            if points > 0:
+                delta[PARTS + 2 * difficulty + 1] += 1
+        self._counts(self.byTeam, team).add(delta)
+        for category in categories:
+            self._counts(self.byCategory, category).add(delta)
+
+    @staticmethod
+    def _counts(counts: Dict[int, BonusCounts], id: int) -> BonusCounts:
+        ours = counts.get(id)
+        if ours is None:
+            ours = counts[id] = BonusCounts()
+        return ours
+
+    def merge(self, other: "BonusStats", teamIds: Sequence[TeamID], categoryIds: Sequence[CategoryID]) -> None:
+        """Adds another (partial) tournament's bonus stats to these.
+
+        Args:
+            other (BonusStats): the stats to merge in
+            teamIds (Sequence[TeamID]): our ID for each of `other`'s team IDs
+            categoryIds (Sequence[CategoryID]): our ID for each of `other`'s category IDs
+        """
+        for mine, theirs, ids in ((self.byTeam, other.byTeam, teamIds), (self.byCategory, other.byCategory, categoryIds)):
+            for id, counts in theirs.items():
+                self._counts(mine, ids[id]).add(counts.counts)
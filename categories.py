@@ -0,0 +1,150 @@
+# This file contains the rules for turning the `metadata` of packet questions
+# into the category names we show stats for. Different sets format their
+# metadata differently, so there are lots of special cases!
+
+from typing import Dict, List, Optional, Tuple
+from ids import Category
+
+# categories that are combos of other categories
+BIG_CATEGORIES = [
+    ("Science and Math", [
+        "Biology", "Chemistry", "Physics", "Other Science", "Astronomy", "Math",
+        "Earth Science", "Computer Science"
+    ]),
+    ("Literature", [
+        "American Literature", "British Literature", "European Literature",
+        "World Literature", "Other Literature", "World/Other Literature",
+        "Ancient/Other Literature", "British/Commonwealth Literature",
+        "American - Drama Literature", "American - Long Fiction Literature",
+        "American - Poetry Literature", "American - Short Story Literature",
+        "American - Short Story/Long Fiction Literature", "British - Drama Literature",
+        "British - Long Fiction Literature", "British - Poetry Literature",
+        "British - Short Story Literature", "Classical Literature",
+        "European - Drama Literature", "European - Long Fiction Literature",
+        "European - Poetry Literature", "European - Short Story Liiterature",
+        "Mixed Literature", "World - Drama Literature", "World - Long Fiction Literature",
+        "World - Poetry Literature", "World - Short Story Literature",
+        "World- Long Fiction Literature", "Anglophone Literature"
+    ]),
+    ("History", [
+        "American History", "World History", "European History", "Other History",
+        "Ancient History", "Ancient/Other History", "History - American", "History - Ancient",
+        "History - European", "History - Other", "History - World", "Cross History",
+        "Cross/Historiography History", "European History History",
+        "Post-1900 History", "Pre-1000 History", "1000-1600 History", "1600-1900 History"
+    ]),
+    ("Fine Arts", [
+        "Painting/Sculpture", "Painting and Sculpture", "Other Fine Arts", "Classical Music", "Visual Fine Arts",
+        "Auditory Fine Arts", "Auditory", "Architecture", "Jazz", "Opera", "Visual"
+
+    ]),
+    ("RMPSS", ["Religion", "Mythology", "Social Science", "Philosophy", "Social Economics", "Social Linguistics", "Social Other", "Social Psychology", "Social Sociology", "Belief"]),
+]
+
+# "Main, Sub" metadata: these get stripped from the subcategory
+SUBCATEGORY_PREFIXES = ["Belief/Thought - ", "Fine Arts - ", "Science - ", "Other - "]
+# "History - American" => "American History"
+MOVED_PREAMBLES = [(preamble, " " + preamble.split(' ')[0]) for preamble in ["History - ", "Literature - ", "Literature – "]]
+# slight hack because MS is annoying
+DOUBLED_WORDS = [("History History", "History"), ("Literature Literature", "Literature")]
+RENAMES = {
+    "World Literature": "World/Other Literature",
+    "Ancient History": "Ancient/Other History",
+    "Geography/Current Events/Other": "Geography/Current Events/Other Academic",
+    "Current Events": "Geography/Current Events/Other Academic",
+}
+# "Religion - Bible" => "Religion"
+COLLAPSED_PREFIXES = [(cat, cat + ' -') for cat in ['Religion', 'Mythology']]
+
+def normalizeCategory(metadata: str) -> Category:
+    """Applies the category rules to a packet question's metadata.
+
+    This doesn't cache anything; use a CategoryNormalizer for that.
+
+    Args:
+        metadata (str): the raw `metadata` string from the packet .json
+
+    Returns:
+        Category: the category the question counts towards
+    """
+    category = metadata.strip()
+    if "&gt;" in category:
+        category = category.split('&gt;')[0]
+    if ", " in category:
+        category = category.split(', ')[1]
+        for prefix in SUBCATEGORY_PREFIXES:
+            category = category.replace(prefix, '')
+    for preamble, suffix in MOVED_PREAMBLES:
+        if category.startswith(preamble):
+            category = category.replace(preamble, '') + suffix
+    if category.endswith('Literature'):
+        category = category.split('- ')[0].strip() + " Literature"
+    for doubled, single in DOUBLED_WORDS:
+        category = category.replace(doubled, single)
+    category = RENAMES.get(category, category)
+
+    for collapsed, prefix in COLLAPSED_PREFIXES:
+        if category.startswith(prefix):
+            category = collapsed
+    return category
+
+class CategoryNormalizer:
+    """Maps raw metadata strings to categories, remembering each answer.
+
+    There are only a handful of distinct metadata strings in a tournament, so
+    after the first time one is seen, normalizing it is just a dict lookup.
+    """
+
+    bigCategoryOf: Dict[Category, Category]
+    """Maps each constituent of a BIG_CATEGORIES entry to the combined category."""
+
+    _cache: Dict[str, Category]
+
+    def __init__(self, bigCategories: List[Tuple[Category, List[Category]]] = BIG_CATEGORIES) -> None:
+        """Makes a normalizer.
+
+        Args:
+            bigCategories (List[Tuple[Category, List[Category]]]): the combined categories and their constituents
+        """
+        self.bigCategoryOf = {}
+        for bigCat, constituents in bigCategories:
+            for constituent in constituents:
+                self.bigCategoryOf[constituent] = bigCat
+        self._cache = {}
+
+    def normalize(self, metadata: str) -> Category:
+        """Gets the category for a packet question's metadata.
+
+        Args:
+            metadata (str): the raw `metadata` string from the packet .json
+
+        Returns:
+            Category: the category the question counts towards
+        """
+        category = self._cache.get(metadata)
+        if category is None:
+            category = normalizeCategory(metadata)
+            self._cache[metadata] = category
+        return category
+
+    def bigCategory(self, category: Category) -> Optional[Category]:
+        """Gets the combined category that a category counts towards, if any."""
+        return self.bigCategoryOf.get(category)
+
+    def mappings(self) -> Dict[Category, List[str]]:
+        """Reports which raw metadata strings have been mapped to each category.
+
+        Returns:
+            Dict[Category, List[str]]: sorted raw metadata strings for each category, keyed by category
+        """
+        byCategory: Dict[Category, List[str]] = {}
+        for metadata, category in self._cache.items():
+            byCategory.setdefault(category, []).append(metadata)
+        return {category: sorted(raws) for category, raws in sorted(byCategory.items())}
+
+    def merge(self, other: "CategoryNormalizer") -> None:
+        """Adds the metadata strings another normalizer has seen to this one's."""
+        self._cache.update(other._cache)
+
+    def __len__(self) -> int:
+        return len(self._cache)
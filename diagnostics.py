@@ -0,0 +1,133 @@
+# This file contains the diagnostics collector. Instead of printing a line for
+# every problem it finds in the data, a Tournament records each problem here;
+# identical problems are counted together (with a few examples of where they
+# came up), and a summary is shown once everything has been loaded.
+
+import json
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+MAX_SAMPLES = 5
+"""How many examples to keep of each problem."""
+
+# the kinds of problem, with how to describe each (`detail` depends on the kind)
+MISSING_TOSSUP = "missing-tossup"
+MISSING_BONUS = "missing-bonus"
+UNKNOWN_BUZZER = "unknown-buzzer"
+MULTIPLE_CORRECT_BUZZES = "multiple-correct-buzzes"
+UNKNOWN_POINT_VALUE = "unknown-point-value"
+MISSING_PACKET = "missing-packet"
+FUZZY_PACKET_MATCH = "fuzzy-packet-match"
+MESSAGES: Dict[str, str] = {
+    MISSING_TOSSUP: "tossups played that aren't in packet '{detail}'",
+    MISSING_BONUS: "bonuses played that aren't in packet '{detail}'",
+    UNKNOWN_BUZZER: "player '{detail}' buzzed but isn't in the player list (should never happen)",
+    MULTIPLE_CORRECT_BUZZES: "multiple correct buzzes on a tossup",
+    UNKNOWN_POINT_VALUE: "unknown point value {detail}",
+    MISSING_PACKET: "no packet found for '{detail}'; QBJs played on it were skipped",
+    FUZZY_PACKET_MATCH: "no packet named exactly {detail} (check that it's the right one)",
+}
+
+class Sample(NamedTuple):
+    """Where a problem came up."""
+    qbj: Optional[str]
+    """The QBJ file, if known"""
+    questionNumber: Optional[int]
+    answer: Optional[str]
+    """The answerline of the tossup, if it was found in the packet"""
+
+class DiagnosticRecord:
+    """Every occurrence of one problem."""
+
+    kind: str
+    detail: str
+    count: int
+    samples: List[Sample]
+    """The first few places the problem came up."""
+
+    def __init__(self, kind: str, detail: str) -> None:
+        self.kind = kind
+        self.detail = detail
+        self.count = 0
+        self.samples = []
+
+    def message(self) -> str:
+        """Describes the problem."""
+        return MESSAGES[self.kind].format(detail=self.detail)
+
+class Diagnostics:
+    """Collects problems with a tournament's data."""
+
+    records: Dict[Tuple[str, str], DiagnosticRecord]
+    """Each distinct problem, keyed by (kind, detail), in the order they were first seen."""
+
+    def __init__(self) -> None:
+        self.records = {}
+
+    def add(
+        self, kind: str, detail: object = "", qbj: Optional[str] = None,
+        questionNumber: Optional[int] = None, answer: Optional[str] = None
+    ) -> None:
+        """Records a problem.
+
+        Args:
+            kind (str): what kind of problem it is (one of the keys of MESSAGES)
+            detail (object): what distinguishes this problem from others of its kind, e.g. the point value
+            qbj (Optional[str]): the QBJ file the problem is in
+            questionNumber (Optional[int]): the question the problem is on
+            answer (Optional[str]): the answerline of that question
+        """
+        record = self._record(kind, str(detail))
+        record.count += 1
+        if len(record.samples) < MAX_SAMPLES:
+            record.samples.append(Sample(qbj, questionNumber, answer))
+
+    def _record(self, kind: str, detail: str) -> DiagnosticRecord:
+        record = self.records.get((kind, detail))
+        if record is None:
+            record = self.records[(kind, detail)] = DiagnosticRecord(kind, detail)
+        return record
+
+    def merge(self, other: "Diagnostics") -> None:
+        """Adds another (partial) tournament's problems to this one's."""
+        for key, theirs in other.records.items():
+            record = self._record(*key)
+            record.count += theirs.count
+            record.samples += theirs.samples[:MAX_SAMPLES - len(record.samples)]
+
+    def __len__(self) -> int:
+        """Gets the total number of problems recorded."""
+        return sum(record.count for record in self.records.values())
+
+    def summary(self) -> str:
+        """Describes every problem, with examples, for printing."""
+        lines = [f"Warning: found {len(self)} problems with the data:"]
+        for record in self.records.values():
+            lines.append(f"\t* {record.message()} ({record.count} times)")
+            for sample in record.samples:
+                where = [sample.qbj or "unknown QBJ"]
+                if sample.questionNumber is not None:
+                    where.append(f"question {sample.questionNumber}")
+                if sample.answer is not None:
+                    where.append(f"answerline '{sample.answer}'")
+                lines.append(f"\t\t- {', '.join(where)}")
+            if record.count > len(record.samples):
+                lines.append(f"\t\t- ...and {record.count - len(record.samples)} more")
+        return "\n".join(lines)
+
+    def report(self) -> List[Dict[str, Any]]:
+        """Gets every problem as a JSON-serializable list."""
+        return [
+            {
+                "kind": record.kind,
+                "detail": record.detail,
+                "message": record.message(),
+                "count": record.count,
+                "samples": [sample._asdict() for sample in record.samples],
+            }
+            for record in self.records.values()
+        ]
+
+    def writeJSON(self, reportPath: str) -> None:
+        """Saves the report() to a JSON file."""
+        with open(reportPath, "w") as f:
+            json.dump(self.report(), f, indent=2)
@@ -0,0 +1,128 @@
+# This file contains the fragment cache, which keeps pieces of rendered HTML
+# across runs. Each piece is keyed by a hash of everything that goes into it
+# (e.g. a tossup's text and the buzzes on it), so a cached piece can be used
+# as-is whenever its key comes up again. During a tournament, that means each
+# rerun only has to render the tossups that got new buzzes since the last one.
+
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from typing import Callable
+
+FRAGMENT_CACHE_VERSION = 1
+"""Bump this whenever a change to how fragments are rendered makes old cache files wrong."""
+
+def fragmentKey(*parts: object) -> str:
+    """Hashes everything a fragment is rendered from into a cache key.
+
+    Args:
+        *parts: what the fragment is made from; anything that can be saved as JSON
+    """
+    return hashlib.blake2b(json.dumps(parts, separators=(",", ":")).encode(), digest_size=16).hexdigest()
+
+class FragmentCache:
+    """A size-bounded LRU cache of rendered HTML fragments, which can be saved to disk.
+
+    The cache file is JSON, so unlike snapshots, it's safe to load one that you
+    didn't make.
+    """
+
+    maxSize: int
+    """The maximum number of fragments to keep."""
+
+    hits: int
+    """The number of fragments that were served from the cache."""
+
+    misses: int
+    """The number of fragments that had to be rendered."""
+
+    evictions: int
+    """The number of fragments that were dropped to stay under maxSize."""
+
+    _fragments: "OrderedDict[str, str]"
+
+    def __init__(self, maxSize: int = 20000) -> None:
+        """Makes an empty cache.
+
+        Args:
+            maxSize (int): the maximum number of fragments to keep
+        """
+        if maxSize < 1:
+            raise ValueError(f"fragment cache size must be at least 1 (got {maxSize})")
+        self.maxSize = maxSize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._fragments = OrderedDict()
+
+    def get(self, key: str, render: Callable[[], str]) -> str:
+        """Gets a fragment, rendering (and caching) it if it isn't in the cache.
+
+        Args:
+            key (str): the fragment's key (see fragmentKey)
+            render (Callable[[], str]): renders the fragment
+
+        Returns:
+            str: the fragment's HTML
+        """
+        html = self._fragments.get(key)
+        if html is not None:
+            self._fragments.move_to_end(key)
+            self.hits += 1
+            return html
+
+        self.misses += 1
+        html = self._fragments[key] = render()
+        while len(self._fragments) > self.maxSize:
+            self._fragments.popitem(last=False)
+            self.evictions += 1
+        return html
+
+    def save(self, cachePath: str) -> None:
+        """Saves the cache to disk (replacing any existing file only once it's completely written)."""
+        tmpPath = cachePath + ".tmp"
+        with open(tmpPath, "w") as f:
+            json.dump({"version": FRAGMENT_CACHE_VERSION, "fragments": list(self._fragments.items())}, f)
+        os.replace(tmpPath, cachePath)
+
+    @staticmethod
+    def load(cachePath: str, maxSize: int = 20000) -> "FragmentCache":
+        """Loads a cache that was saved with save().
+
+        If there's no cache file, or it was made by a different version of QBJtool
+        (or is broken), an empty cache is made instead.
+
+        Args:
+            cachePath (str): where the cache was saved
+            maxSize (int): the maximum number of fragments to keep; if the file has more, the least recently used ones are dropped
+        """
+        cache = FragmentCache(maxSize)
+        try:
+            with open(cachePath) as f:
+                saved = json.load(f)
+        except FileNotFoundError:
+            return cache
+        except ValueError as e:
+            print(f"Ignoring the fragment cache at {cachePath}, since it couldn't be read ({e})")
+            return cache
+        if not isinstance(saved, dict) or saved.get("version") != FRAGMENT_CACHE_VERSION:
+            print(f"Ignoring the fragment cache at {cachePath}, since it was made by a different version of QBJtool")
+            return cache
+        try:
+            fragments = [(key, html) for key, html in saved["fragments"]]
+            if not all(isinstance(key, str) and isinstance(html, str) for key, html in fragments):
+                raise ValueError("fragments have to be strings")
+        except (KeyError, TypeError, ValueError) as e:
+            print(f"Ignoring the fragment cache at {cachePath}, since it's broken ({e!r})")
+            return cache
+        # least recently used first, so only the most recent maxSize are kept
+        for key, html in fragments[max(len(fragments) - maxSize, 0):]:
+            cache._fragments[key] = html
+        return cache
+
+    def __len__(self) -> int:
+        return len(self._fragments)
+
+    def __str__(self) -> str:
+        return f"{self.hits} hits, {self.misses} misses, {self.evictions} evictions (holding at most {self.maxSize} fragments)"
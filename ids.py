@@ -1,4 +1,60 @@
-# these IDs are strings for now... maybe we could add numbers in future?
+# This file contains the ways players, teams, and categories are identified.
+# Names are interned to small integer IDs the first time they're seen, and
+# everything inside a Tournament is keyed by those IDs; names are only looked
+# up again when pages are rendered.
+
+from typing import Dict, Iterator, List, Optional
+
 Player = str
 Team = str
-Category = str
\ No newline at end of file
+Category = str
+
+PlayerID = int
+TeamID = int
+CategoryID = int
+
+RosterID = int
+"""Identifies a player playing for a particular team (see statstore.StatStore.rosterId)."""
+
+class SymbolTable:
+    """Hands out an ID to each distinct name, in the order the names are first seen."""
+
+    names: List[str]
+    """Each name, indexed by its ID."""
+
+    _ids: Dict[str, int]
+
+    def __init__(self) -> None:
+        self.names = []
+        self._ids = {}
+
+    def intern(self, name: str) -> int:
+        """Gets the ID for a name, giving it the next one if it's new."""
+        id = self._ids.get(name)
+        if id is None:
+            id = len(self.names)
+            self._ids[name] = id
+            self.names.append(name)
+        return id
+
+    def get(self, name: str) -> Optional[int]:
+        """Gets the ID for a name, or None if it hasn't been seen."""
+        return self._ids.get(name)
+
+    def name(self, id: int) -> str:
+        """Gets the name with an ID."""
+        return self.names[id]
+
+    def merge(self, other: "SymbolTable") -> List[int]:
+        """Interns every name in another table, in that table's ID order.
+
+        Returns:
+            List[int]: our ID for each of the other table's IDs
+        """
+        return [self.intern(name) for name in other.names]
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.names)
@@ -0,0 +1,208 @@
+# This file contains the logic for getting QBJ files (and the packets they were
+# played on) into a Tournament — either one file at a time, or spread out over
+# a pool of worker processes whose partial Tournaments get merged back together.
+
+import json
+import sys
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Protocol, Tuple
+from archives import ArchiveIndex
+from diagnostics import FUZZY_PACKET_MATCH, MISSING_PACKET, Diagnostics
+from packets import PacketCache, PacketIndex
+from parsing import QBJ, PacketJSON
+from profiling import Profiler, phase
+from tournament import Tournament
+
+# how many chunks to give each worker; more chunks means better load balancing
+# when some rooms' files are much bigger than others
+CHUNKS_PER_JOB = 4
+
+LoadedQBJ = Tuple[str, str]
+"""(path of a QBJ that was loaded, path of the packet it was loaded with)"""
+
+class QBJSink(Protocol):
+    """Something QBJs can be loaded into, like a Tournament."""
+
+    diagnostics: Diagnostics
+
+    loadDiagnostics: Diagnostics
+    """Where problems that keep a QBJ from being added at all are recorded."""
+
+    def addQBJAndPacket(self, qbj: QBJ, packet: PacketJSON, source: Optional[str] = None) -> None:
+        ...
+
+# each worker process keeps its own packet cache across the chunks it's given
+_workerPackets: Optional[PacketCache] = None
+_workerStatsBackend = "dict"
+_workerProfiling = False
+_workerArchives: Optional[ArchiveIndex] = None
+
+def loadQBJ(
+    t: QBJSink, qbjPath: str, packets: PacketCache, profiler: Optional[Profiler] = None,
+    archives: Optional[ArchiveIndex] = None
+) -> Optional[str]:
+    """Loads a QBJ file and its packet into a tournament.
+
+    Args:
+        t (QBJSink): the tournament (or other sink) to add the QBJ to
+        qbjPath (str): path of the .qbj file, or its member name if it's in one of `archives`
+        packets (PacketCache): where to load the QBJ's packet from
+        profiler (Optional[Profiler]): if set, what to record timings and counts with
+        archives (Optional[ArchiveIndex]): archives to read the QBJ and its packet from, before the disk
+
+    Returns:
+        Optional[str]: the path of the packet the QBJ was added with, or None if it wasn't added
+    """
+    try:
+        with phase(profiler, "read QBJs"):
+            if archives is not None and qbjPath in archives:
+                with archives.open(qbjPath) as member:
+                    qbj: QBJ = json.load(member)
+            else:
+                with open(qbjPath) as f:
+                    qbj = json.load(f)
+        # do ""smart""" packet location
+        packetname = qbj["packets"]
+        packetPathsToTry = []
+        if archives is not None:
+            packetMember = archives.findPacket(packetname, qbjPath)
+            if packetMember is not None:
+                packetPathsToTry.append(packetMember)
+        fuzzyMatch = None
+        if packets.index is None:
+            packetPathsToTry.append(f"{packetname}.json")
+        else:
+            match = packets.index.resolve(packetname)
+            if match is not None:
+                packetPathsToTry.append(match.path)
+                if not match.exact:
+                    fuzzyMatch = match.path
+
+        print(f"--> opened: {qbjPath}")
+        for path in packetPathsToTry:
+            try:
+                with phase(profiler, "load packets"):
+                    packet: PacketJSON = packets.load(path, archives)
+            except FileNotFoundError:
+                print("FNF Error!", path)
+                continue
+            with phase(profiler, "addQBJAndPacket"):
+                t.addQBJAndPacket(qbj, packet, qbjPath)
+            if path == fuzzyMatch:
+                t.diagnostics.add(FUZZY_PACKET_MATCH, f"'{packetname}', so used {path}", qbjPath)
+            print(f"Added QBJ {qbjPath} with packet {path}")
+            if profiler is not None:
+                profiler.count("QBJs loaded")
+                profiler.count("tossups read", len(qbj["match_questions"]))
+                profiler.count("buzzes", sum(len(q["buzzes"]) for q in qbj["match_questions"]))
+            return path
+        t.loadDiagnostics.add(MISSING_PACKET, packetname, qbjPath)
+    except Exception:
+        print(f"Error: could not load {qbjPath}. Here's the Python error trace:\n", file=sys.stderr)
+        traceback.print_exc()
+    if profiler is not None:
+        profiler.count("QBJs skipped")
+    return None
+
+def ingestSerial(
+    t: QBJSink, qbjPaths: List[str], packets: PacketCache, profiler: Optional[Profiler] = None,
+    archives: Optional[ArchiveIndex] = None
+) -> List[LoadedQBJ]:
+    """Loads QBJ files into a tournament one after another.
+
+    Args:
+        t (QBJSink): the tournament (or other sink) to add the QBJs to
+        qbjPaths (List[str]): paths (or archive member names) of the .qbj files, in the order to add them
+        packets (PacketCache): where to load packets from
+        profiler (Optional[Profiler]): if set, what to record timings and counts with
+        archives (Optional[ArchiveIndex]): archives to read QBJs and packets from, before the disk
+
+    Returns:
+        List[LoadedQBJ]: the QBJs that were loaded, with their packets
+    """
+    loaded = []
+    for qbjPath in qbjPaths:
+        packetPath = loadQBJ(t, qbjPath, packets, profiler, archives)
+        if packetPath is not None:
+            loaded.append((qbjPath, packetPath))
+    return loaded
+
+def _initWorker(
+    packetCacheSize: int, packetIndex: Optional[PacketIndex], statsBackend: str, profiling: bool,
+    archives: Optional[ArchiveIndex]
+) -> None:
+    global _workerPackets, _workerStatsBackend, _workerProfiling, _workerArchives
+    _workerPackets = PacketCache(packetCacheSize, packetIndex)
+    _workerStatsBackend = statsBackend
+    _workerProfiling = profiling
+    # the index comes over already built; each worker just reopens the archives
+    if archives is not None:
+        archives.detach()
+    _workerArchives = archives
+
+def _ingestChunk(qbjPaths: List[str]) -> Tuple[Tournament, List[LoadedQBJ], int, int, int, Optional[Profiler]]:
+    """Worker entry point: builds a partial tournament out of some QBJs.
+
+    Returns the partial tournament, the QBJs that were loaded, how the
+    worker's packet cache hits/misses/evictions changed, and (if profiling)
+    the chunk's timings.
+    """
+    assert _workerPackets is not None
+    hits, misses, evictions = _workerPackets.hits, _workerPackets.misses, _workerPackets.evictions
+    profiler = Profiler() if _workerProfiling else None
+    partial = Tournament(_workerStatsBackend)
+    loaded = ingestSerial(partial, qbjPaths, _workerPackets, profiler, _workerArchives)
+    return (
+        partial, loaded,
+        _workerPackets.hits - hits, _workerPackets.misses - misses, _workerPackets.evictions - evictions,
+        profiler,
+    )
+
+def ingestParallel(
+    t: Tournament, qbjPaths: List[str], jobs: int, packets: PacketCache, profiler: Optional[Profiler] = None,
+    archives: Optional[ArchiveIndex] = None
+) -> List[LoadedQBJ]:
+    """Loads QBJ files into a tournament using a pool of worker processes.
+
+    The files are split into contiguous chunks; each worker builds a partial
+    Tournament for a chunk and the partials are merged back in file order,
+    so the result is the same as calling ingestSerial on the same paths.
+
+    Each worker has its own packet cache (with the same size limit and packet index as `packets`);
+    their hit/miss/eviction counts are added to `packets`'s. Likewise, the
+    workers' timings are added to `profiler`'s, so with more than one job the
+    per-phase times are summed over all the workers.
+
+    Args:
+        t (Tournament): the tournament to add the QBJs to
+        qbjPaths (List[str]): paths (or archive member names) of the .qbj files, in the order to add them
+        jobs (int): the number of worker processes to use
+        packets (PacketCache): where to load packets from
+        profiler (Optional[Profiler]): if set, what to record timings and counts with
+        archives (Optional[ArchiveIndex]): archives to read QBJs and packets from, before the disk
+
+    Returns:
+        List[LoadedQBJ]: the QBJs that were loaded, with their packets
+    """
+    if jobs <= 1 or len(qbjPaths) <= 1:
+        return ingestSerial(t, qbjPaths, packets, profiler, archives)
+
+    numChunks = min(len(qbjPaths), jobs * CHUNKS_PER_JOB)
+    chunkSize = -(-len(qbjPaths) // numChunks) # ceiling division
+    chunks = [qbjPaths[i:i + chunkSize] for i in range(0, len(qbjPaths), chunkSize)]
+
+    qbjsLoaded: List[LoadedQBJ] = []
+    initargs = (packets.maxSize, packets.index, t.stats.name, profiler is not None, archives)
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_initWorker, initargs=initargs) as pool:
+        # map() hands results back in submission order, which keeps the merge deterministic
+        for partial, loaded, hits, misses, evictions, workerProfiler in pool.map(_ingestChunk, chunks):
+            with phase(profiler, "merge"):
+                t.merge(partial)
+            if profiler is not None and workerProfiler is not None:
+                profiler.merge(workerProfiler)
+            qbjsLoaded += loaded
+            packets.hits += hits
+            packets.misses += misses
+            packets.evictions += evictions
+    return qbjsLoaded
@@ -0,0 +1,82 @@
+# This file contains the lineup index, which answers "who was playing for
+# each team on question k?" for a single match. QBJ files store lineups as a
+# list of (first question, players) entries, one per substitution.
+
+from bisect import bisect_right
+from typing import List, Tuple
+from ids import PlayerID, SymbolTable, TeamID
+from parsing import QBJMatchTeam
+
+class LineupIndex:
+    """The lineups one team used over the course of a match."""
+
+    team: TeamID
+    """The team whose lineups these are."""
+
+    _firstQuestions: List[int]
+    """Sorted question numbers on which each lineup started."""
+
+    _players: List[List[PlayerID]]
+    """The players in each lineup; _players[i] started on _firstQuestions[i]."""
+
+    def __init__(self, rawTeam: QBJMatchTeam, players: SymbolTable, teams: SymbolTable) -> None:
+        """Builds the index for a team from the QBJ's `match_teams` entry.
+
+        Args:
+            rawTeam (QBJMatchTeam): the team's entry in the QBJ
+            players (SymbolTable): where to get player IDs from
+            teams (SymbolTable): where to get team IDs from
+        """
+        self.team = teams.intern(rawTeam["team"]["name"])
+        lineups = sorted(
+            (
+                (lu["first_question"], [players.intern(p["name"]) for p in lu["players"]])
+                for lu in rawTeam.get("lineups", [])
+            ),
+            key=lambda lu: lu[0],
+        )
+        if len(lineups) == 0:
+            # no lineup info, so the best we can do is assume everyone who heard anything was there the whole time
+            lineups = [(1, [players.intern(p["player"]["name"]) for p in rawTeam["match_players"] if p["tossups_heard"] > 0])]
+        self._firstQuestions = [lu[0] for lu in lineups]
+        self._players = [lu[1] for lu in lineups]
+
+    def playersFor(self, questionNumber: int) -> List[PlayerID]:
+        """Gets the players who were on court for a question.
+
+        Args:
+            questionNumber (int): the (1-indexed) question number
+
+        Returns:
+            List[PlayerID]: the players in the lineup that was active for that question
+        """
+        # the active lineup is the last one to start on or before this question
+        idx = bisect_right(self._firstQuestions, questionNumber) - 1
+        # if the first recorded lineup starts late, assume it was there from the beginning
+        return self._players[max(idx, 0)]
+
+class MatchLineups:
+    """The lineup indexes for every team in a match."""
+
+    teams: List[LineupIndex]
+
+    def __init__(self, rawTeams: List[QBJMatchTeam], players: SymbolTable, teams: SymbolTable) -> None:
+        """Builds the indexes from a QBJ's `match_teams`.
+
+        Args:
+            rawTeams (List[QBJMatchTeam]): the `match_teams` list of the QBJ
+            players (SymbolTable): where to get player IDs from
+            teams (SymbolTable): where to get team IDs from
+        """
+        self.teams = [LineupIndex(rawTeam, players, teams) for rawTeam in rawTeams]
+
+    def playersFor(self, questionNumber: int) -> List[Tuple[TeamID, List[PlayerID]]]:
+        """Gets the players from each team who were on court for a question.
+
+        Args:
+            questionNumber (int): the (1-indexed) question number
+
+        Returns:
+            List[Tuple[TeamID, List[PlayerID]]]: each team and its players for that question
+        """
+        return [(index.team, index.playersFor(questionNumber)) for index in self.teams]
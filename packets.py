@@ -0,0 +1,287 @@
+# This file contains the packet loader. Every room in a round plays the same
+# packet, so we parse each packet .json once and hand out the parsed copy to
+# every QBJ that uses it.
+#
+# It also contains the packet index, which finds the packet file for each QBJ's
+# "packets" field: the search directories are scanned once, and each name is
+# looked up by its normalized form, so e.g. "Round 01" finds "packets/round_1.json".
+
+import difflib
+import json
+import os
+import re
+from collections import OrderedDict
+from os import path, stat
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+from archives import ArchiveIndex
+from parsing import PacketJSON
+
+FUZZY_CUTOFF = 0.75
+"""How similar (from 0 to 1) a packet file's name has to be to a QBJ's packet name to be a fuzzy match."""
+
+UNNUMBERED_FUZZY_CUTOFF = 0.9
+"""FUZZY_CUTOFF for names without numbers in them, which have nothing else to keep e.g. "Finals" from matching "Semifinals"."""
+
+PACKET_KEY = re.compile(rb'"tossups"\s*:')
+"""Every packet .json has this in it (and other .json files, like QBJtool's own output, don't)."""
+
+PACKET_PROBE_SIZE = 64 * 1024
+"""How much of the start of a .json file is searched for PACKET_KEY. Packets start with their tossups (or, at most, some short metadata), so this is plenty."""
+
+def normalizePacketName(name: str) -> str:
+    """Normalizes a packet name (or file name) for looking it up.
+
+    Case, punctuation, spacing, a .json extension, and leading zeros on numbers
+    are ignored, so "Round_01.json", "round 1" and "ROUND-1" are all "round 1".
+    Letters don't have to be ASCII.
+    """
+    if name.lower().endswith(".json"):
+        name = name[:-len(".json")]
+    words = re.findall(r"[^\W\d_]+|\d+", name.casefold())
+    return " ".join(str(int(word)) if word.isdecimal() else word for word in words)
+
+def looksLikePacket(filePath: str) -> bool:
+    """Checks whether a .json file could be a packet (rather than e.g. QBJtool's own JSON output), without parsing it.
+
+    Only the first PACKET_PROBE_SIZE bytes are read, so big files that aren't packets are cheap to rule out.
+    """
+    try:
+        with open(filePath, "rb") as f:
+            return PACKET_KEY.search(f.read(PACKET_PROBE_SIZE)) is not None
+    except OSError:
+        return False
+
+class PacketMatch(NamedTuple):
+    """Where a packet name was found."""
+    path: str
+    exact: bool
+    """Whether the normalized names were the same (rather than just close)"""
+
+class PacketIndex:
+    """The packet .json files in some directories (and their subdirectories), by normalized name."""
+
+    searchDirs: List[str]
+
+    recursive: bool
+    """Whether subdirectories of the search directories are scanned too."""
+
+    fuzzy: bool
+    """Whether a packet name with no file of the same normalized name can fall back to a close match."""
+
+    paths: Dict[str, List[str]]
+    """The packet files with each normalized name, in search order (earlier directories, then shallower files, first)."""
+
+    _matches: Dict[str, Optional[PacketMatch]]
+    """What each packet name that's been looked up resolved to."""
+
+    _isPacket: Dict[str, bool]
+    """Whether each file that's been considered looks like a packet (see looksLikePacket)."""
+
+    _signatures: Dict[str, Tuple[int, int]]
+    """(size, modification time in nanoseconds) of each file found by the last scan."""
+
+    def __init__(self, searchDirs: Sequence[str], recursive: bool = True, fuzzy: bool = False) -> None:
+        """Scans the search directories for packets.
+
+        Args:
+            searchDirs (Sequence[str]): the directories to look for packets in, most preferred first
+            recursive (bool): whether to look in their subdirectories too
+            fuzzy (bool): whether to fall back to close matches for packet names that aren't found
+        """
+        self.searchDirs = list(searchDirs)
+        self.recursive = recursive
+        self.fuzzy = fuzzy
+        self._signatures = {}
+        self.scan()
+
+    def scan(self) -> bool:
+        """(Re)scans the search directories, e.g. after new packets have been added.
+
+        Returns:
+            bool: whether any packet files were added, removed, or changed since the last scan
+        """
+        found: List[Tuple[int, int, str]] = []
+        for dirIdx, searchDir in enumerate(self.searchDirs):
+            for root, dirs, files in os.walk(searchDir):
+                if not self.recursive:
+                    dirs.clear()
+                dirs.sort()
+                depth = path.relpath(root, searchDir).count(os.sep) + (root != searchDir)
+                found += [(dirIdx, depth, path.join(root, f)) for f in sorted(files) if f.lower().endswith(".json")]
+        self.paths = {}
+        signatures = {}
+        for _, _, packetPath in sorted(found, key=lambda entry: entry[:2]):
+            self.paths.setdefault(normalizePacketName(path.basename(packetPath)), []).append(packetPath)
+            try:
+                info = os.stat(packetPath)
+                signatures[packetPath] = (info.st_size, info.st_mtime_ns)
+            except OSError:
+                pass
+        self._matches = {}
+        self._isPacket = {}
+        changed = signatures != self._signatures
+        self._signatures = signatures
+        return changed
+
+    def _looksLikePacket(self, packetPath: str) -> bool:
+        isPacket = self._isPacket.get(packetPath)
+        if isPacket is None:
+            isPacket = self._isPacket[packetPath] = looksLikePacket(packetPath)
+        return isPacket
+
+    def resolve(self, packetName: str) -> Optional[PacketMatch]:
+        """Finds the packet file for a QBJ's "packets" field.
+
+        A name with a directory in it (e.g. "packets/Round 1") is first looked for
+        at that path, relative to the current directory and then to each search
+        directory (but never outside of it, e.g. with ".."). Otherwise, if no file
+        has the same normalized name and fuzzy matching is on, the closest one whose
+        name has the same numbers in it (so "Round 1" never matches "Round 11") is
+        used, if it's close enough. Files that don't look like packets are never used.
+
+        Returns:
+            Optional[PacketMatch]: the packet file, or None if there's nothing close
+        """
+        if packetName in self._matches:
+            return self._matches[packetName]
+        match = self._resolveByPath(packetName)
+        if match is None:
+            match = self._resolveByName(packetName)
+        self._matches[packetName] = match
+        return match
+
+    def _resolveByPath(self, packetName: str) -> Optional[PacketMatch]:
+        if "/" not in packetName and os.sep not in packetName:
+            return None
+        for baseDir in ["."] + self.searchDirs:
+            packetPath = path.normpath(path.join(baseDir, f"{packetName}.json"))
+            try:
+                Path(packetPath).resolve().relative_to(Path(baseDir).resolve())
+            except ValueError:
+                # the QBJ's packet name points outside of the directory (e.g. "../../secret")
+                continue
+            if path.isfile(packetPath) and self._looksLikePacket(packetPath):
+                return PacketMatch(packetPath, True)
+        return None
+
+    def _resolveByName(self, packetName: str) -> Optional[PacketMatch]:
+        key = normalizePacketName(packetName)
+        candidates = [p for p in self.paths.get(key, []) if self._looksLikePacket(p)]
+        if len(candidates) > 0:
+            # among files with the same normalized name, prefer one with exactly the right name
+            exactName = f"{path.basename(packetName)}.json"
+            return PacketMatch(next((p for p in candidates if path.basename(p) == exactName), candidates[0]), True)
+        if not self.fuzzy:
+            return None
+
+        numbers = re.findall(r"\d+", key)
+        sameNumbers = [other for other in self.paths if other != key and re.findall(r"\d+", other) == numbers]
+        # names with extra words at the end (e.g. "Round 1 Final") are the most likely mix-up, but
+        # without numbers to go by, that's too loose (e.g. "Finals" and "Finals Tiebreakers")
+        extended = sorted(
+            (other for other in sameNumbers if other.startswith(key + " ") or key.startswith(other + " ")),
+            key=lambda other: (abs(len(other) - len(key)), other),
+        ) if len(numbers) > 0 else []
+        cutoff = FUZZY_CUTOFF if len(numbers) > 0 else UNNUMBERED_FUZZY_CUTOFF
+        # closest first
+        close = extended or difflib.get_close_matches(key, sameNumbers, n=max(len(sameNumbers), 1), cutoff=cutoff)
+        for best in close:
+            packetPath = next((p for p in self.paths[best] if self._looksLikePacket(p)), None)
+            if packetPath is not None:
+                return PacketMatch(packetPath, False)
+        return None
+
+    def __len__(self) -> int:
+        return sum(len(paths) for paths in self.paths.values())
+
+class PacketCache:
+    """A size-bounded LRU cache of parsed packet .json files.
+
+    Entries are keyed by the resolved path of the packet (or its member name, for
+    packets in archives), and are only reused if the file's (or archive's)
+    modification time hasn't changed since it was parsed.
+    """
+
+    maxSize: int
+    """The maximum number of parsed packets to keep around."""
+
+    hits: int
+    """The number of loads that were served from the cache."""
+
+    misses: int
+    """The number of loads that had to parse the packet file."""
+
+    evictions: int
+    """The number of packets that were dropped to stay under maxSize."""
+
+    index: Optional[PacketIndex]
+    """Where to find packets by name; if None, a QBJ's packet is only looked for in the current directory."""
+
+    _packets: "OrderedDict[str, Tuple[int, PacketJSON]]"
+
+    def __init__(self, maxSize: int = 64, index: Optional[PacketIndex] = None) -> None:
+        """Makes an empty cache.
+
+        Args:
+            maxSize (int): the maximum number of parsed packets to keep around
+            index (Optional[PacketIndex]): where to find packets by name
+        """
+        if maxSize < 1:
+            raise ValueError(f"packet cache size must be at least 1 (got {maxSize})")
+        self.maxSize = maxSize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.index = index
+        self._packets = OrderedDict()
+
+    def load(self, packetPath: str, archives: Optional[ArchiveIndex] = None) -> PacketJSON:
+        """Gets the parsed contents of a packet .json file.
+
+        The returned object is shared with other callers, so it mustn't be modified.
+
+        Args:
+            packetPath (str): path of the packet .json, or its member name if it's in one of `archives`
+            archives (Optional[ArchiveIndex]): the archives to look for packetPath in before the disk
+
+        Raises:
+            FileNotFoundError: if there's no file at packetPath
+
+        Returns:
+            PacketJSON: the parsed packet
+        """
+        if archives is not None and packetPath in archives:
+            # members are only reread if the whole archive has changed
+            resolved = packetPath
+            mtime = stat(archives.archiveOf(packetPath)).st_mtime_ns
+        else:
+            archives = None
+            resolved = path.realpath(packetPath)
+            mtime = stat(resolved).st_mtime_ns
+
+        cached = self._packets.get(resolved)
+        if cached is not None and cached[0] == mtime:
+            self._packets.move_to_end(resolved)
+            self.hits += 1
+            return cached[1]
+
+        self.misses += 1
+        if archives is not None:
+            with archives.open(resolved) as member:
+                packet: PacketJSON = json.load(member)
+        else:
+            with open(resolved) as f:
+                packet = json.load(f)
+        self._packets[resolved] = (mtime, packet)
+        self._packets.move_to_end(resolved)
+        while len(self._packets) > self.maxSize:
+            self._packets.popitem(last=False)
+            self.evictions += 1
+        return packet
+
+    def __len__(self) -> int:
+        return len(self._packets)
+
+    def __str__(self) -> str:
+        return f"{self.hits} hits, {self.misses} misses, {self.evictions} evictions (holding at most {self.maxSize} packets)"
@@ -0,0 +1,126 @@
+# This file contains the --profile instrumentation: wall/CPU timers for each
+# phase of a run, plus counters for how much work each phase did. Nothing here
+# runs unless profiling was asked for; code that's profiled takes an
+# Optional[Profiler] and uses phase(), which does nothing when it's None.
+
+import cProfile
+import json
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Any, ContextManager, Dict, Iterator, Optional
+
+class PhaseTimer:
+    """How long one phase of a run took, in total."""
+
+    wall: float
+    """Wall-clock time, in seconds"""
+    cpu: float
+    """CPU time used by this process, in seconds"""
+    calls: int
+
+    def __init__(self) -> None:
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.calls = 0
+
+class Profiler:
+    """Collects phase timings and counters for a run."""
+
+    phases: Dict[str, PhaseTimer]
+    """Timings for each phase, in the order each phase was first entered."""
+
+    counters: Dict[str, int]
+
+    cprofile: Optional[cProfile.Profile]
+    """If set, a cProfile profiler that's turned on for hot() sections."""
+
+    def __init__(self, useCProfile: bool = False) -> None:
+        """Makes an empty profiler.
+
+        Args:
+            useCProfile (bool): whether to also run cProfile over the sections wrapped in hot()
+        """
+        self.phases = {}
+        self.counters = {}
+        self.cprofile = cProfile.Profile() if useCProfile else None
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Times a phase of the run; a phase that's entered more than once has its times added up."""
+        wallStart, cpuStart = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            timer = self.phases.get(name)
+            if timer is None:
+                timer = self.phases[name] = PhaseTimer()
+            timer.wall += time.perf_counter() - wallStart
+            timer.cpu += time.process_time() - cpuStart
+            timer.calls += 1
+
+    @contextmanager
+    def hot(self) -> Iterator[None]:
+        """Runs cProfile over a section, if cProfile is being used."""
+        if self.cprofile is None:
+            yield
+            return
+        self.cprofile.enable()
+        try:
+            yield
+        finally:
+            self.cprofile.disable()
+
+    def count(self, name: str, n: int = 1) -> None:
+        """Adds to a counter."""
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def merge(self, other: "Profiler") -> None:
+        """Adds another (e.g. a worker process's) profiler's timings and counters into this one."""
+        for name, theirs in other.phases.items():
+            timer = self.phases.get(name)
+            if timer is None:
+                timer = self.phases[name] = PhaseTimer()
+            timer.wall += theirs.wall
+            timer.cpu += theirs.cpu
+            timer.calls += theirs.calls
+        for name, n in other.counters.items():
+            self.count(name, n)
+
+    def report(self) -> Dict[str, Any]:
+        """Gets the timings and counters as a JSON-serializable dictionary."""
+        return {
+            "phases": {
+                name: {"wall": timer.wall, "cpu": timer.cpu, "calls": timer.calls}
+                for name, timer in self.phases.items()
+            },
+            "counters": dict(self.counters),
+        }
+
+    def summary(self) -> str:
+        """Gets a human-readable table of the timings and counters."""
+        width = max((len(name) for name in list(self.phases) + list(self.counters)), default=0)
+        lines = ["Profile:"]
+        for name, timer in self.phases.items():
+            lines.append(
+                f"\t{name:<{width}} {timer.wall * 1000:10.1f} ms wall {timer.cpu * 1000:10.1f} ms CPU ({timer.calls} calls)"
+            )
+        for name, n in self.counters.items():
+            lines.append(f"\t{name:<{width}} {n:10}")
+        return "\n".join(lines)
+
+    def writeJSON(self, reportPath: str) -> None:
+        """Saves the report() to a JSON file."""
+        with open(reportPath, "w") as f:
+            json.dump(self.report(), f, indent=2)
+
+def phase(profiler: Optional[Profiler], name: str) -> ContextManager[None]:
+    """Times a phase with a profiler, or does nothing if there isn't one."""
+    if profiler is None:
+        return nullcontext()
+    return profiler.phase(name)
+
+def hot(profiler: Optional[Profiler]) -> ContextManager[None]:
+    """Runs cProfile over a section if the profiler is using it, or does nothing if there isn't a profiler."""
+    if profiler is None:
+        return nullcontext()
+    return profiler.hot()
@@ -1,60 +1,261 @@
 # very WIP
 
-import json
+import argparse
+import gzip
 import sys
-import traceback
-from parsing import QBJ, PacketJSON
+from os import path
+from typing import List, Optional
+from archives import ArchiveIndex, isArchive
+from fragments import FragmentCache
+from ingest import ingestParallel
+from packets import PacketCache, PacketIndex
+from profiling import Profiler, hot, phase
+from shards import INDEX, writeShardedPages
+from snapshot import ingestWithSnapshot
+from statstore import STAT_BACKENDS
 from tournament import Tournament
+from watch import QBJWatcher
 
-if len(sys.argv) < 2:
-    print("Error: no input files", file=sys.stderr)
-    print(f"Try running `{sys.argv[0]} <tournament name> round1.qbj round2.qbj ...`", file=sys.stderr)
-    print("You should run QBJtool in the directory which contains your packet .json files.", file=sys.stderr)
-    sys.exit(1)
-name = sys.argv[1]
-qbjPaths = sys.argv[2:]
-
-t = Tournament()
-
-# do ""smart""" packet location
-qbjsLoaded = 0
-print(qbjPaths)
-for qbjPath in qbjPaths:
-    try:
-        with open(qbjPath) as f:
-            qbj = json.load(f)
-            packetname = qbj["packets"]
-            packetPathsToTry = [f"{packetname}.json"]
-
-            added = False
-            for path in packetPathsToTry:
-                print(f"--> opened: {qbjPath}")
-                try:
-                    with open(path) as f:
-                        packet: PacketJSON = json.load(f)
-                        t.addQBJAndPacket(qbj, packet)
-                        print(f"Added QBJ {qbjPath} with packet {path}")
-                        added = True
-                        qbjsLoaded += 1
-                        break
-                except FileNotFoundError:
-                    print("FNF Error!", path)
-                    continue
-            if not added:
-                print(f"Warning: no packet found for {qbjPath} (checked {', '.join(packetPathsToTry)}); skipping this packet", file=sys.stderr)
-    except Exception as e:
-        print(f"Error: could not load {qbjPath}. Here's the Python error trace:\n", file=sys.stderr)
-        traceback.print_exc()
-        continue
-print(f"=> Loaded {qbjsLoaded} QBJ files")
-print(f"Alphabetical list of categories:\n\t* {'\n\t* '.join(sorted(list(t.categories)))}")
-byLastWord = '\n\t* '.join(sorted(list(t.categories), key=lambda x: x.split()[-1]))
-print(f"Alphabetical by last word list of categories:\n\t* {byLastWord}")
-
-t.generateCombinedStats()
-print(f"==> Generated stats for combined categories")
-open(f"{name} (cat stats).html", "w").write(t.statsToHTML(name))
-print(f"===> Wrote stats to {name}.html")
-
-open(f"{name} (buzzes).html", "w").write(t.buzzpointsToHTML(name, 100))
-print(f"===> Wrote best buzzes to {name} (buzzes).html")
+def writePages(
+    t: Tournament, name: str, profiler: Optional[Profiler] = None, shardDir: Optional[str] = None, jobs: int = 1,
+    clientSide: bool = False, fragments: Optional[FragmentCache] = None
+) -> None:
+    """Writes the cat stats and buzzpoints pages for a tournament.
+
+    If shardDir is set, the pages are split up into an index page and a page for
+    each category, player, and packet in that directory instead (rendered with
+    `jobs` worker processes). If clientSide is set, the cat stats page's player
+    tables are rendered in the browser (see Tournament.iterStatsHTML). If
+    fragments is set, tossups on the buzzpoints page are reused from it when
+    their buzzes haven't changed.
+    """
+    if shardDir is not None:
+        result = writeShardedPages(t, name, shardDir, jobs, profiler)
+        print(
+            f"===> Wrote {path.join(shardDir, INDEX)} and {result.pages - 1} other pages "
+            f"({result.changed} changed, {result.removed} removed)"
+        )
+        return
+
+    statsPath = f"{name} (cat stats).html"
+    with phase(profiler, "statsToHTML"), open(statsPath, "w") as f:
+        t.writeStatsHTML(name, f, clientSide)
+    print(f"===> Wrote stats to {name}.html")
+
+    buzzpointsPath = f"{name} (buzzes).html"
+    with phase(profiler, "buzzpointsToHTML"), open(buzzpointsPath, "w") as f:
+        t.writeBuzzpointsHTML(name, 100, f, fragments)
+    print(f"===> Wrote best buzzes to {name} (buzzes).html")
+
+    if profiler is not None:
+        profiler.count("bytes written", path.getsize(statsPath) + path.getsize(buzzpointsPath))
+
+def writeStatsJSON(t: Tournament, name: str, jsonPath: str, profiler: Optional[Profiler] = None) -> None:
+    """Saves the tournament's stats as compact JSON (gzipped if jsonPath ends in .gz)."""
+    with phase(profiler, "statsToJSON"), (gzip.open(jsonPath, "wt") if jsonPath.endswith(".gz") else open(jsonPath, "w")) as f:
+        t.writeStatsJSON(name, f)
+    print(f"===> Saved stats data to {jsonPath}")
+
+def saveFragments(fragments: Optional[FragmentCache], cachePath: Optional[str]) -> None:
+    """Saves the fragment cache (if there is one) for the next run."""
+    if fragments is None or cachePath is None:
+        return
+    print(f"Fragment cache: {fragments}")
+    fragments.save(cachePath)
+
+def reportDiagnostics(t: Tournament, jsonPath: Optional[str]) -> None:
+    """Prints a summary of the problems found in the data, and saves them as JSON if asked to."""
+    diagnostics = t.allDiagnostics()
+    if len(diagnostics) > 0:
+        print(diagnostics.summary())
+    if jsonPath is not None:
+        diagnostics.writeJSON(jsonPath)
+        print(f"Saved {len(diagnostics)} warnings to {jsonPath}")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Generates statistics pages from .qbj files.",
+        epilog="Packets are looked for in the current directory unless you pass --packets.",
+    )
+    parser.add_argument("name", help="the name of the tournament")
+    parser.add_argument(
+        "qbjs", nargs="*",
+        help="the .qbj files to load; zip/tar archives of QBJs and packets are read without extracting them",
+    )
+    parser.add_argument(
+        "-j", "--jobs", type=int, default=1,
+        help="number of worker processes to load QBJs with (default: 1)",
+    )
+    parser.add_argument(
+        "--packets", action="append", metavar="DIR",
+        help="a directory to look for packet .json files in (and its subdirectories); "
+        "can be given more than once, earliest first (default: just the current directory, not its subdirectories)",
+    )
+    parser.add_argument(
+        "--fuzzy-packets", action="store_true",
+        help="if no packet file has a QBJ's packet name, use the closest one with the same numbers in its name",
+    )
+    parser.add_argument(
+        "--packet-cache-size", type=int, default=64,
+        help="maximum number of parsed packets to keep in memory (default: 64)",
+    )
+    parser.add_argument(
+        "--stats-backend", choices=list(STAT_BACKENDS), default="dict",
+        help="how to store player stats; 'columnar' uses much less memory for big aggregates (default: dict)",
+    )
+    parser.add_argument(
+        "--shard", metavar="DIR",
+        help="instead of the two big pages, write an index page and a page for each category, player, "
+        "and packet to DIR (rendered with --jobs processes); only pages that changed are rewritten",
+    )
+    parser.add_argument(
+        "--client-side", action="store_true",
+        help="make the cat stats page much smaller by rendering its player tables in the browser, from data in the page (not with --shard)",
+    )
+    parser.add_argument(
+        "--stats-json", metavar="PATH",
+        help="save every player's stats in each category to PATH as compact JSON (gzipped if PATH ends in .gz)",
+    )
+    parser.add_argument(
+        "--fragment-cache", metavar="PATH",
+        help="keep each tossup's rendered buzzpoints in PATH, so later runs only re-render tossups with new buzzes (not with --shard)",
+    )
+    parser.add_argument(
+        "--fragment-cache-size", type=int, default=20000,
+        help="maximum number of tossups to keep in the --fragment-cache (default: 20000)",
+    )
+    parser.add_argument(
+        "--snapshot", metavar="PATH",
+        help="save the loaded tournament here, and on later runs only load QBJs that aren't in it yet",
+    )
+    parser.add_argument(
+        "--watch", metavar="DIR",
+        help="keep running, loading QBJs as they're added to DIR and regenerating the pages",
+    )
+    parser.add_argument(
+        "--watch-interval", type=float, default=0.5, metavar="SECONDS",
+        help="how often to check for new QBJs in watch mode (default: 0.5)",
+    )
+    parser.add_argument(
+        "--diagnostics-json", metavar="PATH",
+        help="save the problems found in the data (missing tossups, odd point values, etc.) to PATH as JSON",
+    )
+    parser.add_argument(
+        "--profile", action="store_true",
+        help="print how long each phase of the run took, and how much work it did",
+    )
+    parser.add_argument(
+        "--profile-json", metavar="PATH",
+        help="save the --profile report to PATH as JSON (implies --profile)",
+    )
+    parser.add_argument(
+        "--cprofile", metavar="PATH",
+        help="run cProfile over loading and page generation, and save the stats to PATH (implies --profile)",
+    )
+    args = parser.parse_intermixed_args()
+    if args.client_side and args.shard is not None:
+        # the sharded pages are already small, and are always rendered here
+        parser.error("--client-side doesn't work with --shard")
+
+    profiler = None
+    if args.profile or args.profile_json is not None or args.cprofile is not None:
+        profiler = Profiler(useCProfile=args.cprofile is not None)
+
+    with phase(profiler, "index packets"):
+        # only the given directories are searched all the way down; the current directory could have anything in it
+        packetIndex = PacketIndex(args.packets or ["."], recursive=bool(args.packets), fuzzy=args.fuzzy_packets)
+    print(f"Found {len(packetIndex)} packet files in {', '.join(packetIndex.searchDirs)}")
+    packets = PacketCache(args.packet_cache_size, packetIndex)
+    if args.fragment_cache is not None and args.shard is not None:
+        # sharded pages are only rewritten when they change, which already keeps reruns quick
+        print("Error: --fragment-cache doesn't work with --shard", file=sys.stderr)
+        sys.exit(1)
+    fragments = None
+    if args.fragment_cache is not None:
+        fragments = FragmentCache.load(args.fragment_cache, args.fragment_cache_size)
+    if args.watch is not None:
+        if profiler is not None:
+            print("Error: profiling isn't supported in watch mode", file=sys.stderr)
+            sys.exit(1)
+        if len(args.qbjs) > 0:
+            print("Error: in watch mode, QBJs are loaded from the watched directory, so don't list any", file=sys.stderr)
+            sys.exit(1)
+        watcher = QBJWatcher(args.watch, args.jobs, packets, args.stats_backend, args.snapshot)
+        def regenerate(t: Tournament) -> None:
+            reportDiagnostics(t, args.diagnostics_json)
+            writePages(t, args.name, shardDir=args.shard, jobs=args.jobs, clientSide=args.client_side, fragments=fragments)
+            saveFragments(fragments, args.fragment_cache)
+            if args.stats_json is not None:
+                writeStatsJSON(t, args.name, args.stats_json)
+        watcher.run(regenerate, interval=args.watch_interval, debounce=args.watch_interval)
+        return
+
+    if len(args.qbjs) < 1:
+        print("Error: no input files", file=sys.stderr)
+        print(f"Try running `{sys.argv[0]} <tournament name> round1.qbj round2.qbj ...`", file=sys.stderr)
+        print("Packets are looked for in the current directory unless you pass --packets.", file=sys.stderr)
+        sys.exit(1)
+    name = args.name
+    archives: Optional[ArchiveIndex] = None
+    qbjPaths: List[str] = []
+    for qbjPath in args.qbjs:
+        if not isArchive(qbjPath):
+            qbjPaths.append(qbjPath)
+            continue
+        if archives is None:
+            archives = ArchiveIndex()
+        try:
+            qbjPaths += archives.add(qbjPath)
+        except Exception as e:
+            print(f"Error: couldn't read archive {qbjPath} ({e})", file=sys.stderr)
+            sys.exit(1)
+    if archives is not None and args.snapshot is not None:
+        print("Error: --snapshot only works with QBJs that are on disk, not in archives", file=sys.stderr)
+        sys.exit(1)
+
+    print(qbjPaths)
+    with phase(profiler, "total"), hot(profiler):
+        if args.snapshot is not None:
+            snapshot = ingestWithSnapshot(args.snapshot, qbjPaths, args.jobs, packets, args.stats_backend, profiler)
+            t = snapshot.tournament
+            qbjsLoaded = len(snapshot.qbjs)
+        else:
+            t = Tournament(args.stats_backend)
+            qbjsLoaded = len(ingestParallel(t, qbjPaths, args.jobs, packets, profiler, archives))
+            if archives is not None:
+                archives.close()
+        print(f"=> Loaded {qbjsLoaded} QBJ files")
+        reportDiagnostics(t, args.diagnostics_json)
+        print(f"Packet cache: {packets}")
+        alphabetical = '\n\t* '.join(t.categoryList())
+        print(f"Alphabetical list of categories:\n\t* {alphabetical}")
+        byLastWord = '\n\t* '.join(sorted(t.categoryList(), key=lambda x: x.split()[-1]))
+        print(f"Alphabetical by last word list of categories:\n\t* {byLastWord}")
+        print("Packet metadata for each category:")
+        for category, raws in t.categoryNormalizer.mappings().items():
+            print(f"\t* {category}: {' | '.join(repr(raw) for raw in raws)}")
+
+        writePages(t, name, profiler, args.shard, args.jobs, args.client_side, fragments)
+        saveFragments(fragments, args.fragment_cache)
+        if args.stats_json is not None:
+            writeStatsJSON(t, name, args.stats_json, profiler)
+
+    if profiler is not None:
+        profiler.count("players", len(t.players))
+        profiler.count("categories", len(t.categories))
+        profiler.count("distinct tossups", len(t.questions))
+        profiler.count("packet cache hits", packets.hits)
+        profiler.count("packet cache misses", packets.misses)
+        if fragments is not None:
+            profiler.count("fragment cache hits", fragments.hits)
+            profiler.count("fragment cache misses", fragments.misses)
+        print(profiler.summary())
+        if args.profile_json is not None:
+            profiler.writeJSON(args.profile_json)
+            print(f"Saved profile to {args.profile_json}")
+        if profiler.cprofile is not None:
+            profiler.cprofile.dump_stats(args.cprofile)
+            print(f"Saved cProfile stats to {args.cprofile} (view them with `python3 -m pstats {args.cprofile}`)")
+
+if __name__ == "__main__":
+    main()
@@ -1,28 +1,40 @@
 # This file contains a sane representation of questions — for
 # stats purposes.
 # TODO: bonuses
-from typing import Optional, List
-from ids import Player, Team
+from typing import Optional, List, Tuple
+from ids import PlayerID, TeamID
+from render import toID
 
 class Buzz:
     """A buzz."""
 
+    __slots__ = ("position", "player", "team", "points")
+
     position: int
     """The *word* index of the buzz within the tossup text"""
 
-    player: Player
-    team: Team
+    player: PlayerID
+    team: TeamID
     points: int # -5, 10, 15
     """The number of points earned by the buzz"""
 
-    def __init__(self, position: int, player: Player, team: Team, points: int) -> None:
+    def __init__(self, position: int, player: PlayerID, team: TeamID, points: int) -> None:
         self.position = position
         self.player = player
         self.team = team
         self.points = points
 
-class Tossup:
-    """A tossup."""
+class TossupText:
+    """The words of a packet tossup, shared by every room that heard it.
+
+    The buzzpoints page needs the text split into words and a few things worked
+    out from the answer line; those are done once here instead of per room.
+    """
+
+    __slots__ = ("id", "text", "answer", "packet", "words", "answerline", "slug", "sortKey")
+
+    id: int
+    """A number identifying this tossup within a tournament."""
 
     text: str
     """The text of the tossup"""
@@ -30,22 +42,68 @@ class Tossup:
     answer: str
     """The answer line of the tossup"""
 
+    packet: str
+    """The name of the packet the tossup was first heard in (a QBJ's "packets" field)"""
+
+    words: List[str]
+    """The text and answer line, split on spaces (which is how buzz positions count words)"""
+
+    answerline: str
+    """The main part of the answer line, without any [accept...] or (prompt...) directives"""
+
+    slug: str
+    """HTML ID for the tossup, based on the answerline"""
+
+    sortKey: str
+    """The tossup sorts by this on the buzzpoints page"""
+
+    def __init__(self, id: int, text: str, answer: str, packet: str = "") -> None:
+        self.id = id
+        self.text = text
+        self.answer = answer
+        self.packet = packet
+        withAnswer = text + "<br />ANSWER: " + answer
+        self.words = withAnswer.split(' ')
+        self.answerline = withAnswer.split('ANSWER: ')[1].split('[')[0].split('(')[0]
+        self.slug = toID(self.answerline)
+        self.sortKey = toID(answer)
+
+class Tossup:
+    """A tossup, as heard in one room.
+
+    There's one of these per room per tossup, so it only refers to the shared
+    TossupText rather than keeping its own copy of the words.
+    """
+
+    __slots__ = ("question", "correctBuzz", "incorrectBuzz", "players")
+
+    question: TossupText
+    """The words of the tossup"""
+
     correctBuzz: Optional[Buzz]
     """The buzz that correctly answered this tossup"""
 
     incorrectBuzz: Optional[Buzz]
     """The buzz that incorrectly answered this tossup"""
 
-    players: List[Player]
+    players: Tuple[PlayerID, ...]
     """The players who heard this tossup."""
 
     def __init__(
-        self, text: str, answer: str, correctBuzz: Optional[Buzz],
-        incorrectBuzz: Optional[Buzz], players: List[Player]
+        self, question: TossupText, correctBuzz: Optional[Buzz],
+        incorrectBuzz: Optional[Buzz], players: Tuple[PlayerID, ...]
     ) -> None:
-        self.text = text
-        self.answer = answer
+        self.question = question
         self.correctBuzz = correctBuzz
         self.incorrectBuzz = incorrectBuzz
         self.players = players
 
+    @property
+    def text(self) -> str:
+        """The text of the tossup"""
+        return self.question.text
+
+    @property
+    def answer(self) -> str:
+        """The answer line of the tossup"""
+        return self.question.answer
@@ -0,0 +1,104 @@
+# This file contains helpers for writing out HTML pages based on the templates
+# (template.html etc.) without building the whole page as one big string.
+
+import re
+import zlib
+from datetime import datetime
+from functools import lru_cache
+from os import path
+from typing import Dict, Iterable, Iterator, List, TextIO, Union
+
+# directory with qbjtool.py, and thus the templates, in it
+TEMPLATE_DIR = path.dirname(path.realpath(__file__))
+
+PLACEHOLDER_REGEX = re.compile(r'\$\$([A-Za-z0-9_-]+)\$\$')
+
+Chunks = Union[str, Iterable[str]]
+"""Something to fill a placeholder with: either a string, or the pieces of one."""
+
+def toID(s: str) -> str:
+    """Turns some text into something that can be used as an HTML ID."""
+    return re.sub(r'<\/?[a-z]*\/?>','',s.lower().strip().replace(' ', '-'))
+
+def shardPath(kind: str, name: str) -> str:
+    """Gets where the page for one category, player, or packet goes in sharded output.
+
+    The path is relative to the index page. The name's checksum is part of the
+    file name, so names that only differ in punctuation don't share a page.
+
+    Args:
+        kind (str): the kind of page, i.e. one of "categories", "players", or "packets"
+        name (str): the name of the category, player, or packet
+    """
+    slug = re.sub(r'[^a-z0-9_-]+', '-', toID(name)).strip('-')
+    return f"{kind}/{slug}-{zlib.crc32(name.encode()):08x}.html"
+
+@lru_cache(maxsize=None)
+def loadTemplate(filename: str) -> List[str]:
+    """Reads a template and splits it up around its `$$placeholders$$`.
+
+    Templates are only read once per process.
+
+    Args:
+        filename (str): name of the template file, e.g. "template.html"
+
+    Returns:
+        List[str]: alternating literal text and placeholder names, starting and ending with text
+    """
+    with open(path.join(TEMPLATE_DIR, filename)) as f:
+        return PLACEHOLDER_REGEX.split(f.read())
+
+def renderTemplate(filename: str, values: Dict[str, Chunks]) -> Iterator[str]:
+    """Fills in a template's placeholders, a piece at a time.
+
+    Args:
+        filename (str): name of the template file, e.g. "template.html"
+        values (Dict[str, Chunks]): what to put in place of each placeholder. Iterables
+            are consumed as they're reached, so each should only be used once.
+
+    Yields:
+        str: pieces of the page, in order
+    """
+    parts = loadTemplate(filename)
+    for i, part in enumerate(parts):
+        if i % 2 == 0:
+            yield part
+            continue
+        value = values.get(part)
+        if value is None:
+            # leave unknown placeholders alone
+            yield f"$${part}$$"
+        elif isinstance(value, str):
+            yield value
+        else:
+            yield from value
+
+def pageValues(name: str, html: Chunks, dated: bool = True) -> Dict[str, Chunks]:
+    """Gets the placeholder values that every page's template uses.
+
+    Args:
+        name (str): the name of the tournament
+        html (Chunks): the body of the page
+        dated (bool): whether the footer says when the page was generated; shard pages leave
+            it out, so that they only change (and get rewritten) when their stats do
+    """
+    return {
+        "gen_date": datetime.today().strftime(' on %m/%d/%Y') if dated else "",
+        "tour_name": name,
+        "html": html,
+    }
+
+def writeChunks(chunks: Iterable[str], out: TextIO) -> int:
+    """Writes pieces of a page to a file as they're generated.
+
+    Args:
+        chunks (Iterable[str]): the pieces of the page
+        out (TextIO): where to write them
+
+    Returns:
+        int: the number of characters written
+    """
+    written = 0
+    for chunk in chunks:
+        written += out.write(chunk)
+    return written
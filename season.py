@@ -0,0 +1,415 @@
+# This file contains the season store: an SQLite database of the tossups, lineups
+# and buzzes from many tournaments, so questions like "who are the best
+# Chemistry buzzers across every set this year?" can be answered by the database
+# instead of by loading every QBJ of the season into memory again.
+#
+# Usage:
+#   python3 season.py season.db add 'ACF Fall 2025 @ U of Somewhere' *.qbj
+#   python3 season.py season.db leaderboard Chemistry -n 20
+#   python3 season.py season.db player 'Some Player'
+
+import argparse
+import sqlite3
+import sys
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+from categories import CategoryNormalizer
+from diagnostics import Diagnostics, MISSING_TOSSUP, MULTIPLE_CORRECT_BUZZES, UNKNOWN_BUZZER, UNKNOWN_POINT_VALUE
+from ids import CategoryID, SymbolTable
+from ingest import ingestSerial
+from lineups import MatchLineups
+from packets import PacketCache, PacketIndex
+from parsing import QBJ, PacketJSON
+from statstore import OVERALL, NamedStatRow
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tournaments (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE);
+CREATE TABLE IF NOT EXISTS games (
+    id INTEGER PRIMARY KEY,
+    tournament_id INTEGER NOT NULL REFERENCES tournaments (id),
+    source TEXT
+);
+CREATE TABLE IF NOT EXISTS players (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE);
+CREATE TABLE IF NOT EXISTS teams (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE);
+CREATE TABLE IF NOT EXISTS categories (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE);
+-- the categories each category's tossups count towards: itself, its combined category (if any), and Overall
+CREATE TABLE IF NOT EXISTS stat_categories (
+    category_id INTEGER NOT NULL REFERENCES categories (id),
+    stat_category_id INTEGER NOT NULL REFERENCES categories (id),
+    PRIMARY KEY (category_id, stat_category_id)
+);
+CREATE TABLE IF NOT EXISTS questions (
+    id INTEGER PRIMARY KEY,
+    text TEXT NOT NULL,
+    answer TEXT NOT NULL,
+    UNIQUE (text, answer)
+);
+CREATE TABLE IF NOT EXISTS game_players (
+    game_id INTEGER NOT NULL REFERENCES games (id),
+    player_id INTEGER NOT NULL REFERENCES players (id),
+    team_id INTEGER NOT NULL REFERENCES teams (id),
+    tossups_heard INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tossups (
+    id INTEGER PRIMARY KEY,
+    game_id INTEGER NOT NULL REFERENCES games (id),
+    question_number INTEGER NOT NULL,
+    question_id INTEGER NOT NULL REFERENCES questions (id),
+    category_id INTEGER NOT NULL REFERENCES categories (id)
+);
+CREATE TABLE IF NOT EXISTS heard (
+    tossup_id INTEGER NOT NULL REFERENCES tossups (id),
+    player_id INTEGER NOT NULL REFERENCES players (id),
+    team_id INTEGER NOT NULL REFERENCES teams (id)
+);
+CREATE TABLE IF NOT EXISTS buzzes (
+    tossup_id INTEGER NOT NULL REFERENCES tossups (id),
+    player_id INTEGER NOT NULL REFERENCES players (id),
+    team_id INTEGER NOT NULL REFERENCES teams (id),
+    position INTEGER NOT NULL,
+    points INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS games_by_tournament ON games (tournament_id);
+CREATE INDEX IF NOT EXISTS game_players_by_game ON game_players (game_id);
+CREATE INDEX IF NOT EXISTS tossups_by_game ON tossups (game_id);
+CREATE INDEX IF NOT EXISTS heard_by_tossup ON heard (tossup_id, player_id);
+CREATE INDEX IF NOT EXISTS heard_by_player ON heard (player_id, tossup_id);
+CREATE INDEX IF NOT EXISTS buzzes_by_tossup ON buzzes (tossup_id, player_id);
+CREATE INDEX IF NOT EXISTS buzzes_by_player ON buzzes (player_id, tossup_id);
+"""
+
+# Every stats table is one of these, grouped by player and stat category; {where}
+# narrows it down (e.g. to one category or one player). Tossups heard and buzzes
+# are aggregated separately, since a player hears many more tossups than they
+# buzz on. A player can buzz on a tossup without being in the lineup for it
+# (e.g. if the lineups were entered wrong), so the rows are every (player,
+# category) in either half, like in Tournament.
+AGGREGATE_QUERY = """
+WITH h AS (
+    SELECT x.player_id, r.stat_category_id, COUNT(*) AS heard
+    FROM heard x
+    JOIN tossups t ON t.id = x.tossup_id
+    JOIN games g ON g.id = t.game_id
+    JOIN stat_categories r ON r.category_id = t.category_id
+    WHERE {where}
+    GROUP BY x.player_id, r.stat_category_id
+), b AS (
+    SELECT x.player_id, r.stat_category_id, SUM(x.points) AS points,
+        SUM(x.points = 15) AS powers, SUM(x.points = 10) AS tens, SUM(x.points = -5) AS negs,
+        AVG(CASE WHEN x.points > 0 THEN x.position END) AS avgPosition
+    FROM buzzes x
+    JOIN tossups t ON t.id = x.tossup_id
+    JOIN games g ON g.id = t.game_id
+    JOIN stat_categories r ON r.category_id = t.category_id
+    WHERE {where}
+    GROUP BY x.player_id, r.stat_category_id
+), k AS (
+    SELECT player_id, stat_category_id FROM h
+    UNION
+    SELECT player_id, stat_category_id FROM b
+)
+SELECT k.player_id, k.stat_category_id, COALESCE(h.heard, 0),
+    COALESCE(b.points, 0), COALESCE(b.powers, 0), COALESCE(b.tens, 0), COALESCE(b.negs, 0), b.avgPosition
+FROM k
+LEFT JOIN h ON h.player_id = k.player_id AND h.stat_category_id = k.stat_category_id
+LEFT JOIN b ON b.player_id = k.player_id AND b.stat_category_id = k.stat_category_id
+ORDER BY COALESCE(ROUND(COALESCE(b.points, 0) * 20.0 / h.heard, 2), 0) DESC, {tieBreak}
+"""
+
+class SeasonStore:
+    """An SQLite database of games from many tournaments.
+
+    QBJs are added with ingest.ingestSerial (or addQBJAndPacket) after picking a
+    tournament with startTournament(), and saved with commit().
+    """
+
+    db: sqlite3.Connection
+
+    diagnostics: Diagnostics
+    """Problems found in the data that's been added since the store was opened."""
+
+    loadDiagnostics: Diagnostics
+    """Problems that kept QBJs from being added since the store was opened (e.g. missing packets)."""
+
+    _tournamentId: Optional[int]
+    """The tournament that QBJs are currently being added to."""
+
+    _players: SymbolTable
+    _teams: SymbolTable
+    _categories: SymbolTable
+    """Names of the rows in the players/teams/categories tables (row IDs are the same as symbol IDs)."""
+    _saved: Dict[str, int]
+    """How many names from each of those tables are in the database already."""
+
+    _categoryNormalizer: CategoryNormalizer
+    _statCategories: Dict[str, Tuple[CategoryID, ...]]
+    """The categories that a tossup with each raw metadata string counts towards (its own first)."""
+
+    _nextId: Dict[str, int]
+    """The next free row ID in the games and tossups tables."""
+    _rows: Dict[str, List[tuple]]
+    """Rows waiting to be inserted, by table; they're inserted in bulk by commit()."""
+
+    def __init__(self, dbPath: str) -> None:
+        """Opens a season database, creating it if it doesn't exist.
+
+        Args:
+            dbPath (str): path of the SQLite database
+        """
+        self.db = sqlite3.connect(dbPath)
+        self.db.executescript(SCHEMA)
+        self.diagnostics = Diagnostics()
+        self.loadDiagnostics = Diagnostics()
+        self._tournamentId = None
+        self._saved = {}
+        self._players = self._loadNames("players")
+        self._teams = self._loadNames("teams")
+        self._categories = self._loadNames("categories")
+        self._categoryNormalizer = CategoryNormalizer()
+        self._statCategories = {}
+        self._nextId = {
+            table: self.db.execute(f"SELECT COALESCE(MAX(id), -1) + 1 FROM {table}").fetchone()[0]
+            for table in ("games", "tossups")
+        }
+        self._rows = {table: [] for table in ("games", "game_players", "tossups", "heard", "buzzes", "stat_categories")}
+
+    def _loadNames(self, table: str) -> SymbolTable:
+        names = SymbolTable()
+        for id, name in self.db.execute(f"SELECT id, name FROM {table} ORDER BY id"):
+            if names.intern(name) != id:
+                raise ValueError(f"the {table} table has gaps in its IDs, so it wasn't made by SeasonStore")
+        self._saved[table] = len(names)
+        return names
+
+    def startTournament(self, name: str) -> None:
+        """Picks the tournament that QBJs will be added to.
+
+        If the tournament is already in the database, its games are removed, so that
+        adding all of its QBJs again replaces it rather than counting them twice.
+        """
+        self.db.execute("INSERT OR IGNORE INTO tournaments (name) VALUES (?)", (name,))
+        self._tournamentId = self.db.execute("SELECT id FROM tournaments WHERE name = ?", (name,)).fetchone()[0]
+        games = "SELECT id FROM games WHERE tournament_id = ?"
+        tossups = f"SELECT id FROM tossups WHERE game_id IN ({games})"
+        self.db.execute(f"DELETE FROM heard WHERE tossup_id IN ({tossups})", (self._tournamentId,))
+        self.db.execute(f"DELETE FROM buzzes WHERE tossup_id IN ({tossups})", (self._tournamentId,))
+        self.db.execute(f"DELETE FROM tossups WHERE game_id IN ({games})", (self._tournamentId,))
+        self.db.execute(f"DELETE FROM game_players WHERE game_id IN ({games})", (self._tournamentId,))
+        self.db.execute("DELETE FROM games WHERE tournament_id = ?", (self._tournamentId,))
+
+    def addQBJAndPacket(self, qbj: QBJ, packet: PacketJSON, source: Optional[str] = None) -> None:
+        """Adds a game to the current tournament (see startTournament).
+
+        This derives the same things from the QBJ as Tournament.addQBJAndPacket, but
+        keeps every tossup heard and every buzz as rows instead of adding them up.
+
+        Args:
+            qbj (QBJ): parsed QBJ file
+            packet (PacketJSON): packet that is the one used for the QBJ
+            source (Optional[str]): where the QBJ came from (e.g. its path)
+        """
+        if self._tournamentId is None:
+            raise ValueError("call startTournament() before adding QBJs")
+        gameId = self._newId("games")
+        self._rows["games"].append((gameId, self._tournamentId, source))
+
+        roster: Set[int] = set()
+        for rawTeam in qbj["match_teams"]:
+            teamId = self._teams.intern(rawTeam["team"]["name"])
+            for rawPlayer in rawTeam["match_players"]:
+                playerId = self._players.intern(rawPlayer["player"]["name"])
+                roster.add(playerId)
+                self._rows["game_players"].append((gameId, playerId, teamId, rawPlayer["tossups_heard"]))
+        lineups = MatchLineups(qbj["match_teams"], self._players, self._teams)
+
+        for rawTossup in qbj["match_questions"]:
+            qnIdx = rawTossup["question_number"] - 1 # 1-indexed
+            if qnIdx >= len(packet["tossups"]):
+                self.diagnostics.add(MISSING_TOSSUP, qbj["packets"], source, rawTossup["question_number"])
+                continue
+            packetTossup = packet["tossups"][qnIdx]
+            tossupId = self._newId("tossups")
+            self._rows["tossups"].append((
+                tossupId, gameId, rawTossup["question_number"],
+                packetTossup["question"], packetTossup["answer"],
+                self._categoriesFor(packetTossup["metadata"])[0],
+            ))
+            for teamId, onCourt in lineups.playersFor(rawTossup["question_number"]):
+                self._rows["heard"] += [(tossupId, playerId, teamId) for playerId in onCourt]
+            answer = packetTossup["answer"]
+            gotten = False
+            for rawBuzz in rawTossup["buzzes"]:
+                buzzer = self._players.get(rawBuzz["player"]["name"])
+                if buzzer is None or buzzer not in roster:
+                    self.diagnostics.add(UNKNOWN_BUZZER, rawBuzz["player"]["name"], source, rawTossup["question_number"], answer)
+                    continue
+                points = rawBuzz["result"]["value"]
+                if points > 0:
+                    if gotten:
+                        self.diagnostics.add(MULTIPLE_CORRECT_BUZZES, "", source, rawTossup["question_number"], answer)
+                    gotten = True
+                if points not in (15, 10, -5, 0):
+                    self.diagnostics.add(UNKNOWN_POINT_VALUE, points, source, rawTossup["question_number"], answer)
+                self._rows["buzzes"].append((
+                    tossupId, buzzer, self._teams.intern(rawBuzz["team"]["name"]),
+                    rawBuzz["buzz_position"]["word_index"], points,
+                ))
+
+    def _newId(self, table: str) -> int:
+        id = self._nextId[table]
+        self._nextId[table] += 1
+        return id
+
+    def _categoriesFor(self, metadata: str) -> Tuple[CategoryID, ...]:
+        statCategories = self._statCategories.get(metadata)
+        if statCategories is None:
+            category = self._categoryNormalizer.normalize(metadata)
+            bigCategory = self._categoryNormalizer.bigCategory(category)
+            names = [category] if bigCategory is None else [category, bigCategory]
+            statCategories = tuple(self._categories.intern(c) for c in names + [OVERALL])
+            self._rows["stat_categories"] += [(statCategories[0], c) for c in statCategories]
+            self._statCategories[metadata] = statCategories
+        return statCategories
+
+    def commit(self) -> None:
+        """Saves everything that's been added."""
+        for table, names in (("players", self._players), ("teams", self._teams), ("categories", self._categories)):
+            self.db.executemany(
+                f"INSERT INTO {table} (id, name) VALUES (?, ?)",
+                ((id, names.name(id)) for id in range(self._saved[table], len(names))),
+            )
+            self._saved[table] = len(names)
+        for table, rows in self._rows.items():
+            if len(rows) == 0:
+                continue
+            if table == "tossups":
+                # tossup rows have the question's text and answer in place of its ID; questions are shared between
+                # tournaments, so add the ones that are new, then look up each tossup's question as it's inserted
+                self.db.executemany(
+                    "INSERT OR IGNORE INTO questions (text, answer) VALUES (?, ?)",
+                    dict.fromkeys((row[3], row[4]) for row in rows),
+                )
+                self.db.executemany(
+                    "INSERT INTO tossups VALUES (?, ?, ?, (SELECT id FROM questions WHERE text = ? AND answer = ?), ?)", rows,
+                )
+            else:
+                verb = "INSERT OR IGNORE" if table == "stat_categories" else "INSERT"
+                self.db.executemany(f"{verb} INTO {table} VALUES ({', '.join('?' * len(rows[0]))})", rows)
+            rows.clear()
+        self.db.commit()
+
+    def close(self) -> None:
+        """Closes the database (without saving anything that hasn't been committed)."""
+        self.db.close()
+
+    def _aggregate(
+        self, where: str, params: Sequence[object], tieBreak: str,
+        tournaments: Optional[List[str]], limit: Optional[int]
+    ) -> List[Tuple[int, int, Optional[float], int, int, int, Optional[float]]]:
+        """Runs AGGREGATE_QUERY, giving (player ID, stat category ID, PPTUH, powers, tens, negs, average buzz position) rows."""
+        params = list(params)
+        if tournaments is not None:
+            where += f" AND g.tournament_id IN (SELECT id FROM tournaments WHERE name IN ({', '.join('?' * len(tournaments))}))"
+            params += tournaments
+        query = AGGREGATE_QUERY.format(where=where, tieBreak=tieBreak)
+        if limit is not None:
+            query += f" LIMIT {int(limit)}"
+        # the WHERE clause is in both halves of the query, so its parameters are needed twice
+        return [
+            (playerId, categoryId, (points / heard)*20 if heard != 0 else None, powers, tens, negs, avgPosition)
+            for playerId, categoryId, heard, points, powers, tens, negs, avgPosition in self.db.execute(query, params * 2)
+        ]
+
+    def categoryRows(
+        self, category: str, tournaments: Optional[List[str]] = None, limit: Optional[int] = None
+    ) -> List[NamedStatRow]:
+        """Gets the best players in a category across the season.
+
+        Args:
+            category (str): the category (or OVERALL, or a combined category)
+            tournaments (Optional[List[str]]): only count these tournaments; None means all of them
+            limit (Optional[int]): only get this many of the top players; None means all of them
+
+        Returns:
+            List[NamedStatRow]: the players' stats, best first (ties are in the order players were first added)
+        """
+        categoryId = self._categories.get(category)
+        if categoryId is None:
+            return []
+        # like Tournament, ties go to whoever was added first: here, whoever has the earliest tossup heard
+        firstHeard = "(SELECT MIN(rowid) FROM heard WHERE player_id = k.player_id)"
+        rows = self._aggregate("r.stat_category_id = ?", [categoryId], firstHeard, tournaments, limit)
+        return [(self._players.name(row[0]),) + row[2:] for row in rows]
+
+    def playerRows(self, player: str, tournaments: Optional[List[str]] = None) -> List[NamedStatRow]:
+        """Gets a player's stats in each category across the season.
+
+        Args:
+            player (str): the player's name
+            tournaments (Optional[List[str]]): only count these tournaments; None means all of them
+
+        Returns:
+            List[NamedStatRow]: the player's stats in each category, best first
+        """
+        playerId = self._players.get(player)
+        if playerId is None:
+            return []
+        overall = self._categories.get(OVERALL)
+        tieBreak = f"k.stat_category_id != {-1 if overall is None else overall}, k.stat_category_id"
+        rows = self._aggregate("x.player_id = ?", [playerId], tieBreak, tournaments, None)
+        return [(self._categories.name(row[1]),) + row[2:] for row in rows]
+
+def printRows(label: str, rows: List[NamedStatRow]) -> None:
+    """Prints stats table lines as a plain-text table."""
+    print(f"{label:<40} {'PP20TUH':>8} {'15':>5} {'10':>5} {'-5':>5} {'Avg. buzz':>10}")
+    for name, pptuh, powers, tens, negs, avgPosition in rows:
+        pptuhText = "0" if pptuh is None else str(round(pptuh, 2))
+        avgText = "n/a" if avgPosition is None else str(round(avgPosition, 2))
+        print(f"{name:<40} {pptuhText:>8} {powers:>5} {tens:>5} {negs:>5} {avgText:>10}")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Keeps buzzes from a whole season of tournaments in an SQLite database.")
+    parser.add_argument("db", help="path of the season database (it's created if it doesn't exist)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    add = commands.add_parser("add", help="add a tournament's QBJs (replacing that tournament if it's already there)")
+    add.add_argument("tournament", help="the name of the tournament")
+    add.add_argument("qbjs", nargs="+", help="the .qbj files to load")
+    add.add_argument(
+        "--packets", action="append", metavar="DIR",
+        help="a directory to look for packet .json files in and its subdirectories (default: just the current directory)",
+    )
+    add.add_argument("--fuzzy-packets", action="store_true", help="use close matches for packet names that aren't found")
+    add.add_argument("--packet-cache-size", type=int, default=64)
+    leaderboard = commands.add_parser("leaderboard", help="show the best players in a category")
+    leaderboard.add_argument("category", nargs="?", default=OVERALL, help=f"the category (default: {OVERALL})")
+    leaderboard.add_argument("-n", type=int, default=25, help="how many players to show (default: 25)")
+    player = commands.add_parser("player", help="show a player's stats in each category")
+    player.add_argument("player", help="the player's name")
+    for command in (leaderboard, player):
+        command.add_argument(
+            "--tournament", action="append", metavar="NAME",
+            help="only count this tournament (can be given more than once)",
+        )
+    args = parser.parse_args()
+
+    store = SeasonStore(args.db)
+    try:
+        if args.command == "add":
+            store.startTournament(args.tournament)
+            packets = PacketCache(args.packet_cache_size, PacketIndex(args.packets or ["."], recursive=bool(args.packets), fuzzy=args.fuzzy_packets))
+            loaded = ingestSerial(store, args.qbjs, packets)
+            store.commit()
+            for diagnostics in (store.diagnostics, store.loadDiagnostics):
+                if len(diagnostics) > 0:
+                    print(diagnostics.summary())
+            print(f"=> Added {len(loaded)} QBJ files to {args.tournament}")
+            if len(loaded) < len(args.qbjs):
+                sys.exit(1)
+        elif args.command == "leaderboard":
+            printRows("Player", store.categoryRows(args.category, args.tournament, args.n))
+        else:
+            printRows("Category", store.playerRows(args.player, args.tournament))
+    finally:
+        store.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+# This file contains the sharded output mode. Instead of one big stats page and
+# one big buzzpoints page, it writes a small index page with the navigation on
+# it, and a page for each category, player, and packet that the navigation
+# links to, so a browser only has to load the parts that are being looked at.
+#
+# The pages are rendered by a pool of worker processes, and a page is only
+# rewritten if it's changed, so regenerating the output during a tournament
+# only touches the pages that the new QBJs affected.
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from os import path
+from typing import List, NamedTuple, Optional, Tuple
+from ingest import CHUNKS_PER_JOB
+from profiling import Profiler, phase
+from question import Buzz
+from render import shardPath
+from tournament import Tournament
+
+INDEX = "index.html"
+
+SHARD_KINDS = ("categories", "players", "packets")
+"""The kinds of page besides the index; each kind goes in its own subdirectory."""
+
+Shard = Tuple[str, str]
+"""(kind, name) of a page; see Tournament.shards()"""
+
+class ShardResult(NamedTuple):
+    """What writing the sharded output did."""
+    pages: int
+    """The number of pages in the output (including the index)"""
+    changed: int
+    """The number of pages that were (re)written, because they were new or had changed"""
+    removed: int
+    """The number of pages from an earlier run that were deleted, since they're not in the output anymore"""
+    bytesWritten: int
+
+# each worker process renders from its own copy of the tournament
+_workerTournament: Optional[Tournament] = None
+_workerName = ""
+_workerOutDir = ""
+_workerBuzzes: Optional[List[List[Buzz]]] = None
+
+def writeIfChanged(filePath: str, html: str) -> bool:
+    """Writes a page, unless the file already has exactly that in it.
+
+    Returns:
+        bool: whether the file was written
+    """
+    try:
+        with open(filePath) as f:
+            if f.read() == html:
+                return False
+    except FileNotFoundError:
+        pass
+    with open(filePath, "w") as f:
+        f.write(html)
+    return True
+
+def writeShards(
+    t: Tournament, name: str, outDir: str, shards: List[Shard],
+    buzzesByQuestion: Optional[List[List[Buzz]]] = None
+) -> Tuple[int, int]:
+    """Writes some of a tournament's shard pages (but not the index).
+
+    Args:
+        t (Tournament): the tournament
+        name (str): the name of the tournament, e.g. "ACF Summer 1926 @ U of Q"
+        outDir (str): the directory the index page goes in
+        shards (List[Shard]): which pages to write
+        buzzesByQuestion (Optional[List[List[Buzz]]]): t.buzzesByQuestion(), if it's already been worked out
+
+    Returns:
+        Tuple[int, int]: the number of pages that changed, and how many bytes were written
+    """
+    if buzzesByQuestion is None and any(kind == "packets" for kind, _ in shards):
+        buzzesByQuestion = t.buzzesByQuestion()
+    changed = 0
+    bytesWritten = 0
+    for kind, shard in shards:
+        html = "".join(t.iterShardHTML(name, kind, shard, buzzesByQuestion))
+        if writeIfChanged(path.join(outDir, shardPath(kind, shard)), html):
+            changed += 1
+            bytesWritten += len(html.encode())
+    return changed, bytesWritten
+
+def _initWorker(t: Tournament, name: str, outDir: str) -> None:
+    global _workerTournament, _workerName, _workerOutDir, _workerBuzzes
+    _workerTournament = t
+    _workerName = name
+    _workerOutDir = outDir
+    _workerBuzzes = t.buzzesByQuestion()
+
+def _writeChunk(shards: List[Shard]) -> Tuple[int, int]:
+    """Worker entry point: writes some shard pages."""
+    assert _workerTournament is not None
+    return writeShards(_workerTournament, _workerName, _workerOutDir, shards, _workerBuzzes)
+
+def writeShardedPages(t: Tournament, name: str, outDir: str, jobs: int = 1, profiler: Optional[Profiler] = None) -> ShardResult:
+    """Writes a tournament's pages as an index page plus a page for each category, player, and packet.
+
+    The index goes in `outDir`/index.html, and the other pages in subdirectories
+    of `outDir` (see render.shardPath). Pages from an earlier run that aren't
+    part of the output anymore (e.g. for a player who's since been renamed) are
+    deleted.
+
+    Args:
+        t (Tournament): the tournament
+        name (str): the name of the tournament, e.g. "ACF Summer 1926 @ U of Q"
+        outDir (str): the directory to write the pages to
+        jobs (int): the number of worker processes to render the pages with
+        profiler (Optional[Profiler]): if set, what to record timings and counts with
+
+    Returns:
+        ShardResult: how many pages there are, and how many were written or removed
+    """
+    with phase(profiler, "shard index"):
+        shards = t.shards()
+        expected = {shardPath(kind, shard) for kind, shard in shards}
+        for kindDir in sorted({path.dirname(p) for p in expected}):
+            os.makedirs(path.join(outDir, kindDir), exist_ok=True)
+        html = "".join(t.iterShardIndexHTML(name))
+        changed = 0
+        bytesWritten = 0
+        if writeIfChanged(path.join(outDir, INDEX), html):
+            changed += 1
+            bytesWritten += len(html.encode())
+
+    with phase(profiler, "shard pages"):
+        if jobs <= 1 or len(shards) <= 1:
+            results = [writeShards(t, name, outDir, shards)]
+        else:
+            # deal the pages out round-robin, since a packet's page takes much longer than a player's
+            numChunks = min(len(shards), jobs * CHUNKS_PER_JOB)
+            chunks = [shards[i::numChunks] for i in range(numChunks)]
+            with ProcessPoolExecutor(max_workers=jobs, initializer=_initWorker, initargs=(t, name, outDir)) as pool:
+                results = list(pool.map(_writeChunk, chunks))
+        for chunkChanged, chunkBytes in results:
+            changed += chunkChanged
+            bytesWritten += chunkBytes
+
+    removed = 0
+    for kind in SHARD_KINDS:
+        kindDir = path.join(outDir, kind)
+        if not path.isdir(kindDir):
+            continue
+        for fileName in sorted(os.listdir(kindDir)):
+            if fileName.endswith(".html") and f"{kind}/{fileName}" not in expected:
+                os.remove(path.join(kindDir, fileName))
+                removed += 1
+
+    if profiler is not None:
+        profiler.count("pages written", changed)
+        profiler.count("bytes written", bytesWritten)
+    return ShardResult(len(shards) + 1, changed, removed, bytesWritten)
@@ -0,0 +1,123 @@
+# This file contains buzz position distributions. Each one is a histogram with
+# a fixed number of buckets over word index, so it takes the same (small)
+# amount of memory no matter how many buzzes go into it, and two of them can be
+# merged by adding up their buckets. Quantiles are read off the histogram, so
+# they're accurate to within a bucket.
+
+from array import array
+from typing import Dict, Iterable, Optional, Sequence
+from ids import CategoryID, PlayerID
+
+BUCKET_WIDTH = 5
+"""How many words each bucket covers."""
+
+NUM_BUCKETS = 40
+"""How many buckets there are; buzzes past the end of the last one are counted in it."""
+
+class PositionHistogram:
+    """The distribution of some buzz positions."""
+
+    __slots__ = ("counts", "total")
+
+    counts: "array[int]"
+    """The number of buzzes in each bucket."""
+
+    total: int
+
+    def __init__(self) -> None:
+        self.counts = array('q', bytes(8 * NUM_BUCKETS))
+        self.total = 0
+
+    def add(self, position: int) -> None:
+        """Records a buzz at a word index."""
+        self.counts[min(max(position, 0) // BUCKET_WIDTH, NUM_BUCKETS - 1)] += 1
+        self.total += 1
+
+    def merge(self, other: "PositionHistogram") -> None:
+        """Adds another histogram's buzzes to this one."""
+        for bucket, count in enumerate(other.counts):
+            self.counts[bucket] += count
+        self.total += other.total
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimates the word index that a fraction `q` of the buzzes came at or before.
+
+        The estimate assumes buzzes are spread evenly within each bucket.
+
+        Args:
+            q (float): the fraction, between 0 and 1 (e.g. 0.5 for the median)
+
+        Returns:
+            Optional[float]: the estimated word index, or None if there are no buzzes
+        """
+        if self.total == 0:
+            return None
+        target = q * self.total
+        seen = 0
+        for bucket, count in enumerate(self.counts):
+            if count > 0 and seen + count >= target:
+                return bucket * BUCKET_WIDTH + BUCKET_WIDTH * max(target - seen, 0) / count
+            seen += count
+        return float(NUM_BUCKETS * BUCKET_WIDTH)
+
+    def toHTML(self) -> str:
+        """Draws the histogram as a little bar chart (see the .histogram style in template.html and buzzpts_template.html)."""
+        # leave off empty buckets at the end, so short tossups don't get a long flat tail
+        last = max((bucket for bucket, count in enumerate(self.counts) if count > 0), default=-1)
+        tallest = max(self.counts) or 1
+        bars = []
+        for bucket in range(last + 1):
+            count = self.counts[bucket]
+            start = bucket * BUCKET_WIDTH
+            end = "+" if bucket == NUM_BUCKETS - 1 else f"-{start + BUCKET_WIDTH - 1}"
+            bars.append(
+                f"<span style='height:{round(100 * count / tallest)}%' title='words {start}{end}: {count}'></span>"
+            )
+        return f"<span class='histogram'>{''.join(bars)}</span>"
+
+class PositionDistributions:
+    """Where each player, and the players in each category, got tossups."""
+
+    byPlayer: Dict[PlayerID, PositionHistogram]
+    """Each player's gets, over every category."""
+
+    byCategory: Dict[CategoryID, PositionHistogram]
+    """Every player's gets in each category (and OVERALL)."""
+
+    def __init__(self) -> None:
+        self.byPlayer = {}
+        self.byCategory = {}
+
+    def addGet(self, player: PlayerID, categories: Iterable[CategoryID], position: int) -> None:
+        """Records a get.
+
+        Args:
+            player (PlayerID): the player who got the tossup
+            categories (Iterable[CategoryID]): the categories the tossup counts towards
+            position (int): the word index of the buzz
+        """
+        histogram = self.byPlayer.get(player)
+        if histogram is None:
+            histogram = self.byPlayer[player] = PositionHistogram()
+        histogram.add(position)
+        for category in categories:
+            histogram = self.byCategory.get(category)
+            if histogram is None:
+                histogram = self.byCategory[category] = PositionHistogram()
+            histogram.add(position)
+
+    def merge(self, other: "PositionDistributions", playerIds: Sequence[PlayerID], categoryIds: Sequence[CategoryID]) -> None:
+        """Adds another (partial) tournament's distributions to these.
+
+        Args:
+            other (PositionDistributions): the distributions to merge in
+            playerIds (Sequence[PlayerID]): our ID for each of `other`'s player IDs
+            categoryIds (Sequence[CategoryID]): our ID for each of `other`'s category IDs
+        """
+        for mine, theirs, ids in ((self.byPlayer, other.byPlayer, playerIds), (self.byCategory, other.byCategory, categoryIds)):
+            for id, histogram in theirs.items():
+                ours = mine.get(ids[id])
+                if ours is None:
+                    mine[ids[id]] = histogram
+                else:
+                    ours.merge(histogram)
@@ -0,0 +1,242 @@
+# This file contains tournament snapshots: a Tournament saved to disk along with
+# a manifest of the QBJ and packet files it was built from. During a live
+# tournament, each rerun only has to load the QBJs that have come in since the
+# last one.
+
+import hashlib
+import os
+import pickle
+from os import path
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+from diagnostics import Diagnostics
+from ingest import LoadedQBJ, ingestParallel, ingestSerial
+from packets import PacketCache
+from profiling import Profiler, phase
+from tournament import Tournament
+
+SNAPSHOT_VERSION = 14
+"""Bump this whenever a change to Tournament makes old snapshots unusable."""
+
+PacketSearch = Optional[Tuple[Tuple[str, ...], bool, bool]]
+"""Where packets are looked for: (resolved search directories, whether their subdirectories are searched, whether close matches are used), or None for next to each QBJ."""
+
+def packetSearch(packets: PacketCache) -> PacketSearch:
+    """Gets where a packet cache looks for packets, so that a snapshot made with different packets isn't reused."""
+    if packets.index is None:
+        return None
+    return (tuple(path.realpath(searchDir) for searchDir in packets.index.searchDirs), packets.index.recursive, packets.index.fuzzy)
+
+class FileRecord(NamedTuple):
+    """What a file looked like when it was loaded."""
+    size: int
+    mtime: int
+    """Modification time in nanoseconds"""
+    sha256: str
+
+def recordFile(filePath: str) -> FileRecord:
+    """Gets the size, modification time, and content hash of a file."""
+    info = os.stat(filePath)
+    digest = hashlib.sha256()
+    with open(filePath, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return FileRecord(info.st_size, info.st_mtime_ns, digest.hexdigest())
+
+def isUnchanged(filePath: str, record: FileRecord) -> bool:
+    """Checks whether a file still has the contents it had when it was recorded.
+
+    The file is only hashed if its size or modification time have changed.
+    """
+    try:
+        info = os.stat(filePath)
+    except FileNotFoundError:
+        return False
+    if info.st_size == record.size and info.st_mtime_ns == record.mtime:
+        return True
+    return info.st_size == record.size and recordFile(filePath).sha256 == record.sha256
+
+class Snapshot:
+    """A tournament, plus a manifest of the files it was built from."""
+
+    version: int
+    tournament: Tournament
+
+    qbjs: Dict[str, FileRecord]
+    """The QBJs that have been loaded into the tournament (by resolved path), in the order they were loaded."""
+
+    packets: Dict[str, FileRecord]
+    """The packets those QBJs were loaded with (by resolved path)."""
+
+    packetSearch: PacketSearch
+    """Where packets were looked for."""
+
+    failed: Set[str]
+    """The QBJs (by resolved path) that were tried but couldn't be loaded."""
+
+    def __init__(self, tournament: Tournament, packetSearch: PacketSearch) -> None:
+        self.version = SNAPSHOT_VERSION
+        self.tournament = tournament
+        self.qbjs = {}
+        self.packets = {}
+        self.packetSearch = packetSearch
+        self.failed = set()
+
+    def record(self, attempted: List[str], loaded: List[LoadedQBJ]) -> None:
+        """Adds QBJs that have been loaded into the tournament to the manifest.
+
+        Args:
+            attempted (List[str]): the QBJs that were tried
+            loaded (List[LoadedQBJ]): the ones that were loaded, in the order they were loaded
+        """
+        self.failed.update(path.realpath(p) for p in attempted)
+        for qbjPath, packetPath in loaded:
+            self.failed.discard(path.realpath(qbjPath))
+            self.qbjs[path.realpath(qbjPath)] = recordFile(qbjPath)
+            packetPath = path.realpath(packetPath)
+            if packetPath not in self.packets:
+                self.packets[packetPath] = recordFile(packetPath)
+
+    def staleReason(self, qbjPaths: List[str], statsBackend: str, packetSearch: PacketSearch) -> Optional[str]:
+        """Checks whether the tournament can be added to, rather than being rebuilt.
+
+        QBJs can't be taken back out of a tournament, so the snapshot is only usable
+        if every file it was built from is still there and hasn't changed, and
+        the QBJs it has are in the same order at the start of `qbjPaths` (with
+        nothing new before them), so that adding the rest gives the same
+        tournament as loading them all in order. QBJs that couldn't be loaded may
+        be skipped over; see skippedQBJs().
+
+        Args:
+            qbjPaths (List[str]): every QBJ that should be in the tournament, in order
+            statsBackend (str): the stats backend that should be used
+            packetSearch (PacketSearch): where packets should be looked for
+
+        Returns:
+            Optional[str]: why the snapshot can't be used, or None if it can
+        """
+        if self.version != SNAPSHOT_VERSION:
+            return f"it was made by a different version of QBJtool (snapshot version {self.version}, expected {SNAPSHOT_VERSION})"
+        if self.tournament.stats.name != statsBackend:
+            return f"it uses the '{self.tournament.stats.name}' stats backend"
+        if self.packetSearch != packetSearch:
+            return "packets were looked for in different places"
+        positions = self._positions(qbjPaths)
+        lastPosition = -1
+        for qbjPath, record in self.qbjs.items():
+            if qbjPath not in positions:
+                return f"{qbjPath} isn't in the list of QBJs anymore"
+            if positions[qbjPath] < lastPosition:
+                return f"{qbjPath} is in a different place in the list of QBJs"
+            lastPosition = positions[qbjPath]
+            if not isUnchanged(qbjPath, record):
+                return f"{qbjPath} has changed"
+        for qbjPath, position in positions.items():
+            if position < lastPosition and qbjPath not in self.qbjs and qbjPath not in self.failed:
+                return f"{qbjPath} is new, and comes before QBJs that are already loaded"
+        for packetPath, record in self.packets.items():
+            if not isUnchanged(packetPath, record):
+                return f"{packetPath} has changed"
+        return None
+
+    @staticmethod
+    def _positions(qbjPaths: List[str]) -> Dict[str, int]:
+        """Gets where each QBJ (by resolved path) first comes in a list."""
+        positions: Dict[str, int] = {}
+        for i, qbjPath in enumerate(qbjPaths):
+            positions.setdefault(path.realpath(qbjPath), i)
+        return positions
+
+    def _loadedUpTo(self, qbjPaths: List[str]) -> int:
+        """Gets the position in `qbjPaths` of the last QBJ that's been loaded (or -1 if there are none)."""
+        positions = self._positions(qbjPaths)
+        return max((positions[qbjPath] for qbjPath in self.qbjs), default=-1)
+
+    def skippedQBJs(self, qbjPaths: List[str]) -> List[str]:
+        """Gets the QBJs that couldn't be loaded last time, and come before ones that were.
+
+        If any of them can be loaded now, the snapshot has to be rebuilt, since
+        they'd have to go in the middle of the tournament.
+        """
+        return [p for p in qbjPaths[:self._loadedUpTo(qbjPaths) + 1] if path.realpath(p) not in self.qbjs]
+
+    def newQBJs(self, qbjPaths: List[str]) -> List[str]:
+        """Gets the QBJs after the ones that have been loaded into the tournament, in the given order."""
+        return [p for p in qbjPaths[self._loadedUpTo(qbjPaths) + 1:] if path.realpath(p) not in self.qbjs]
+
+    def save(self, snapshotPath: str) -> None:
+        """Saves the snapshot to disk (replacing any existing file only once it's completely written)."""
+        tmpPath = snapshotPath + ".tmp"
+        with open(tmpPath, "wb") as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmpPath, snapshotPath)
+
+    @staticmethod
+    def load(snapshotPath: str) -> "Snapshot":
+        """Loads a snapshot that was saved with save().
+
+        Snapshots are pickles, so only load ones you made yourself!
+        """
+        with open(snapshotPath, "rb") as f:
+            snapshot = pickle.load(f)
+        if not isinstance(snapshot, Snapshot):
+            raise ValueError(f"{snapshotPath} isn't a QBJtool snapshot")
+        return snapshot
+
+def ingestWithSnapshot(
+    snapshotPath: str, qbjPaths: List[str], jobs: int, packets: PacketCache, statsBackend: str,
+    profiler: Optional[Profiler] = None
+) -> Snapshot:
+    """Loads QBJs into a tournament, reusing (and then updating) a saved snapshot.
+
+    If the snapshot exists, nothing it was built from has changed, and the QBJs
+    in it come first in `qbjPaths` (see Snapshot.staleReason), only the QBJs
+    after them are loaded; otherwise the tournament is rebuilt from scratch.
+    Either way the result is the same as loading every QBJ into a new
+    tournament in order.
+
+    Args:
+        snapshotPath (str): where the snapshot is saved
+        qbjPaths (List[str]): every QBJ that should be in the tournament, in order
+        jobs (int): the number of worker processes to load QBJs with
+        packets (PacketCache): where to load packets from
+        statsBackend (str): which stats backend the tournament should use
+        profiler (Optional[Profiler]): if set, what to record timings and counts with
+
+    Returns:
+        Snapshot: the updated snapshot (which has already been saved)
+    """
+    snapshot: Optional[Snapshot] = None
+    if path.exists(snapshotPath):
+        try:
+            snapshot = Snapshot.load(snapshotPath)
+        except Exception as e:
+            print(f"Warning: couldn't load snapshot {snapshotPath} ({e}); rebuilding from scratch")
+        if snapshot is not None:
+            reason = snapshot.staleReason(qbjPaths, statsBackend, packetSearch(packets))
+            if reason is not None:
+                print(f"Can't reuse snapshot {snapshotPath} because {reason}; rebuilding from scratch")
+                snapshot = None
+
+    # QBJs that couldn't be loaded last time are tried again, and will say so again if they still can't be
+    loadDiagnostics = Diagnostics()
+    if snapshot is not None:
+        skipped = snapshot.skippedQBJs(qbjPaths)
+        if len(skipped) > 0:
+            # try them on the side, since if they can be loaded now, they have to go before QBJs that already are
+            scratch = Tournament(statsBackend)
+            if len(ingestSerial(scratch, skipped, packets)) > 0:
+                print(f"Can't reuse snapshot {snapshotPath} because QBJs that couldn't be loaded before can be now; rebuilding from scratch")
+                snapshot = None
+            else:
+                loadDiagnostics = scratch.loadDiagnostics
+    if snapshot is None:
+        snapshot = Snapshot(Tournament(statsBackend), packetSearch(packets))
+    else:
+        snapshot.tournament.loadDiagnostics = loadDiagnostics
+
+    newQBJs = snapshot.newQBJs(qbjPaths)
+    print(f"Snapshot has {len(snapshot.qbjs)} QBJs already; loading {len(newQBJs)} new ones")
+    snapshot.record(newQBJs, ingestParallel(snapshot.tournament, newQBJs, jobs, packets, profiler))
+    with phase(profiler, "save snapshot"):
+        snapshot.save(snapshotPath)
+    return snapshot
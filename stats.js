@@ -0,0 +1,79 @@
+// Renders the "best players in each category" and "best categories for each
+// player" tables of the stats page in the browser, from the data QBJtool puts
+// in the page (see Tournament.statsData). The tables come out the same as the
+// ones QBJtool renders itself, including the order of ties.
+(function () {
+    var data = JSON.parse(document.getElementById("stats-data").textContent);
+    var cells = data.cells;
+    var numCells = cells.player.length;
+
+    function toID(s) {
+        return s.toLowerCase().trim().replace(/ /g, "-").replace(/<\/?[a-z]*\/?>/g, "");
+    }
+
+    // round(x, 2) the way Python does it: exact halves (which are only possible
+    // for multiples of 1/8) go to the even side
+    function round2(x) {
+        var scaled = x * 100;
+        var floor = Math.floor(scaled);
+        if (Number.isInteger(x * 8) && scaled - floor === 0.5) {
+            return (floor % 2 === 0 ? floor : floor + 1) / 100;
+        }
+        return Number(x.toFixed(2));
+    }
+
+    // str() of a Python float
+    function formatFloat(x) {
+        if (Object.is(x, -0)) {
+            return "-0.0";
+        }
+        return Number.isInteger(x) ? x.toFixed(1) : String(x);
+    }
+
+    function row(cell, label) {
+        var heard = cells.tossupsHeard[cell];
+        var gets = cells.buzzCount[cell];
+        var pptuh = heard === 0 ? null : (cells.points[cell] / heard) * 20;
+        var avgBuzzPosition = gets === 0 ? null : cells.buzzPositionSum[cell] / gets;
+        return {
+            key: round2(pptuh || 0),
+            html: "<tr><td>" + label + "</td>" +
+                "<td>" + (pptuh === null ? "0" : formatFloat(round2(pptuh))) + "</td>" +
+                "<td>" + cells.tens[cell] + "</td>" +
+                "<td>" + cells.negs[cell] + "</td>" +
+                "<td>" + (avgBuzzPosition === null ? "n/a" : formatFloat(round2(avgBuzzPosition))) + "</td></tr>",
+        };
+    }
+
+    function table(id, heading, up, firstColumn, pointsColumn, rows) {
+        // cells are already in tie order, and sort() is stable
+        rows.sort(function (a, b) { return b.key - a.key; });
+        return '<h2 id="' + id + '">' + heading + " " +
+            '<small><small><small><a href="' + up + '">&#x21A9;</a></small></small></small></h2>' +
+            '<table data-sortable class="sortable-theme-bootstrap"><thead><tr>' +
+            "<th>" + firstColumn + "</th><th>" + pointsColumn + "</th><th>+10</th><th>-5</th>" +
+            "<th>Average buzz position</th></thead>" +
+            rows.map(function (r) { return r.html; }).join("") + "</table>";
+    }
+
+    var cellsOfCategory = data.categories.map(function () { return []; });
+    var cellsOfPlayer = data.players.map(function () { return []; });
+    for (var cell = 0; cell < numCells; cell++) {
+        cellsOfCategory[cells.category[cell]].push(cell);
+        cellsOfPlayer[cells.player[cell]].push(cell);
+    }
+
+    document.getElementById("bycat-tables").innerHTML = data.tables.map(function (category) {
+        var name = data.categories[category];
+        var rows = cellsOfCategory[category].map(function (c) { return row(c, data.players[cells.player[c]]); });
+        return table(toID(name), name, "#bycat", "Player", name + " points/20 TUs", rows);
+    }).join("");
+
+    var playerTables = [];
+    for (var player = 0; player < data.listedPlayers; player++) {
+        var name = data.players[player];
+        var rows = cellsOfPlayer[player].map(function (c) { return row(c, data.categories[cells.category[c]]); });
+        playerTables.push(table(toID(name), name, "#byplayer", "Category", "points/20 TUs", rows));
+    }
+    document.getElementById("byplayer-tables").innerHTML = playerTables.join("");
+})();
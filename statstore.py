@@ -0,0 +1,600 @@
+# This file contains the backends for storing each player's statistics in each
+# category. The default one keeps a PlayerCatStat object per (roster entry, category);
+# the columnar one keeps every statistic in a flat array instead, which takes
+# much less memory for big (e.g. whole-season) aggregates.
+
+import abc
+import heapq
+from array import array
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Type
+from typing_extensions import Self
+from ids import Category, CategoryID, PlayerID, RosterID, TeamID
+
+try:
+    import numpy as np
+except ImportError:
+    # numpy is only used to speed up the columnar backend; it works without it
+    np = None # type: ignore
+
+OVERALL: Category = "Overall"
+"""The pseudo-category that every tossup counts towards."""
+
+StatRow = Tuple[int, Optional[float], int, int, int, Optional[float]]
+"""A line of a stats table: (player or category ID, points per 20 tossups heard, powers, tens, negs, average buzz position).
+
+Points per 20 tossups heard is None if no tossups were heard, and average buzz position is None if there were no gets.
+"""
+
+NamedStatRow = Tuple[str, Optional[float], int, int, int, Optional[float]]
+"""A StatRow with the player or category ID replaced by its name."""
+
+def rankRows(rows: List[StatRow], tieBreaks: Sequence[int], limit: Optional[int] = None) -> List[StatRow]:
+    """Sorts stats table lines by points per 20 tossups heard, highest first.
+
+    If only the top few lines are wanted, they're picked out with a heap rather
+    than sorting everything.
+
+    Args:
+        rows (List[StatRow]): the lines to sort
+        tieBreaks (Sequence[int]): the lines with the lowest of these come first when (rounded) PPTUH is tied
+        limit (Optional[int]): how many lines to return; None means all of them
+
+    Returns:
+        List[StatRow]: the top lines, in order
+    """
+    key = lambda i: (-round(rows[i][1] or 0, 2), tieBreaks[i])
+    if limit is None or limit >= len(rows):
+        order = sorted(range(len(rows)), key=key)
+    else:
+        order = heapq.nsmallest(limit, range(len(rows)), key=key)
+    return [rows[i] for i in order]
+
+class PlayerCatStat:
+    """A player's statistics in a category.
+
+    Only the sum and count of buzz positions are kept; where players buzzed is
+    tracked in more detail by sketches.PositionDistributions.
+    """
+
+    __slots__ = ("points", "powers", "tens", "negs", "tossupsHeard", "buzzPositionSum", "buzzCount")
+
+    points: int
+    """The number of points the player has earned in this category."""
+    powers: int
+    """The number of +15 pts the player has earned in this category."""
+    tens: int
+    """The number of +10 pts the player has earned in this category."""
+    negs: int
+    """The number of tossups the player has incorrectly answered in this category."""
+    tossupsHeard: int
+    buzzPositionSum: int
+    """The total of the word indexes of the player's gets in this category."""
+    buzzCount: int
+    """The number of gets the player has in this category."""
+
+    def __init__(self) -> None:
+        """Default initialization w/ no questions"""
+        self.points = 0
+        self.powers = 0
+        self.tens = 0
+        self.negs = 0
+        self.tossupsHeard = 0
+        self.buzzPositionSum = 0
+        self.buzzCount = 0
+
+    def __str__(self) -> str:
+        averageBuzzPosition = "n/a" if self.buzzCount == 0 else round(self.buzzPositionSum / self.buzzCount, 2)
+        return f"Points: {self.points} ({self.powers}/{self.tens}/{self.negs}), average buzz position: {averageBuzzPosition}"
+    def __repr__(self) -> str:
+        return f"'{str(self)}'"
+
+    def addGet(self, position: int) -> None:
+        """Records the position of a get."""
+        self.buzzPositionSum += position
+        self.buzzCount += 1
+
+    def __add__(self, other: Self):
+        new = PlayerCatStat()
+        new += self
+        new += other
+        return new
+
+    def __iadd__(self, other: Self) -> Self:
+        self.points += other.points
+        self.powers += other.powers
+        self.tens += other.tens
+        self.negs += other.negs
+        self.tossupsHeard += other.tossupsHeard
+        self.buzzPositionSum += other.buzzPositionSum
+        self.buzzCount += other.buzzCount
+        return self
+
+    def row(self, id: int) -> StatRow:
+        """Gets this stat as a line of a stats table, labeled with a player or category ID."""
+        pptuh = None
+        if self.tossupsHeard != 0:
+            pptuh = (self.points / self.tossupsHeard)*20
+        avgBuzzPosition = None
+        if self.buzzCount > 0:
+            avgBuzzPosition = self.buzzPositionSum / self.buzzCount
+        return (id, pptuh, self.powers, self.tens, self.negs, avgBuzzPosition)
+
+class StatStore(abc.ABC):
+    """Where a tournament keeps its players' statistics in each category.
+
+    Stats are kept for each roster entry: a player playing for a particular
+    team. A player's stats are their roster entries' stats added up, and a
+    team's are its roster entries' stats added up, so a player who played for
+    more than one team only counts towards each team for the matches they
+    played for it.
+
+    Players, teams, and categories are identified by the IDs their Tournament
+    gave them. Every update names the categories it counts towards, which will
+    usually include OVERALL.
+    """
+
+    name = ""
+    """The name of the backend, for the --stats-backend option."""
+
+    rosters: List[Tuple[TeamID, PlayerID]]
+    """The (team, player) of each roster ID."""
+
+    _rosterIds: Dict[Tuple[TeamID, PlayerID], RosterID]
+
+    def __init__(self) -> None:
+        self.rosters = []
+        self._rosterIds = {}
+
+    def rosterId(self, team: TeamID, player: PlayerID) -> RosterID:
+        """Gets the roster ID of a player playing for a team, handing out the next one if it's new."""
+        rosterId = self._rosterIds.get((team, player))
+        if rosterId is None:
+            rosterId = self._rosterIds[(team, player)] = len(self.rosters)
+            self.rosters.append((team, player))
+        return rosterId
+
+    def _mergeRosters(self, other: Self, playerIds: Sequence[PlayerID], teamIds: Sequence[TeamID]) -> List[RosterID]:
+        """Gets this store's roster ID for each of another store's roster IDs."""
+        return [self.rosterId(teamIds[team], playerIds[player]) for team, player in other.rosters]
+
+    @abc.abstractmethod
+    def addTossupHeard(self, roster: RosterID, categories: Sequence[CategoryID]) -> None:
+        """Records that a player heard a tossup.
+
+        Args:
+            roster (RosterID): the player who heard the tossup, and the team they were playing for
+            categories (Sequence[CategoryID]): the categories the tossup counts towards
+        """
+
+    @abc.abstractmethod
+    def addBuzz(self, roster: RosterID, categories: Sequence[CategoryID], points: int, position: int) -> None:
+        """Records a player's buzz on a tossup.
+
+        Args:
+            roster (RosterID): the player who buzzed, and the team they were playing for
+            categories (Sequence[CategoryID]): the categories the tossup counts towards
+            points (int): the number of points the buzz earned
+            position (int): the word index of the buzz
+        """
+
+    @abc.abstractmethod
+    def players(self) -> List[PlayerID]:
+        """Gets every player who has stats, in the order they got them."""
+
+    @abc.abstractmethod
+    def categoryPlayers(self, category: CategoryID) -> List[PlayerID]:
+        """Gets every player who has stats in a category, in the order they got them."""
+
+    @abc.abstractmethod
+    def categoryRows(self, category: CategoryID, limit: Optional[int] = None) -> List[StatRow]:
+        """Gets the stats table for a category: one line per player with stats in it.
+
+        Lines are labeled with player IDs, and sorted with rankRows; ties are in
+        the order the players first got stats.
+
+        Args:
+            category (CategoryID): the category
+            limit (Optional[int]): only get this many of the top lines; None means all of them
+        """
+
+    @abc.abstractmethod
+    def playerRows(self, player: PlayerID, categories: List[CategoryID]) -> List[StatRow]:
+        """Gets the stats table for a player: one line per category they have stats in.
+
+        Lines are labeled with category IDs, and sorted with rankRows; ties are in the order of `categories`.
+
+        Args:
+            player (PlayerID): the player
+            categories (List[CategoryID]): which categories to include
+        """
+
+    @abc.abstractmethod
+    def playerStats(self, player: PlayerID) -> Dict[CategoryID, PlayerCatStat]:
+        """Gets a player's stats in each category they have any in.
+
+        The stats may be shared with the store, so they mustn't be modified.
+        """
+
+    @abc.abstractmethod
+    def teamTotals(self, category: CategoryID) -> Dict[TeamID, PlayerCatStat]:
+        """Adds up each team's stats in a category.
+
+        The totals are new objects, so they can be modified.
+
+        Returns:
+            Dict[TeamID, PlayerCatStat]: the totals for each team with any stats in the category
+        """
+
+    @abc.abstractmethod
+    def merge(
+        self, other: Self, playerIds: Sequence[PlayerID], teamIds: Sequence[TeamID], categoryIds: Sequence[CategoryID]
+    ) -> None:
+        """Adds another store's stats to this one's. `other` shouldn't be used afterwards.
+
+        Args:
+            other (Self): the store to merge in
+            playerIds (Sequence[PlayerID]): this store's ID for each of `other`'s player IDs
+            teamIds (Sequence[TeamID]): this store's ID for each of `other`'s team IDs
+            categoryIds (Sequence[CategoryID]): this store's ID for each of `other`'s category IDs
+        """
+
+def _addUp(stats: Iterable[Tuple[int, PlayerCatStat]]) -> Dict[int, PlayerCatStat]:
+    """Adds up stats by key, keeping the first one for each key as-is if it's the only one."""
+    totals: Dict[int, PlayerCatStat] = {}
+    for key, stat in stats:
+        total = totals.get(key)
+        totals[key] = stat if total is None else total + stat
+    return totals
+
+class DictStatStore(StatStore):
+    """Stores a PlayerCatStat for every (roster entry, category) pair."""
+
+    name = "dict"
+
+    byRoster: Dict[RosterID, Dict[CategoryID, PlayerCatStat]]
+
+    byCategory: Dict[CategoryID, Dict[RosterID, PlayerCatStat]]
+    """The same stats as byRoster, indexed the other way around."""
+
+    _rostersOfPlayer: Dict[PlayerID, List[RosterID]]
+    """Each player's roster entries that have stats, in the order they got them."""
+
+    _playerOrder: Dict[PlayerID, int]
+    """The order in which players first got stats."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.byRoster = {}
+        self.byCategory = {}
+        self._rostersOfPlayer = {}
+        self._playerOrder = {}
+
+    def _stat(self, roster: RosterID, category: CategoryID) -> PlayerCatStat:
+        if roster not in self.byRoster:
+            self.byRoster[roster] = {}
+            player = self.rosters[roster][1]
+            if player not in self._playerOrder:
+                self._playerOrder[player] = len(self._playerOrder)
+                self._rostersOfPlayer[player] = []
+            self._rostersOfPlayer[player].append(roster)
+        if category not in self.byRoster[roster]:
+            stat = PlayerCatStat()
+            self.byRoster[roster][category] = stat
+            if category not in self.byCategory:
+                self.byCategory[category] = {}
+            self.byCategory[category][roster] = stat
+        return self.byRoster[roster][category]
+
+    def addTossupHeard(self, roster: RosterID, categories: Sequence[CategoryID]) -> None:
+        for category in categories:
+            self._stat(roster, category).tossupsHeard += 1
+
+    def addBuzz(self, roster: RosterID, categories: Sequence[CategoryID], points: int, position: int) -> None:
+        for category in categories:
+            toUpdate = self._stat(roster, category)
+            toUpdate.points += points
+            if points == 15:
+                toUpdate.powers += 1
+            elif points == 10:
+                toUpdate.tens += 1
+            elif points == -5:
+                toUpdate.negs += 1
+
+            if points > 0:
+                toUpdate.addGet(position)
+
+    def players(self) -> List[PlayerID]:
+        return list(self._playerOrder)
+
+    def categoryPlayers(self, category: CategoryID) -> List[PlayerID]:
+        return list(dict.fromkeys(self.rosters[roster][1] for roster in self.byCategory.get(category, {})))
+
+    def categoryRows(self, category: CategoryID, limit: Optional[int] = None) -> List[StatRow]:
+        stats = _addUp((self.rosters[roster][1], stat) for roster, stat in self.byCategory.get(category, {}).items())
+        rows = [stat.row(player) for player, stat in stats.items()]
+        return rankRows(rows, [self._playerOrder[player] for player in stats], limit)
+
+    def playerRows(self, player: PlayerID, categories: List[CategoryID]) -> List[StatRow]:
+        cats = self.playerStats(player)
+        rows = [cats[category].row(category) for category in categories if category in cats]
+        return rankRows(rows, range(len(rows)))
+
+    def playerStats(self, player: PlayerID) -> Dict[CategoryID, PlayerCatStat]:
+        rosters = self._rostersOfPlayer.get(player, [])
+        if len(rosters) == 1:
+            return self.byRoster[rosters[0]]
+        return _addUp(item for roster in rosters for item in self.byRoster[roster].items())
+
+    def teamTotals(self, category: CategoryID) -> Dict[TeamID, PlayerCatStat]:
+        totals: Dict[TeamID, PlayerCatStat] = {}
+        for roster, stat in self.byCategory.get(category, {}).items():
+            team = self.rosters[roster][0]
+            if team not in totals:
+                totals[team] = PlayerCatStat()
+            totals[team] += stat
+        return totals
+
+    def merge(
+        self, other: Self, playerIds: Sequence[PlayerID], teamIds: Sequence[TeamID], categoryIds: Sequence[CategoryID]
+    ) -> None:
+        rosterIds = self._mergeRosters(other, playerIds, teamIds)
+        for roster, otherCats in other.byRoster.items():
+            for category, stat in otherCats.items():
+                ours = self._stat(rosterIds[roster], categoryIds[category])
+                ours += stat
+
+class ColumnarStatStore(StatStore):
+    """Stores every statistic in flat arrays, indexed by (roster entry, category) cell.
+
+    Each (roster entry, category) pair that has any stats gets a cell number.
+    Only the sum and count of buzz positions are kept, not every position. If
+    numpy is installed, tables are computed with vectorized operations over the
+    arrays, and cells are added up by player or team with np.add.reduceat.
+    """
+
+    name = "columnar"
+
+    _cellIds: Dict[int, int]
+    """Maps (roster ID << CATEGORY_BITS) | category ID to cell number."""
+    _cellsOfPlayer: List["array[int]"]
+    """Each player's cells (for all of their roster entries), by player ID."""
+    _cellsOfCategory: List["array[int]"]
+    """Each category's cells (and thus the players with stats in it), by category ID."""
+    _playerOrder: List[PlayerID]
+    """Every player with stats, in the order they got them."""
+    _playerRank: "array[int]"
+    """Each player's position in _playerOrder (or -1 if they don't have stats), by player ID."""
+
+    # one entry per cell
+    cellRoster: "array[int]"
+    cellPlayer: "array[int]"
+    cellTeam: "array[int]"
+    cellCategory: "array[int]"
+    points: "array[int]"
+    powers: "array[int]"
+    tens: "array[int]"
+    negs: "array[int]"
+    tossupsHeard: "array[int]"
+    buzzPositionSum: "array[int]"
+    buzzCount: "array[int]"
+
+    CATEGORY_BITS = 20
+    """How many bits of a cell key the category ID takes up (see _cellIds)."""
+    KEY_COLUMNS = ["cellRoster", "cellPlayer", "cellTeam", "cellCategory"]
+    STAT_COLUMNS = ["points", "powers", "tens", "negs", "tossupsHeard", "buzzPositionSum", "buzzCount"]
+    COLUMNS = KEY_COLUMNS + STAT_COLUMNS
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._cellIds = {}
+        self._cellsOfPlayer = []
+        self._cellsOfCategory = []
+        self._playerOrder = []
+        self._playerRank = array('q')
+        for column in self.COLUMNS:
+            setattr(self, column, array('q'))
+
+    def _cell(self, roster: RosterID, categoryId: CategoryID) -> int:
+        if categoryId >> self.CATEGORY_BITS:
+            # its key would be the same as one of another roster entry's cells
+            raise ValueError(f"the columnar stats backend supports at most {1 << self.CATEGORY_BITS} categories")
+        key = (roster << self.CATEGORY_BITS) | categoryId
+        cell = self._cellIds.get(key)
+        if cell is None:
+            cell = len(self.cellRoster)
+            self._cellIds[key] = cell
+            teamId, playerId = self.rosters[roster]
+            # IDs are handed out densely, so the per-ID lists only ever grow by a little
+            while len(self._cellsOfPlayer) <= playerId:
+                self._cellsOfPlayer.append(array('q'))
+                self._playerRank.append(-1)
+            while len(self._cellsOfCategory) <= categoryId:
+                self._cellsOfCategory.append(array('q'))
+            if self._playerRank[playerId] == -1:
+                self._playerRank[playerId] = len(self._playerOrder)
+                self._playerOrder.append(playerId)
+            self._cellsOfPlayer[playerId].append(cell)
+            self._cellsOfCategory[categoryId].append(cell)
+            for column in self.COLUMNS:
+                getattr(self, column).append(0)
+            self.cellRoster[cell] = roster
+            self.cellPlayer[cell] = playerId
+            self.cellTeam[cell] = teamId
+            self.cellCategory[cell] = categoryId
+        return cell
+
+    def addTossupHeard(self, roster: RosterID, categories: Sequence[CategoryID]) -> None:
+        for category in categories:
+            self.tossupsHeard[self._cell(roster, category)] += 1
+
+    def addBuzz(self, roster: RosterID, categories: Sequence[CategoryID], points: int, position: int) -> None:
+        for category in categories:
+            cell = self._cell(roster, category)
+            self.points[cell] += points
+            if points == 15:
+                self.powers[cell] += 1
+            elif points == 10:
+                self.tens[cell] += 1
+            elif points == -5:
+                self.negs[cell] += 1
+
+            if points > 0:
+                self.buzzPositionSum[cell] += position
+                self.buzzCount[cell] += 1
+
+    def players(self) -> List[PlayerID]:
+        return list(self._playerOrder)
+
+    def _grouped(self, cells: "array[int]", keyColumn: str) -> Tuple[Any, Dict[str, Any]]:
+        """Adds up the stat columns of some cells, grouped by one of the key columns.
+
+        Args:
+            cells: the cells to add up
+            keyColumn: what to group them by (e.g. "cellPlayer")
+
+        Returns:
+            Tuple[Any, Dict[str, Any]]: the key of each group, and the totals of each
+                stat column for each group (as numpy arrays, if numpy is installed)
+        """
+        if np is None:
+            keyOf = getattr(self, keyColumn)
+            groupOf: Dict[int, int] = {}
+            keys: List[int] = []
+            totals: Dict[str, List[int]] = {column: [] for column in self.STAT_COLUMNS}
+            for cell in cells:
+                group = groupOf.get(keyOf[cell])
+                if group is None:
+                    groupOf[keyOf[cell]] = len(keys)
+                    keys.append(keyOf[cell])
+                    for column in self.STAT_COLUMNS:
+                        totals[column].append(getattr(self, column)[cell])
+                else:
+                    for column in self.STAT_COLUMNS:
+                        totals[column][group] += getattr(self, column)[cell]
+            return keys, totals
+
+        if len(cells) == 0:
+            empty = np.zeros(0, dtype=np.int64)
+            return empty, {column: empty for column in self.STAT_COLUMNS}
+        idx = np.frombuffer(cells, dtype=np.int64)
+        col = lambda column: np.frombuffer(getattr(self, column), dtype=np.int64)[idx]
+        cellKeys = col(keyColumn)
+        order = np.argsort(cellKeys, kind="stable")
+        sortedKeys = cellKeys[order]
+        starts = np.flatnonzero(np.concatenate(([True], sortedKeys[1:] != sortedKeys[:-1])))
+        if len(starts) == len(cellKeys):
+            # every group is a single cell (e.g. every player only played for one team), so there's nothing to add up
+            return cellKeys, {column: col(column) for column in self.STAT_COLUMNS}
+        return sortedKeys[starts], {column: np.add.reduceat(col(column)[order], starts) for column in self.STAT_COLUMNS}
+
+    def _rows(
+        self, labels: Any, columns: Dict[str, Any],
+        tieBreak: Sequence[int], limit: Optional[int] = None
+    ) -> List[StatRow]:
+        """Makes sorted stats table lines from the totals that _grouped() adds up.
+
+        Args:
+            labels: the ID (of the player or category) that labels each line
+            columns: the totals of each stat column for each line
+            tieBreak: sort key for each line when PPTUH is tied
+            limit: only make this many of the top lines; None means all of them
+        """
+        if len(labels) == 0:
+            return []
+        points, heard = columns["points"], columns["tossupsHeard"]
+        posSum, count = columns["buzzPositionSum"], columns["buzzCount"]
+        powers, tens, negs = columns["powers"], columns["tens"], columns["negs"]
+        if np is None:
+            rows: List[StatRow] = [
+                (
+                    labels[i],
+                    (points[i] / heard[i])*20 if heard[i] != 0 else None,
+                    powers[i], tens[i], negs[i],
+                    posSum[i] / count[i] if count[i] != 0 else None,
+                )
+                for i in range(len(labels))
+            ]
+            return rankRows(rows, tieBreak, limit)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            pptuh = np.where(heard != 0, (points / heard)*20, 0.0)
+            avgBuzz = np.where(count != 0, posSum / count, 0.0)
+        key, ties = -np.round(pptuh, 2), np.asarray(tieBreak)
+        if limit is not None and limit < len(key):
+            # only fully sort the lines that could make the top `limit`
+            cutoff = np.partition(key, limit - 1)[limit - 1]
+            candidates = np.nonzero(key <= cutoff)[0]
+            order = candidates[np.lexsort((ties[candidates], key[candidates]))][:limit]
+        else:
+            order = np.lexsort((ties, key))
+        return [
+            (
+                int(labels[i]),
+                float(pptuh[i]) if heard[i] != 0 else None,
+                int(powers[i]), int(tens[i]), int(negs[i]),
+                float(avgBuzz[i]) if count[i] != 0 else None,
+            )
+            for i in order.tolist()
+        ]
+
+    def _stats(self, cells: "array[int]", keyColumn: str) -> Dict[int, PlayerCatStat]:
+        """Adds up some cells into a PlayerCatStat for each key (see _grouped)."""
+        keys, totals = self._grouped(cells, keyColumn)
+        stats: Dict[int, PlayerCatStat] = {}
+        for i, key in enumerate(keys):
+            stat = stats[int(key)] = PlayerCatStat()
+            for column in self.STAT_COLUMNS:
+                setattr(stat, column, int(totals[column][i]))
+        return stats
+
+    def categoryPlayers(self, category: CategoryID) -> List[PlayerID]:
+        if category >= len(self._cellsOfCategory):
+            return []
+        return list(dict.fromkeys(self.cellPlayer[cell] for cell in self._cellsOfCategory[category]))
+
+    def categoryRows(self, category: CategoryID, limit: Optional[int] = None) -> List[StatRow]:
+        if category >= len(self._cellsOfCategory):
+            return []
+        players, totals = self._grouped(self._cellsOfCategory[category], "cellPlayer")
+        tieBreak = [self._playerRank[player] for player in players]
+        return self._rows(players, totals, tieBreak, limit)
+
+    def playerRows(self, player: PlayerID, categories: List[CategoryID]) -> List[StatRow]:
+        if player >= len(self._cellsOfPlayer):
+            return []
+        position = {category: i for i, category in enumerate(categories)}
+        cells = array('q', (cell for cell in self._cellsOfPlayer[player] if self.cellCategory[cell] in position))
+        cats, totals = self._grouped(cells, "cellCategory")
+        return self._rows(cats, totals, [position[category] for category in cats], None)
+
+    def playerStats(self, player: PlayerID) -> Dict[CategoryID, PlayerCatStat]:
+        if player >= len(self._cellsOfPlayer):
+            return {}
+        return self._stats(self._cellsOfPlayer[player], "cellCategory")
+
+    def teamTotals(self, category: CategoryID) -> Dict[TeamID, PlayerCatStat]:
+        if category >= len(self._cellsOfCategory):
+            return {}
+        return self._stats(self._cellsOfCategory[category], "cellTeam")
+
+    def merge(
+        self, other: Self, playerIds: Sequence[PlayerID], teamIds: Sequence[TeamID], categoryIds: Sequence[CategoryID]
+    ) -> None:
+        rosterIds = self._mergeRosters(other, playerIds, teamIds)
+        for otherCell in range(len(other.cellRoster)):
+            cell = self._cell(rosterIds[other.cellRoster[otherCell]], categoryIds[other.cellCategory[otherCell]])
+            for column in self.STAT_COLUMNS:
+                getattr(self, column)[cell] += getattr(other, column)[otherCell]
+
+_BACKENDS: List[Type[StatStore]] = [DictStatStore, ColumnarStatStore]
+STAT_BACKENDS = {backend.name: backend for backend in _BACKENDS}
+
+def makeStatStore(backend: str) -> StatStore:
+    """Makes an empty stats store.
+
+    Args:
+        backend (str): the name of the backend to use (a key of STAT_BACKENDS)
+    """
+    if backend not in STAT_BACKENDS:
+        raise ValueError(f"unknown stats backend '{backend}' (options: {', '.join(STAT_BACKENDS)})")
+    return STAT_BACKENDS[backend]()
@@ -0,0 +1,262 @@
+# This file generates made-up tournaments — QBJ files and packet .jsons in the
+# same shape as real ones (see parsing.py) — so that QBJtool can be tested and
+# benchmarked at any size without needing real data.
+
+import argparse
+import json
+import random
+from os import makedirs, path
+from typing import Dict, List, NamedTuple, Tuple
+from parsing import (
+    QBJ, QBJBonus, QBJBuzz, QBJLineup, QBJMatchPlayer, QBJMatchQuestions, QBJMatchTeam, QBJPlayer,
+    PacketJSON, PacketJSONBonus, PacketJSONTossup,
+)
+
+# a mix of metadata formats, like the ones different sets use
+DEFAULT_CATEGORY_MIX: Dict[str, float] = {
+    "Science - Biology": 1, "Science - Chemistry": 1, "Science - Physics": 1, "Science - Other Science": 1,
+    "Literature - American": 1, "Literature - British": 1, "Literature - European": 1, "Literature - World": 1,
+    "History - American": 1, "History - European": 1, "History - World": 1, "History - Ancient": 0.5,
+    "Fine Arts - Painting/Sculpture": 1, "Fine Arts - Classical Music": 1, "Fine Arts - Other Fine Arts": 1,
+    "Belief/Thought - Religion, Religion - Bible": 1, "Mythology - Greek": 1, "Philosophy": 1,
+    "Social Science": 1, "Geography/Current Events/Other": 1,
+}
+
+class SyntheticConfig(NamedTuple):
+    """How big (and how messy) a made-up tournament should be."""
+    rooms: int = 8
+    """Number of rooms (and thus games) per round; there are twice as many teams."""
+    rounds: int = 6
+    playersPerTeam: int = 4
+    """Number of players on court at once."""
+    benchPerTeam: int = 1
+    """Number of extra players on each team's roster who can be subbed in."""
+    substitutions: int = 1
+    """Number of substitutions each team makes per game."""
+    tossupsPerPacket: int = 20
+    wordsPerTossup: int = 100
+    buzzesPerTossup: int = 2
+    """The most buzzes a tossup can have (a correct buzz ends the tossup)."""
+    categoryMix: Dict[str, float] = DEFAULT_CATEGORY_MIX
+    """Packet metadata strings, with how often each should come up."""
+    seed: int = 0
+
+def _packet(config: SyntheticConfig, rng: random.Random, roundNumber: int) -> PacketJSON:
+    metadatas = list(config.categoryMix)
+    weights = list(config.categoryMix.values())
+    tossups: List[PacketJSONTossup] = []
+    bonuses: List[PacketJSONBonus] = []
+    for q in range(1, config.tossupsPerPacket + 1):
+        words = [f"r{roundNumber}q{q}w{i}" for i in range(config.wordsPerTossup)]
+        # power marks, like real packets have
+        words[config.wordsPerTossup // 2] = "(*)"
+        tossups.append({
+            "question": " ".join(words),
+            "answer": f"<b><u>Answer {roundNumber}.{q}</u></b> [accept <u>alternate</u>] (prompt on other)",
+            "metadata": rng.choices(metadatas, weights)[0],
+        })
+        bonuses.append({
+            "leadin": f"Round {roundNumber} bonus {q} leadin.",
+            "parts": [f"Part {part}" for part in range(1, 4)],
+            "answers": [f"<b>Bonus answer {roundNumber}.{q}.{part}</b>" for part in range(1, 4)],
+            "values": ["10", "10", "10"],
+            "difficultyModifiers": ["e", "m", "h"],
+            "metadata": rng.choices(metadatas, weights)[0],
+        })
+    return {"tossups": tossups, "bonuses": bonuses}
+
+def _match(
+    config: SyntheticConfig, rng: random.Random, roundNumber: int,
+    teams: List[Tuple[str, List[str]]], packetName: str
+) -> QBJ:
+    numQuestions = config.tossupsPerPacket
+    lineupsByTeam: List[List[Tuple[int, List[str]]]] = []
+    for _, roster in teams:
+        onCourt = roster[:config.playersPerTeam]
+        schedule = [(1, list(onCourt))]
+        subQuestions = sorted(rng.sample(range(2, numQuestions + 1), min(config.substitutions, numQuestions - 1)))
+        for firstQuestion in subQuestions:
+            bench = [p for p in roster if p not in onCourt]
+            if len(bench) == 0:
+                break
+            onCourt = list(onCourt)
+            onCourt[rng.randrange(len(onCourt))] = rng.choice(bench)
+            schedule.append((firstQuestion, onCourt))
+        lineupsByTeam.append(schedule)
+
+    def onCourtFor(teamIdx: int, questionNumber: int) -> List[str]:
+        current = lineupsByTeam[teamIdx][0][1]
+        for firstQuestion, players in lineupsByTeam[teamIdx]:
+            if firstQuestion <= questionNumber:
+                current = players
+        return current
+
+    heard: Dict[str, int] = {}
+    answerCounts: Dict[str, Dict[int, int]] = {}
+    questions: List[QBJMatchQuestions] = []
+    for q in range(1, numQuestions + 1):
+        courts = [onCourtFor(teamIdx, q) for teamIdx in range(len(teams))]
+        for players in courts:
+            for p in players:
+                heard[p] = heard.get(p, 0) + 1
+
+        buzzes: List[QBJBuzz] = []
+        teamOrder = rng.sample(range(len(teams)), len(teams))
+        position = 0
+        gotten = False
+        for teamIdx in teamOrder[:config.buzzesPerTossup]:
+            position = rng.randrange(position, config.wordsPerTossup)
+            player = rng.choice(courts[teamIdx])
+            correct = rng.random() < 0.7
+            value = (15 if position < config.wordsPerTossup // 2 else 10) if correct else (-5 if not buzzes else 0)
+            answerCounts.setdefault(player, {})
+            answerCounts[player][value] = answerCounts[player].get(value, 0) + 1
+            buzzes.append({
+                "buzz_position": {"word_index": position},
+                "player": {"name": player},
+                "team": {"name": teams[teamIdx][0], "players": []},
+                "result": {"value": value},
+            })
+            if correct:
+                gotten = True
+                break
+
+        question: QBJMatchQuestions = {
+            "question_number": q,
+            "buzzes": buzzes,
+            "tossup_question": {"parts": 1, "type": "tossup", "question_number": q},
+        } # type: ignore # (bonus is only there if the tossup was gotten)
+        if gotten:
+            bonus: QBJBonus = {
+                "question": {"parts": 3, "type": "bonus", "question_number": q},
+                "parts": [{"controlled_points": rng.choice([0, 10])} for _ in range(3)],
+            }
+            question["bonus"] = bonus
+        questions.append(question)
+
+    matchTeams: List[QBJMatchTeam] = []
+    for teamIdx, (teamName, roster) in enumerate(teams):
+        rosterPlayers: List[QBJPlayer] = [{"name": p} for p in roster]
+        lineups: List[QBJLineup] = [
+            {"first_question": firstQuestion, "players": [{"name": p} for p in players]}
+            for firstQuestion, players in lineupsByTeam[teamIdx]
+        ]
+        matchPlayers: List[QBJMatchPlayer] = [
+            {
+                "player": {"name": p},
+                "tossups_heard": heard.get(p, 0),
+                "answer_counts": [
+                    {"answer": {"value": value}, "number": number}
+                    for value, number in sorted(answerCounts.get(p, {}).items())
+                ],
+            }
+            for p in roster
+        ]
+        matchTeams.append({
+            "bonus_points": 0,
+            "lineups": lineups,
+            "match_players": matchPlayers,
+            "team": {"name": teamName, "players": rosterPlayers},
+        })
+
+    return {
+        "tossups_read": numQuestions,
+        "match_teams": matchTeams,
+        "match_questions": questions,
+        "_round": roundNumber,
+        "packets": packetName,
+    }
+
+def generateTournament(config: SyntheticConfig) -> Tuple[Dict[str, QBJ], Dict[str, PacketJSON]]:
+    """Makes up a tournament.
+
+    Args:
+        config (SyntheticConfig): how big the tournament should be
+
+    Returns:
+        Tuple[Dict[str, QBJ], Dict[str, PacketJSON]]: the QBJs by file name, and the packets by name
+    """
+    rng = random.Random(config.seed)
+    rosterSize = config.playersPerTeam + config.benchPerTeam
+    teams = [
+        (f"Team {t + 1}", [f"Player {t + 1}.{p + 1}" for p in range(rosterSize)])
+        for t in range(config.rooms * 2)
+    ]
+
+    qbjs: Dict[str, QBJ] = {}
+    packets: Dict[str, PacketJSON] = {}
+    for roundNumber in range(1, config.rounds + 1):
+        packetName = f"Round {roundNumber}"
+        packets[packetName] = _packet(config, rng, roundNumber)
+        # round robin-ish pairings: keep team 0 fixed and rotate everyone else
+        order = [teams[0]] + teams[1:][roundNumber - 1:] + teams[1:][:roundNumber - 1]
+        for room in range(config.rooms):
+            pairing = [order[room], order[-1 - room]]
+            qbjs[f"Round {roundNumber} Room {room + 1}.qbj"] = _match(config, rng, roundNumber, pairing, packetName)
+    return qbjs, packets
+
+def writeTournament(config: SyntheticConfig, outDir: str) -> List[str]:
+    """Makes up a tournament, and writes its QBJs and packets to a directory.
+
+    Packets are named like QBJtool expects, so run QBJtool from outDir.
+
+    Args:
+        config (SyntheticConfig): how big the tournament should be
+        outDir (str): where to write the files
+
+    Returns:
+        List[str]: the paths of the QBJs that were written, in round order
+    """
+    makedirs(outDir, exist_ok=True)
+    qbjs, packets = generateTournament(config)
+    for packetName, packet in packets.items():
+        with open(path.join(outDir, f"{packetName}.json"), "w") as f:
+            json.dump(packet, f)
+    qbjPaths = []
+    for filename, qbj in qbjs.items():
+        qbjPath = path.join(outDir, filename)
+        with open(qbjPath, "w") as f:
+            json.dump(qbj, f)
+        qbjPaths.append(qbjPath)
+    return qbjPaths
+
+def main() -> None:
+    defaults = SyntheticConfig()
+    parser = argparse.ArgumentParser(description="Generates a made-up tournament's QBJs and packets.")
+    parser.add_argument("outDir", help="where to write the files")
+    parser.add_argument("--rooms", type=int, default=defaults.rooms)
+    parser.add_argument("--rounds", type=int, default=defaults.rounds)
+    parser.add_argument("--players-per-team", type=int, default=defaults.playersPerTeam)
+    parser.add_argument("--bench-per-team", type=int, default=defaults.benchPerTeam)
+    parser.add_argument("--substitutions", type=int, default=defaults.substitutions)
+    parser.add_argument("--tossups-per-packet", type=int, default=defaults.tossupsPerPacket)
+    parser.add_argument("--words-per-tossup", type=int, default=defaults.wordsPerTossup)
+    parser.add_argument("--buzzes-per-tossup", type=int, default=defaults.buzzesPerTossup)
+    parser.add_argument(
+        "--categories", metavar="METADATA=WEIGHT", nargs="+",
+        help="packet metadata strings to use, with how often each comes up (default: a mix of common ones)",
+    )
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    args = parser.parse_args()
+
+    categoryMix = defaults.categoryMix
+    if args.categories:
+        categoryMix = {}
+        for spec in args.categories:
+            metadata, equals, weight = spec.rpartition("=")
+            if equals:
+                categoryMix[metadata] = float(weight)
+            else:
+                categoryMix[spec] = 1.0
+
+    config = SyntheticConfig(
+        rooms=args.rooms, rounds=args.rounds, playersPerTeam=args.players_per_team,
+        benchPerTeam=args.bench_per_team, substitutions=args.substitutions,
+        tossupsPerPacket=args.tossups_per_packet, wordsPerTossup=args.words_per_tossup,
+        buzzesPerTossup=args.buzzes_per_tossup, categoryMix=categoryMix, seed=args.seed,
+    )
+    qbjPaths = writeTournament(config, args.outDir)
+    print(f"Wrote {len(qbjPaths)} QBJs and {config.rounds} packets to {args.outDir}")
+
+if __name__ == "__main__":
+    main()
@@ -1,227 +1,203 @@
 # This file contains the overall state tracker for a whole tournament.
 
-from typing import List, Tuple, Dict, TypedDict, Set, Optional
-from typing_extensions import Self
-from ids import Player, Team, Category
-from question import Tossup, Buzz
-from parsing import QBJ, PacketJSON
-from datetime import datetime
-from os import path
+import json
+from typing import Callable, List, Tuple, Dict, TypedDict, Set, Optional, Iterator, TextIO
+from ids import Category, CategoryID, PlayerID, RosterID, SymbolTable, TeamID
+from bonuses import DIFFICULTIES, OTHER_DIFFICULTY, BonusStats, difficultyIndex
+from categories import BIG_CATEGORIES, CategoryNormalizer
+from fragments import FragmentCache, fragmentKey
+from diagnostics import (
+    Diagnostics, MISSING_BONUS, MISSING_TOSSUP, MULTIPLE_CORRECT_BUZZES, UNKNOWN_BUZZER, UNKNOWN_POINT_VALUE,
+)
+from statstore import OVERALL, NamedStatRow, PlayerCatStat, StatRow, StatStore, makeStatStore, rankRows
+from question import Tossup, TossupText, Buzz
+from lineups import MatchLineups
+from parsing import QBJ, PacketJSON, QBJBonus
+from render import pageValues, renderTemplate, shardPath, toID, writeChunks
+from sketches import PositionDistributions, PositionHistogram
 
 # TODO:
-#   * Sort players by team like we do for categories
 #   * Make a top 5 buzzes per player HTML file.
 
-# categories that are combos of other categories
-BIG_CATEGORIES = [
-    ("Science and Math", [
-        "Biology", "Chemistry", "Physics", "Other Science", "Astronomy", "Math",
-        "Earth Science", "Computer Science"
-    ]),
-    ("Literature", [
-        "American Literature", "British Literature", "European Literature",
-        "World Literature", "Other Literature", "World/Other Literature",
-        "Ancient/Other Literature", "British/Commonwealth Literature",
-        "American - Drama Literature", "American - Long Fiction Literature",
-        "American - Poetry Literature", "American - Short Story Literature",
-        "American - Short Story/Long Fiction Literature", "British - Drama Literature",
-        "British - Long Fiction Literature", "British - Poetry Literature",
-        "British - Short Story Literature", "Classical Literature",
-        "European - Drama Literature", "European - Long Fiction Literature",
-        "European - Poetry Literature", "European - Short Story Liiterature",
-        "Mixed Literature", "World - Drama Literature", "World - Long Fiction Literature",
-        "World - Poetry Literature", "World - Short Story Literature",
-        "World- Long Fiction Literature", "Anglophone Literature"
-    ]),
-    ("History", [
-        "American History", "World History", "European History", "Other History",
-        "Ancient History", "Ancient/Other History", "History - American", "History - Ancient",
-        "History - European", "History - Other", "History - World", "Cross History",
-        "Cross/Historiography History", "European History History",
-        "Post-1900 History", "Pre-1000 History", "1000-1600 History", "1600-1900 History"
-    ]),
-    ("Fine Arts", [
-        "Painting/Sculpture", "Painting and Sculpture", "Other Fine Arts", "Classical Music", "Visual Fine Arts",
-        "Auditory Fine Arts", "Auditory", "Architecture", "Jazz", "Opera", "Visual"
-
-    ]),
-    ("RMPSS", ["Religion", "Mythology", "Social Science", "Philosophy", "Social Economics", "Social Linguistics", "Social Other", "Social Psychology", "Social Sociology", "Belief"]),
-]
-import re
-def toID(s: str) -> str:
-    return re.sub(r'<\/?[a-z]*\/?>','',s.lower().strip().replace(' ', '-'))
-
-class PlayerCatStat:
-    """A player's statistics in a category."""
-    points: int
-    """The number of points the player has earned in this category."""
-    powers: int
-    """The number of +15 pts the player has earned in this category."""
-    tens: int
-    """The number of +10 pts the player has earned in this category."""
-    negs: int
-    """The number of tossups the player has incorrectly answered in this category."""
-    buzzPositions: List[int]
-    tossupsHeard: int
-
-    def __init__(self) -> None:
-        """Default initialization w/ no questions"""
-        self.points = 0
-        self.powers = 0
-        self.tens = 0
-        self.negs = 0
-        self.tossupsHeard = 0
-        self.buzzPositions = []
-
-    def __str__(self) -> str:
-        # TODO: average buzz position
-        #averageBuzzPosition = sum(self.buzzPositions) / len(self.buzzPositions)
-        return f"Points: {self.points} ({self.powers}/{self.tens}/{self.negs})" #, average buzz position: {averageBuzzPosition}"
-    def __repr__(self) -> str:
-        return f"'{str(self)}'"
-
-    def __add__(self, other: Self):
-        new = PlayerCatStat()
-        new.points = self.points + other.points
-        new.powers = self.powers + other.powers
-        new.tens = self.tens + other.tens
-        new.negs = self.negs + other.negs
-        new.buzzPositions = self.buzzPositions + other.buzzPositions
-        new.tossupsHeard = self.tossupsHeard + other.tossupsHeard
-        return new
-
-Lineup = Tuple[int, List[Player]]
-"""int is the first question number the lineup starts on"""
+STATS_DATA_COLUMNS = (
+    "player", "category", "points", "powers", "tens", "negs", "tossupsHeard", "buzzPositionSum", "buzzCount",
+)
+"""The columns of statsData()'s "cells", in order."""
+
+def formatRow(row: StatRow, names: SymbolTable) -> Tuple[str, str, int, int, int, str]:
+    """Formats a line of a stats table for display.
+
+    Args:
+        row (StatRow): the line
+        names (SymbolTable): where to look up the name of the player or category the line is for
+    """
+    id, pptuh, powers, tens, negs, avgBuzzPosition = row
+    return (
+        names.name(id),
+        "0" if pptuh is None else str(round(pptuh, 2)),
+        powers, tens, negs,
+        "n/a" if avgBuzzPosition is None else str(round(avgBuzzPosition, 2)),
+    )
+
+def statRowsToHTML(rows: List[StatRow], names: SymbolTable) -> Iterator[str]:
+    """Generates the <tr>s of a stats table."""
+    for row in rows:
+        stat = formatRow(row, names)
+        yield f"""<tr>
+                    <td>{stat[0]}</td>
+                    <td>{stat[1]}</td>
+                    <td>{stat[3]}</td>
+                    <td>{stat[4]}</td>
+                    <td>{stat[5]}</td>
+                </tr>"""
 
 class Tournament:
     """A tournament."""
 
-    players: Dict[Player, int]
+    players: Dict[PlayerID, int]
     """Every player in the tournament, where key is the number of games they've played"""
 
+    playerTeams: Dict[PlayerID, TeamID]
+    """The team each player is listed under (the first one they played for, if there's more than one)."""
+
+    teamTossupsHeard: Dict[Tuple[TeamID, CategoryID], int]
+    """The number of tossups each team heard in each category (and OVERALL).
+
+    Team stats are otherwise added up from their players' stats, but this can't
+    be, since players come in and out of games.
+    """
+
     tossups: List[Tossup]
-    categories: Set[Category]
 
-    playerStatsByCategory: Dict[Player, Dict[Category, PlayerCatStat]]
-    overallPlayerStats: Dict[Player, PlayerCatStat]
+    questions: Dict[Tuple[str, str], TossupText]
+    """Every distinct tossup that was heard, keyed by (text, answer); IDs are handed out in the order they were first heard"""
+    categories: Set[CategoryID]
+
+    playerNames: SymbolTable
+    """The name of each player ID (and every other player name that's come up)."""
+    teamNames: SymbolTable
+    categoryNames: SymbolTable
+    """The name of each category ID; OVERALL is always 0."""
+
+    stats: StatStore
+    """Every player's stats in each category (and OVERALL), for each team they played for; team stats are added up from these."""
+
+    categoryNormalizer: CategoryNormalizer
+    """Turns packet metadata into categories, and remembers what it's seen."""
+
+    diagnostics: Diagnostics
+    """Problems found in the data that's been added."""
+
+    loadDiagnostics: Diagnostics
+    """Problems that kept QBJs from being added at all (e.g. missing packets).
+
+    These describe the latest attempt to load those QBJs, not the data in the
+    tournament, so they're cleared when a saved tournament is reused (since its
+    missing QBJs are tried again).
+    """
+
+    buzzDistributions: PositionDistributions
+    """Where each player, and the players in each category, got tossups."""
+
+    bonuses: BonusStats
+    """How each team, and the teams in each category, did on bonuses."""
+
+    _statCategories: Dict[str, Tuple[CategoryID, ...]]
+    """The categories that a question with each raw metadata string counts towards (its own first)."""
 
-    def __init__(self) -> None:
-        """Default initialization."""
+    def __init__(self, statsBackend: str = "dict") -> None:
+        """Default initialization.
+
+        Args:
+            statsBackend (str): which kind of StatStore to keep player stats in (see statstore.STAT_BACKENDS)
+        """
         self.players = {}
+        self.playerTeams = {}
+        self.teamTossupsHeard = {}
         self.tossups = []
+        self.questions = {}
         self.categories = set()
-        self.playerStatsByCategory = {}
-        self.overallPlayerStats = {}
-
-    def addQBJAndPacket(self, qbj: QBJ, packet: PacketJSON) -> None:
+        self.playerNames = SymbolTable()
+        self.teamNames = SymbolTable()
+        self.categoryNames = SymbolTable()
+        self.categoryNames.intern(OVERALL)
+        self._statCategories = {}
+        self.stats = makeStatStore(statsBackend)
+        self.categoryNormalizer = CategoryNormalizer()
+        self.diagnostics = Diagnostics()
+        self.loadDiagnostics = Diagnostics()
+        self.buzzDistributions = PositionDistributions()
+        self.bonuses = BonusStats()
+
+    def addQBJAndPacket(self, qbj: QBJ, packet: PacketJSON, source: Optional[str] = None) -> None:
         """Imports a QBJ parsed json object with associated parsed packet.
 
+        Problems with the data are recorded in self.diagnostics.
+
         Args:
             qbj (QBJ): parsed QBJ file
             packet (PacketJSON): packet that is the one used for the QBJ
+            source (Optional[str]): where the QBJ came from (e.g. its path), for diagnostics
         """
-        # teams/lineups are per-QBJ
-        teams: List[Tuple[Team, List[Lineup]]] = []
-
-        # add players
+        # add players (with each one's roster ID for the team they're playing for in this match)
+        teamRosters: Dict[TeamID, Dict[PlayerID, RosterID]] = {}
+        playerRosters: Dict[PlayerID, RosterID] = {}
         for rawTeam in qbj["match_teams"]:
-            teamTuple = (
-                rawTeam["team"]["name"], # name
-                [(lu["first_question"], [p["name"] for p in lu["players"]]) for lu in rawTeam["lineups"]], # lineups
-            )
-            # sort lineups by starting question number
-            teamTuple[1].sort(key=lambda x: x[0])
-            teams.append(teamTuple)
-
+            teamId = self.teamNames.intern(rawTeam["team"]["name"])
             for rawPlayer in rawTeam["match_players"]:
-                if rawPlayer["player"]["name"] not in self.players:
-                    self.players[rawPlayer["player"]["name"]] = 0
+                playerId = self.playerNames.intern(rawPlayer["player"]["name"])
+                if playerId not in self.players:
+                    self.players[playerId] = 0
+                self.playerTeams.setdefault(playerId, teamId)
+                playerRosters[playerId] = teamRosters.setdefault(teamId, {})[playerId] = self.stats.rosterId(teamId, playerId)
                 if rawPlayer["tossups_heard"] > 0:
-                    self.players[rawPlayer["player"]["name"]] += 1 # increment games played
+                    self.players[playerId] += 1 # increment games played
+
+        # teams/lineups are per-QBJ
+        lineups = MatchLineups(qbj["match_teams"], self.playerNames, self.teamNames)
 
         # iterate over tossups and update state for them
         for rawTossup in qbj["match_questions"]:
             # get the question text from the packet
             qnIdx = rawTossup["question_number"] - 1 # 1-indexed
             if qnIdx >= len(packet["tossups"]):
-                print(f"Warning: tossup number {qnIdx} not found in packet")
-                print()
+                self.diagnostics.add(MISSING_TOSSUP, qbj["packets"], source, rawTossup["question_number"])
                 continue
 
             text = packet["tossups"][qnIdx]["question"]
             answer = packet["tossups"][qnIdx]["answer"]
-            category = packet["tossups"][qnIdx]["metadata"].strip()
-            if "&gt;" in category: 
-                category = category.split('&gt;')[0]
-            if ", " in category:
-                category = category.split(', ')[1]
-                category = category.replace('Belief/Thought - ', '')
-                category = category.replace('Fine Arts - ', '')
-                category = category.replace('Science - ', '')
-                category = category.replace('Other - ', '')
-            for preamble in ["History - ", "Literature - ", "Literature – "]:
-                if category.startswith(preamble):
-                    category = category.replace(preamble, '')
-                    category += " " + preamble.split(' ')[0]
-            if category.endswith('Literature'):
-                category = category.split('- ')[0].strip() + " Literature"
-            # if "- " in category:
-            #     category = category.split("- ")[1]
-            # if " -" in category:
-            #     category = category.split(" -")[1]
-            # slight hack because MS is annoying
-            category = category.replace("History History", "History")
-            category = category.replace("Literature Literature", "Literature")
-            if category == "World Literature":
-                category = "World/Other Literature"
-            if category == "Ancient History":
-                category = "Ancient/Other History"
-            if category == "Geography/Current Events/Other" or category == "Current Events":
-                category = "Geography/Current Events/Other Academic"
-
-            for catP in ['Religion', 'Mythology']:
-                if category.startswith(catP + ' -'):
-                    category = catP
-
-            self.categories.add(category)
+            statCategories = self._categoriesFor(packet["tossups"][qnIdx]["metadata"])
 
             # udpate tossups heard
-            # TODO: make this work for substitutions by tracking 'lineups' properly
-            for team in teams:
-                playersWhoHeardIt: List[Player] = team[1][0][1]
-                # get lineup with largest first question index smaller than this tossup's question number
-                for possibleLineup in team[1]:
-                    firstQuestionIdx, players = possibleLineup
-                    if firstQuestionIdx >= rawTossup["question_number"]:
-                        playersWhoHeardIt = players
-
-                for p in playersWhoHeardIt:
-                    if p not in self.playerStatsByCategory:
-                        self.playerStatsByCategory[p] = {}
-                    if category not in self.playerStatsByCategory[p]:
-                        self.playerStatsByCategory[p][category] = PlayerCatStat()
-                    if p not in self.overallPlayerStats:
-                        self.overallPlayerStats[p] = PlayerCatStat()
-
-                    for toUpdate in [self.playerStatsByCategory[p][category], self.overallPlayerStats[p]]:
-                        toUpdate.tossupsHeard += 1
+            playersWhoHeardIt: List[PlayerID] = []
+            for teamId, onCourt in lineups.playersFor(rawTossup["question_number"]):
+                playersWhoHeardIt += onCourt
+                rosters = teamRosters.setdefault(teamId, {})
+                for p in onCourt:
+                    roster = rosters.get(p)
+                    if roster is None:
+                        # in a lineup without being listed for the team
+                        roster = rosters[p] = self.stats.rosterId(teamId, p)
+                    self.stats.addTossupHeard(roster, statCategories)
+                for c in statCategories:
+                    self.teamTossupsHeard[(teamId, c)] = self.teamTossupsHeard.get((teamId, c), 0) + 1
 
             correctBuzz = None
             incorrectBuzz = None
             # iterate over buzzes and look for gets/powers/negs
             for rawBuzz in rawTossup["buzzes"]:
-                player = rawBuzz["player"]["name"]
-                if player not in self.players:
-                    print(f"Warning: (should never happen) player '{player}' buzzed on tossup with answerline '{answer}' but isn't in the player list")
+                player = self.playerNames.get(rawBuzz["player"]["name"])
+                if player is None or player not in self.players:
+                    self.diagnostics.add(UNKNOWN_BUZZER, rawBuzz["player"]["name"], source, rawTossup["question_number"], answer)
                     continue
 
                 points = rawBuzz["result"]["value"]
                 position = rawBuzz["buzz_position"]["word_index"]
-                buzz = Buzz(position, player, "teams aren't real yet", points)
+                buzz = Buzz(position, player, self.teamNames.intern(rawBuzz["team"]["name"]), points)
 
                 if points > 0:
                     if correctBuzz is not None:
-                        print(f"Warning: multiple correct buzzes on tossup with answerline '{answer}'")
+                        self.diagnostics.add(MULTIPLE_CORRECT_BUZZES, "", source, rawTossup["question_number"], answer)
                     correctBuzz = buzz
                 else:
                     # TODO rework incorrect buzz tracking — OK to have >1 0s but not >1 Negs
@@ -230,49 +206,176 @@ class Tournament:
                     incorrectBuzz = buzz
 
                 # update player stats
-                if player not in self.playerStatsByCategory:
-                    self.playerStatsByCategory[player] = {}
-                if category not in self.playerStatsByCategory[player]:
-                    self.playerStatsByCategory[player][category] = PlayerCatStat()
-                if player not in self.overallPlayerStats:
-                    self.overallPlayerStats[player] = PlayerCatStat()
-                for toUpdate in [self.playerStatsByCategory[player][category], self.overallPlayerStats[player]]:
-                    toUpdate.points += points
-                    if points == 15:
-                        toUpdate.powers += 1
-                    elif points == 10:
-                        toUpdate.tens += 1
-                    elif points == -5:
-                        toUpdate.negs += 1
-                    elif points != 0:
-                        print(f"Warning: unknown point value {points} on tossup with answerline '{answer}'")
-
-                    if points > 0:
-                        toUpdate.buzzPositions.append(position)
-            self.tossups.append(Tossup(text, answer, correctBuzz, incorrectBuzz, playersWhoHeardIt))
+                if points not in (15, 10, -5, 0):
+                    self.diagnostics.add(UNKNOWN_POINT_VALUE, points, source, rawTossup["question_number"], answer)
+                roster = playerRosters.get(player)
+                if roster is None:
+                    # they buzzed without being listed for either team, so go by the team on the buzz
+                    roster = self.stats.rosterId(buzz.team, player)
+                self.stats.addBuzz(roster, statCategories, points, position)
+                if points > 0:
+                    self.buzzDistributions.addGet(player, statCategories, position)
+            self.tossups.append(Tossup(self._question(text, answer, qbj["packets"]), correctBuzz, incorrectBuzz, tuple(playersWhoHeardIt)))
+
+            # the team that got the tossup hears the bonus
+            if correctBuzz is not None and "bonus" in rawTossup:
+                self._addBonus(rawTossup["bonus"], packet, qbj["packets"], correctBuzz.team, source)
+
+    def _addBonus(self, rawBonus: QBJBonus, packet: PacketJSON, packetName: str, team: TeamID, source: Optional[str]) -> None:
+        """Records a bonus in the bonus stats.
+
+        Args:
+            rawBonus (QBJBonus): the bonus, from the QBJ
+            packet (PacketJSON): the packet the bonus is from
+            packetName (str): what the QBJ calls that packet, for diagnostics
+            team (TeamID): the team that heard it
+            source (Optional[str]): where the QBJ came from, for diagnostics
+        """
+        bonusNumber = rawBonus["question"]["question_number"]
+        packetBonuses = packet.get("bonuses", [])
+        if not 0 < bonusNumber <= len(packetBonuses):
+            self.diagnostics.add(MISSING_BONUS, packetName, source, bonusNumber)
+            return
+        packetBonus = packetBonuses[bonusNumber - 1]
+        partPoints = [part["controlled_points"] for part in rawBonus["parts"]]
+        difficulties = [difficultyIndex(modifier) for modifier in packetBonus.get("difficultyModifiers", [])]
+        difficulties += [OTHER_DIFFICULTY] * (len(partPoints) - len(difficulties))
+        self.bonuses.addBonus(team, self._lookupCategories(packetBonus["metadata"]), difficulties, partPoints)
+
+    def _categoriesFor(self, metadata: str) -> Tuple[CategoryID, ...]:
+        """Gets the categories a tossup counts towards from its packet metadata (see _lookupCategories), and makes sure they get stat tables."""
+        statCategories = self._lookupCategories(metadata)
+        self.categories.update(statCategories[:-1])
+        return statCategories
+
+    def _lookupCategories(self, metadata: str) -> Tuple[CategoryID, ...]:
+        """Gets the categories a question counts towards from its packet metadata.
+
+        That's its own category, the combined category (from BIG_CATEGORIES) that
+        includes it if there is one, and OVERALL. Unlike _categoriesFor, this doesn't
+        add them to self.categories, so e.g. a category that only bonuses are in
+        doesn't get an empty tossup stats table.
+        """
+        statCategories = self._statCategories.get(metadata)
+        if statCategories is None:
+            category = self.categoryNormalizer.normalize(metadata)
+            # keep the combined category this one counts towards up to date as we go
+            bigCategory = self.categoryNormalizer.bigCategory(category)
+            categories = [category] if bigCategory is None else [category, bigCategory]
+            statCategories = tuple(self.categoryNames.intern(c) for c in categories + [OVERALL])
+            self._statCategories[metadata] = statCategories
+        return statCategories
+
+    def _question(self, text: str, answer: str, packet: str) -> TossupText:
+        """Gets the shared TossupText for a tossup's words, making it if this is the first time it's been heard."""
+        question = self.questions.get((text, answer))
+        if question is None:
+            question = TossupText(len(self.questions), text, answer, packet)
+            self.questions[(text, answer)] = question
+        return question
+
+    def merge(self, other: "Tournament") -> None:
+        """Merges another (partial) tournament's results into this one.
+
+        Merging the partial results for a list of QBJs in order gives the same
+        state as adding all of those QBJs to a single tournament in order.
+        `other` shouldn't be used after it's been merged in.
+
+        Args:
+            other (Tournament): the tournament to merge in
+        """
+        if type(self.stats) != type(other.stats):
+            raise ValueError(f"can't merge '{other.stats.name}' stats into '{self.stats.name}' stats")
+        # the other tournament's IDs mean different things, so translate them to ours
+        playerIds = self.playerNames.merge(other.playerNames)
+        teamIds = self.teamNames.merge(other.teamNames)
+        categoryIds = self.categoryNames.merge(other.categoryNames)
+
+        for player, gamesPlayed in other.players.items():
+            self.players[playerIds[player]] = self.players.get(playerIds[player], 0) + gamesPlayed
+        for player, team in other.playerTeams.items():
+            self.playerTeams.setdefault(playerIds[player], teamIds[team])
+        for (team, category), heard in other.teamTossupsHeard.items():
+            key = (teamIds[team], categoryIds[category])
+            self.teamTossupsHeard[key] = self.teamTossupsHeard.get(key, 0) + heard
+        for tossup in other.tossups:
+            tossup.question = self._question(tossup.text, tossup.answer, tossup.question.packet)
+            tossup.players = tuple(playerIds[p] for p in tossup.players)
+            for buzz in (tossup.correctBuzz, tossup.incorrectBuzz):
+                if buzz is not None:
+                    buzz.player = playerIds[buzz.player]
+                    buzz.team = teamIds[buzz.team]
+        self.tossups.extend(other.tossups)
+        self.categories.update(categoryIds[c] for c in other.categories)
+        for metadata, statCategories in other._statCategories.items():
+            self._statCategories.setdefault(metadata, tuple(categoryIds[c] for c in statCategories))
+        self.categoryNormalizer.merge(other.categoryNormalizer)
+        self.diagnostics.merge(other.diagnostics)
+        self.loadDiagnostics.merge(other.loadDiagnostics)
+        self.stats.merge(other.stats, playerIds, teamIds, categoryIds)
+        self.buzzDistributions.merge(other.buzzDistributions, playerIds, categoryIds)
+        self.bonuses.merge(other.bonuses, teamIds, categoryIds)
+
+    def allDiagnostics(self) -> Diagnostics:
+        """Gets every problem to report: those in the data, and those that kept QBJs from being added."""
+        combined = Diagnostics()
+        combined.merge(self.diagnostics)
+        combined.merge(self.loadDiagnostics)
+        return combined
 
     def generateCombinedStats(self) -> None:
-        """Adds stats entries to playerStatsByCategory for the following "categories":
+        """Does nothing; kept so that older scripts still work.
 
-            * "Science" which is the sum of all science categories (including osci)
-            * "Literature" which is the sum of all literature categories
-            * "History" which is the sum of all history categories
-            * "Fine Arts" which is the sum of all fine arts categories
-            * "RMPSS" which is the sum of religion, myth, social science, and philosophy
+        The stats for the combined categories in BIG_CATEGORIES ("Science and Math",
+        "Literature", "History", "Fine Arts", and "RMPSS") are now updated as each
+        QBJ is added, so they're always current.
         """
 
-        for player in self.playerStatsByCategory:
-            for newCat, constituents in BIG_CATEGORIES:
-                if newCat not in self.playerStatsByCategory[player]:
-                    self.playerStatsByCategory[player][newCat] = PlayerCatStat()
-                    self.categories.add(newCat)
-                else:
-                    print("Warning: category '{newCat}' already exists for player '{player}'; skipping")
-                    continue
+    def leaderboard(self, category: Category, k: int) -> List[NamedStatRow]:
+        """Gets the best players in a category, by points per 20 tossups heard.
+
+        Args:
+            category (Category): the category (or OVERALL)
+            k (int): how many players to get
+
+        Returns:
+            List[NamedStatRow]: the top k players' stats, best first
+        """
+        categoryId = self.categoryNames.get(category)
+        if categoryId is None:
+            return []
+        return [(self.playerNames.name(row[0]),) + row[1:] for row in self.stats.categoryRows(categoryId, k)]
+
+    def teamRows(self, category: Category, k: Optional[int] = None) -> List[NamedStatRow]:
+        """Gets the best teams in a category, by points per 20 tossups heard.
 
-                for constituent in constituents:
-                    if constituent in self.playerStatsByCategory[player]:
-                        self.playerStatsByCategory[player][newCat] += self.playerStatsByCategory[player][constituent]
+        Each team's stats are its players' stats (from the matches they played for
+        that team) added together, except for tossups heard, which are the tossups
+        the team was in the room for.
+
+        Args:
+            category (Category): the category (or OVERALL)
+            k (Optional[int]): how many teams to get; None means all of them
+
+        Returns:
+            List[NamedStatRow]: the top k teams' stats, best first (ties are in the order teams were first seen)
+        """
+        categoryId = self.categoryNames.get(category)
+        if categoryId is None:
+            return []
+        return [(self.teamNames.name(row[0]),) + row[1:] for row in self._teamRows(categoryId, k)]
+
+    def _teamRows(self, category: CategoryID, limit: Optional[int] = None) -> List[StatRow]:
+        totals = self.stats.teamTotals(category)
+        rows = []
+        for team, stat in totals.items():
+            stat.tossupsHeard = self.teamTossupsHeard.get((team, category), 0)
+            rows.append(stat.row(team))
+        return rankRows(rows, [row[0] for row in rows], limit)
+
+    def categoryList(self) -> List[Category]:
+        """Gets the names of every category (including combined ones, but not OVERALL), alphabetically."""
+        return sorted(self.categoryNames.name(c) for c in self.categories)
 
     def statsToHTML(self, name: str) -> str:
         """Generates an HTML page showing statistics for this tournament.
@@ -282,12 +385,111 @@ class Tournament:
         Returns:
             str: The HTML
         """
-        # cat stats
-        html = '<h1 id="bycat">Best players in each category</h1>'
-        html += '(<a href="#byplayer">jump to best categories for each player</a>)<br /><br/>'
-        html += '<br/>$$catstats-navigation$$<hr/>'
-        catstatsLinks = []
+        return "".join(self.iterStatsHTML(name))
+
+    def writeStatsHTML(self, name: str, out: TextIO, clientSide: bool = False) -> int:
+        """Writes the statistics page (see statsToHTML) to a file as it's generated.
+
+        Args:
+            name (str): the name of the tournament, e.g. "ACF Summer 1926 @ U of Q"
+            out (TextIO): where to write the page
+            clientSide (bool): see iterStatsHTML
+        Returns:
+            int: the number of characters written
+        """
+        return writeChunks(self.iterStatsHTML(name, clientSide), out)
+
+    def iterStatsHTML(self, name: str, clientSide: bool = False) -> Iterator[str]:
+        """Generates the statistics page (see statsToHTML) a piece at a time.
+
+        Args:
+            name (str): the name of the tournament, e.g. "ACF Summer 1926 @ U of Q"
+            clientSide (bool): if True, the best players in each category and best categories
+                for each player aren't rendered here; instead, the page has statsData() in it,
+                and stats.js renders those tables in the browser
+        Yields:
+            str: pieces of the HTML, in order
+        """
+        # work out which categories have tables first, so the navigation can go above them
+        categoryTables, layout = self._categoryTables(1 if clientSide else None)
+        catstatsNavigation = self._categoryNavigation(layout, lambda category: f"#{toID(category)}")
+        players, catstatsNavigation2 = self._playerNavigation(lambda playerName: f"#{toID(playerName)}")
+
+        yield from renderTemplate("template.html", pageValues(
+            name, self._iterStatsBody(
+                categoryTables, catstatsNavigation, players, catstatsNavigation2, self.statsData(name) if clientSide else None,
+            ),
+        ))
+
+    def statsData(self, name: str) -> Dict[str, object]:
+        """Gets every player's stats in each category as compact data that can be saved as JSON.
+
+        Rather than being laid out as tables, the stats are in columns (see
+        STATS_DATA_COLUMNS) with one entry per player per category they have stats
+        in, so each number is only in there once. Entries are in the order the
+        players first got stats, and then in category order, which is the order
+        ties are listed in on the stats page.
+
+        Args:
+            name (str): the name of the tournament, e.g. "ACF Summer 1926 @ U of Q"
+        Returns:
+            Dict[str, object]: "tournament"; "categories" (OVERALL, then the rest alphabetically);
+                "tables" (the indexes of the categories with tables on the stats page, in page order);
+                "teams"; "players" (the tournament's players grouped by team, then anyone else with stats);
+                "playerTeams" (each player's index in "teams", or None); "listedPlayers" (how many of "players"
+                are listed on the stats page); and "cells" (each column, with players and categories as indexes)
+        """
+        categoryTables, _ = self._categoryTables(1)
+        categories = self._playerCategories()
+        categoryIndex = {category: i for i, category in enumerate(categories)}
+        teamOrder, teamPlayers = self._playersByTeam()
+        teams = [team for team in teamOrder if team is not None]
+        teamIndex = {team: i for i, team in enumerate(teams)}
+        players = [player for team in teamOrder for player in teamPlayers[team]]
+        listedPlayers = len(players)
+        players += [player for player in self.stats.players() if player not in self.players]
+        playerIndex = {player: i for i, player in enumerate(players)}
+
+        cells: Dict[str, List[int]] = {column: [] for column in STATS_DATA_COLUMNS}
+        for player in self.stats.players():
+            stats = self.stats.playerStats(player)
+            for category in sorted(stats, key=categoryIndex.__getitem__):
+                stat = stats[category]
+                cells["player"].append(playerIndex[player])
+                cells["category"].append(categoryIndex[category])
+                for column in STATS_DATA_COLUMNS[2:]:
+                    cells[column].append(getattr(stat, column))
+        return {
+            "tournament": name,
+            "categories": [self.categoryNames.name(category) for category in categories],
+            "tables": [categoryIndex[self.categoryNames.intern(category)] for category, _ in categoryTables],
+            "teams": [self.teamNames.name(team) for team in teams],
+            "players": [self.playerNames.name(player) for player in players],
+            "playerTeams": [teamIndex.get(self.playerTeams.get(player, -1)) for player in players],
+            "listedPlayers": listedPlayers,
+            "cells": cells,
+        }
+
+    def writeStatsJSON(self, name: str, out: TextIO) -> None:
+        """Saves statsData() as compact JSON.
+
+        Args:
+            name (str): the name of the tournament, e.g. "ACF Summer 1926 @ U of Q"
+            out (TextIO): where to write the JSON
+        """
+        json.dump(self.statsData(name), out, separators=(",", ":"))
+
+    def _categoryTables(self, limit: Optional[int] = None) -> Tuple[List[Tuple[Category, List[StatRow]]], List[str]]:
+        """Gets the stats table of each category that has one, in the order they go on the stats page.
+
+        Args:
+            limit (Optional[int]): only get this many of the top lines of each table; None means all of them
 
+        Returns:
+            Tuple[List[Tuple[Category, List[StatRow]]], List[str]]: (category, table) for each
+                category, and the layout of the category navigation: those categories, with the
+                names of the groups of them (starting with "_") in between
+        """
         # this is a little hacky but it means the "bigger" cats are first
         # things with underscores represent the start of a new line
         toListFirst = ["Overall"] + [x[0] for x in BIG_CATEGORIES]
@@ -296,201 +498,432 @@ class Tournament:
             toListFirst += constituents
         toListFirst.append("_Other")
 
-        for category in toListFirst + list(self.categories - set(toListFirst)):
+        layout = []
+        categoryTables: List[Tuple[Category, List[StatRow]]] = []
+        for category in toListFirst + sorted(set(self.categoryList()) - set(toListFirst)):
             if category[0] == "_":
-                catstatsLinks.append(f'<br /><hr/><b><i>{category[1:]}</i></b>:<br/>')
+                layout.append(category)
+                continue
+            categoryId = self.categoryNames.get(category)
+            if categoryId is None:
+                continue
+            rows = self.stats.categoryRows(categoryId, limit)
+            if len(rows) == 0:
                 continue
-            curHTML = ""
-            curHTML += f'<h2 id="{toID(category)}">{category} '
-            curHTML += '<small><small><small><a href="#bycat">&#x21A9;</a></small></small></small></h2>'
-            curHTML += '<table data-sortable class="sortable-theme-bootstrap">'
-            curHTML += f"""<thead><tr>
+            layout.append(category)
+            categoryTables.append((category, rows))
+        return categoryTables, layout
+
+    @staticmethod
+    def _categoryNavigation(layout: List[str], href: Callable[[Category], str]) -> str:
+        """Makes the links to each category's table (see _categoryTables)."""
+        return " | ".join(
+            f'<br /><hr/><b><i>{category[1:]}</i></b>:<br/>' if category[0] == "_"
+            else f'<a href="{href(category)}">{category}</a>'
+            for category in layout
+        ).replace("/> | ", "/> ").replace("| <br", "<br")
+
+    def _playersByTeam(self) -> Tuple[List[Optional[TeamID]], Dict[Optional[TeamID], List[PlayerID]]]:
+        """Gets the order teams are listed in (None, for players without one, last), and each team's players."""
+        teamPlayers: Dict[Optional[TeamID], List[PlayerID]] = {}
+        for player in self.players:
+            teamPlayers.setdefault(self.playerTeams.get(player), []).append(player)
+        return sorted(teamPlayers, key=lambda team: (team is None, team or 0)), teamPlayers
+
+    def _playerNavigation(self, href: Callable[[str], str]) -> Tuple[List[PlayerID], str]:
+        """Gets every player, team by team, and links to each of them (with a line per team)."""
+        teamOrder, teamPlayers = self._playersByTeam()
+        players = [player for team in teamOrder for player in teamPlayers[team]]
+        navigation = "<br/>".join(
+            f'<b><i>{"Other" if team is None else self.teamNames.name(team)}</i></b>: ' + " | ".join(
+                f'<a href="{href(playerName)}">{playerName}</a>'
+                for playerName in (self.playerNames.name(player) for player in teamPlayers[team])
+            )
+            for team in teamOrder
+        )
+        return players, navigation
+
+    def _iterStatsBody(
+        self, categoryTables: List[Tuple[Category, List[StatRow]]],
+        catstatsNavigation: str, players: List[PlayerID], catstatsNavigation2: str,
+        data: Optional[Dict[str, object]] = None
+    ) -> Iterator[str]:
+        # cat stats
+        yield '<h1 id="bycat">Best players in each category</h1>'
+        bonusLink = ' | <a href="#bonuses">jump to bonus conversion</a>' if len(self.bonuses.byTeam) > 0 else ""
+        yield f'(<a href="#byplayer">jump to best categories for each player</a> | <a href="#byteam">jump to teams</a>{bonusLink})<br /><br/>'
+        yield f'<br/>{catstatsNavigation}<hr/>'
+
+        if data is None:
+            for category, rows in categoryTables:
+                yield from self._iterCategoryTable(category, rows, "#bycat")
+        else:
+            yield '<div id="bycat-tables"></div>'
+
+        yield '<h1 id="byplayer">Best categories for each player</h1>'
+        yield f'(<a href="#bycat">jump to best players in each category</a>)<br/><br/>{catstatsNavigation2}'
+        if data is None:
+            playerCategories = self._playerCategories()
+            for player in players:
+                yield from self._iterPlayerTable(player, playerCategories, "#byplayer")
+        else:
+            yield '<div id="byplayer-tables"></div>'
+        yield from self._iterTeams([category for category, _ in categoryTables])
+        yield from self._iterBonuses()
+        if data is not None:
+            # "</" can't appear inside a <script>, so it's escaped (which JSON allows)
+            dataJSON = json.dumps(data, separators=(",", ":")).replace("</", "<\\/")
+            yield f'<script type="application/json" id="stats-data">{dataJSON}</script>'
+            yield "<script>"
+            yield from renderTemplate("stats.js", {})
+            yield "</script>"
+
+    def _iterCategoryTable(self, category: Category, rows: List[StatRow], up: str) -> Iterator[str]:
+        """Generates the table of the best players in a category; `up` is where its heading links back to."""
+        yield f'<h2 id="{toID(category)}">{category} '
+        yield f'<small><small><small><a href="{up}">&#x21A9;</a></small></small></small></h2>'
+        yield '<table data-sortable class="sortable-theme-bootstrap">'
+        yield f"""<thead><tr>
                 <th>Player</th>
                 <th>{category} points/20 TUs</th>
                 <th>+10</th>
                 <th>-5</th>
                 <th>Average buzz position</th></thead>"""
-            playerStats: List[Tuple[
-                Player,
-                str, # PPTUH
-                int, # Powers
-                int, # gets
-                int, # Negs
-                str, # avg buzz position
-            ]] = []
-            # hack
-            for player in self.playerStatsByCategory:
-                cat: Optional[PlayerCatStat] = None
-                if category in self.playerStatsByCategory[player]:
-                    cat = self.playerStatsByCategory[player][category]
-                elif category == "Overall":
-                    cat = self.overallPlayerStats[player]
-                    earliestPosition = min(cat.buzzPositions or [1000000])
-                if cat is None:
-                    continue
-
-                pptuh = "0"
-                if cat.tossupsHeard != 0:
-                    pptuh = str(round((cat.points / cat.tossupsHeard)*20, 2))
-                powers = cat.powers
-                tens = cat.tens
-                negs = cat.negs
-                #aggression = "n/a"
-                
-                avgBuzzPosition = "n/a"
-                if len(cat.buzzPositions) > 0:
-                    avgBuzzPosition = str(round(sum(cat.buzzPositions) / len(cat.buzzPositions), 2))
-                 #   aggression = str(round((cat.powers + cat.negs)/len(cat.buzzPositions), 3))
-                playerStats.append((player, pptuh, powers, tens, negs, avgBuzzPosition))
-            # sort by PPG initially
-            playerStats.sort(key=lambda x: float(x[1]), reverse=True)
-            if len(playerStats) == 0:
-                continue
-
-            for stat in playerStats:
-                curHTML += f"""<tr>
-                    <td>{stat[0]}</td>
-                    <td>{stat[1]}</td>
-                    <td>{stat[3]}</td>
-                    <td>{stat[4]}</td>
-                    <td>{stat[5]}</td>
-                </tr>"""
-            curHTML += "</table>"
-
-            catstatsLinks.append(f'<a href="#{toID(category)}">{category}</a>')
-            html += curHTML
-
-
-        html += '<h1 id="byplayer">Best categories for each player</h1>'
-        html += '(<a href="#bycat">jump to best players in each category</a>)<br/><br/>$$catstats-navigation2$$'
-        catstatsLinks2 = []
-        for player in self.players.keys():
-            catstatsLinks2.append(f'<a href="#{toID(player)}">{player}</a>')
-            html += f'<h2 id="{toID(player)}">{player} '
-            html += '<small><small><small><a href="#byplayer">&#x21A9;</a></small></small></small></h2>'
-
-            html += '<table data-sortable class="sortable-theme-bootstrap">'
-            html += f"""<thead><tr>
+        yield from statRowsToHTML(rows, self.playerNames)
+        yield "</table>"
+
+    def _playerCategories(self) -> List[CategoryID]:
+        """Gets the categories that go in each player's table, in order."""
+        # show "synthetic" cats first
+        return [self.categoryNames.intern(OVERALL)] + sorted(self.categories, key=self.categoryNames.name)
+
+    def _iterPlayerTable(self, player: PlayerID, playerCategories: List[CategoryID], up: str) -> Iterator[str]:
+        """Generates the table of a player's best categories; `up` is where its heading links back to."""
+        playerName = self.playerNames.name(player)
+        yield f'<h2 id="{toID(playerName)}">{playerName} '
+        yield f'<small><small><small><a href="{up}">&#x21A9;</a></small></small></small></h2>'
+
+        yield '<table data-sortable class="sortable-theme-bootstrap">'
+        yield f"""<thead><tr>
                 <th>Category</th>
                 <th>points/20 TUs</th>
                 <th>+10</th>
                 <th>-5</th>
                 <th>Average buzz position</th></thead>"""
-            categoryStats: List[Tuple[
-                Category,
-                str, # PPTUH
-                int, # Powers
-                int, # gets
-                int, # Negs
-                str, # avg buzz position
-            ]] = []
-
-            # show "synthetic" cats first
-            for category in ["Overall"] + list(self.categories):
-                cat = None
-                if player in self.playerStatsByCategory and category in self.playerStatsByCategory[player]:
-                    cat = self.playerStatsByCategory[player][category]
-                elif category == "Overall" and player in self.overallPlayerStats:
-                    cat = self.overallPlayerStats[player]
-                if cat is None:
+        yield from statRowsToHTML(self.stats.playerRows(player, playerCategories), self.categoryNames)
+        yield "</table>"
+
+    def _iterTeams(self, categories: List[Category]) -> Iterator[str]:
+        """Generates a table of the teams in each category."""
+        yield '<h1 id="byteam">Teams in each category</h1>'
+        yield "Each team's points, powers, tens and negs are its players' added together; tossups heard are the team's.<br/>"
+        for category in categories:
+            yield from self._iterTeamTable(category, "#byteam")
+
+    def _iterTeamTable(self, category: Category, up: str) -> Iterator[str]:
+        """Generates the table of the teams in a category (if any have stats in it); `up` is where its heading links back to."""
+        rows = self._teamRows(self.categoryNames.intern(category))
+        if len(rows) == 0:
+            return
+        yield f'<h2 id="team-{toID(category)}">{category} '
+        yield f'<small><small><small><a href="{up}">&#x21A9;</a></small></small></small></h2>'
+        yield '<table data-sortable class="sortable-theme-bootstrap">'
+        yield f"""<thead><tr>
+                <th>Team</th>
+                <th>{category} points/20 TUs</th>
+                <th>+10</th>
+                <th>-5</th>
+                <th>Average buzz position</th></thead>"""
+        for row in rows:
+            stat = formatRow(row, self.teamNames)
+            yield f"<tr><td>{stat[0]}</td><td>{stat[1]}</td><td>{stat[3]}</td><td>{stat[4]}</td><td>{stat[5]}</td></tr>"
+        yield "</table>"
+
+    def _iterBonuses(self) -> Iterator[str]:
+        """Generates tables of bonus conversion, in each category and for each team."""
+        if len(self.bonuses.byTeam) == 0:
+            return
+        yield '<h1 id="bonuses">Bonus conversion</h1>'
+        yield "Points per bonus heard, and how many of the easy, medium, and hard parts were converted.<br/>"
+        overall = self.categoryNames.intern(OVERALL)
+        categories = [overall] + sorted((c for c in self.bonuses.byCategory if c != overall), key=self.categoryNames.name)
+        teams = sorted(self.bonuses.byTeam, key=lambda t: (-round(self.bonuses.byTeam[t].ppb() or 0, 2), t))
+        sections = [
+            ("Category", self.categoryNames, [(c, self.bonuses.byCategory.get(c)) for c in categories]),
+            ("Team", self.teamNames, [(t, self.bonuses.byTeam.get(t)) for t in teams]),
+        ]
+        difficultyHeaders = "".join(f"<th>{d.upper()}%</th>" for d in DIFFICULTIES)
+        for label, names, rows in sections:
+            yield f"<h2>By {label.lower()}</h2>"
+            yield '<table data-sortable class="sortable-theme-bootstrap">'
+            yield f"""<thead><tr>
+                <th>{label}</th>
+                <th>Bonuses heard</th>
+                <th>PPB</th>
+                {difficultyHeaders}</tr></thead>"""
+            for id, counts in rows:
+                if counts is None:
                     continue
+                conversions = (counts.conversion(d) for d in range(len(DIFFICULTIES)))
+                percentages = "".join(f"<td>{'n/a' if c is None else round(100 * c, 1)}</td>" for c in conversions)
+                yield f"<tr><td>{names.name(id)}</td><td>{counts.heard}</td><td>{round(counts.ppb() or 0, 2)}</td>{percentages}</tr>"
+            yield "</table>"
 
-                ppg = "0"
-                if cat.tossupsHeard != 0:
-                    # print(f"{player} in {category}: {cat.points} pts in {cat.tossupsHeard} TUs")
-                    ppg = str(round((cat.points / cat.tossupsHeard)*20, 2))
-                powers = cat.powers
-                negs = cat.negs
-                avgBuzzPosition = "n/a"
-               # aggression = "n/a"
-                if len(cat.buzzPositions) > 0:
-                    avgBuzzPosition = str(round(sum(cat.buzzPositions) / len(cat.buzzPositions), 2))
-                    aggression = str(round((cat.powers + cat.negs)/len(cat.buzzPositions), 3))
-
-                categoryStats.append((category, ppg, powers, cat.tens, negs, avgBuzzPosition))
-            # sort by PPG initially
-            categoryStats.sort(key=lambda x: float(x[1]), reverse=True)
-
-            for stat in categoryStats:
-                html += f"""<tr>
-                    <td>{stat[0]}</td>
-                    <td>{stat[1]}</td>
-                    <td>{stat[3]}</td>
-                    <td>{stat[4]}</td>
-                    <td>{stat[5]}</td>
-                </tr>"""
-            html += "</table>"
-
-
-        # directory with qbjtool.py, and thus template.html, in it
-        qbjtoolPyDir = path.dirname(path.realpath(__file__))
-        TEMPLATE = open(path.join(qbjtoolPyDir, "template.html")).read()
-        return TEMPLATE \
-            .replace("$$gen_date$$", datetime.today().strftime('%m/%d/%Y')) \
-            .replace("$$tour_name$$", name) \
-            .replace("$$html$$", html) \
-            .replace("$$catstats-navigation$$", " | ".join(catstatsLinks)
-                     .replace("/> | ", "/> ")
-                     .replace("| <br", "<br")
-                     ) \
-            .replace("$$catstats-navigation2$$", " | ".join(catstatsLinks2))
-
-    def buzzpointsToHTML(self, name: str, n: int) -> str:
+    def buzzpointsToHTML(self, name: str, n: int, fragments: Optional[FragmentCache] = None) -> str:
         """Generates an HTML page showing where people buzzed on each question.
 
         Args:
             name (str): the name of the tournament, e.g. "ACF Summer 1926 @ U of Q"
             n (int): the number of buzzes to show per player
+            fragments (Optional[FragmentCache]): where to reuse each tossup's HTML from (see iterBuzzpointsHTML)
         Returns:
             str: The HTML
         """
-        html = f'<center><h1>Buzzpoints</h1>'
-        html += '<br/>$$navigation$$<hr/></center>'
-        links = []
-
-        tossupToBuzz: Dict[str, List[Buzz]] = {}
-        tossups = sorted(self.tossups, key= lambda x: toID(x.answer))
-        for tu in tossups:
-            str_rep = tu.text + "<br />ANSWER: " + tu.answer
-            if str_rep not in tossupToBuzz:
-                tossupToBuzz[str_rep] = []
+        return "".join(self.iterBuzzpointsHTML(name, n, fragments))
+
+    def writeBuzzpointsHTML(self, name: str, n: int, out: TextIO, fragments: Optional[FragmentCache] = None) -> int:
+        """Writes the buzzpoints page (see buzzpointsToHTML) to a file as it's generated.
+
+        Args:
+            name (str): the name of the tournament, e.g. "ACF Summer 1926 @ U of Q"
+            n (int): the number of buzzes to show per player
+            out (TextIO): where to write the page
+            fragments (Optional[FragmentCache]): where to reuse each tossup's HTML from (see iterBuzzpointsHTML)
+        Returns:
+            int: the number of characters written
+        """
+        return writeChunks(self.iterBuzzpointsHTML(name, n, fragments), out)
+
+    def iterBuzzpointsHTML(self, name: str, n: int, fragments: Optional[FragmentCache] = None) -> Iterator[str]:
+        """Generates the buzzpoints page (see buzzpointsToHTML) a piece at a time.
+
+        Args:
+            name (str): the name of the tournament, e.g. "ACF Summer 1926 @ U of Q"
+            n (int): the number of buzzes to show per player
+            fragments (Optional[FragmentCache]): if set, each tossup's HTML is looked up here (by its
+                text and the buzzes on it) and only rendered if it isn't there
+        Yields:
+            str: pieces of the HTML, in order
+        """
+        buzzesByQuestion = self.buzzesByQuestion()
+        questions = sorted(self.questions.values(), key=lambda q: (q.sortKey, q.id))
+        navigation = self._questionNavigation(questions)
+
+        yield from renderTemplate("buzzpts_template.html", pageValues(
+            name, self._iterBuzzpointsBody(questions, buzzesByQuestion, navigation, fragments),
+        ))
+
+    def buzzesByQuestion(self) -> List[List[Buzz]]:
+        """Gets every buzz on each tossup, by TossupText ID."""
+        buzzesByQuestion: List[List[Buzz]] = [[] for _ in self.questions]
+        for tu in self.tossups:
             if tu.correctBuzz is not None:
-                tossupToBuzz[str_rep].append(tu.correctBuzz)
+                buzzesByQuestion[tu.question.id].append(tu.correctBuzz)
             if tu.incorrectBuzz is not None:
-                tossupToBuzz[str_rep].append(tu.incorrectBuzz)
+                buzzesByQuestion[tu.question.id].append(tu.incorrectBuzz)
+        return buzzesByQuestion
+
+    @staticmethod
+    def _questionNavigation(questions: List[TossupText]) -> str:
+        return " | ".join(f"<a href='#{q.slug}'>{q.answerline.strip()}</a>" for q in questions)
+
+    def _iterBuzzpointsBody(
+        self, questions: List[TossupText], buzzesByQuestion: List[List[Buzz]], navigation: str,
+        fragments: Optional[FragmentCache] = None
+    ) -> Iterator[str]:
+        yield f'<center><h1>Buzzpoints</h1>'
+        yield "(<a href='#distributions'>jump to where players buzz</a>)<br/>"
+        yield f'<br/>{navigation}<hr/></center>'
+
+        for question in questions:
+            if fragments is None:
+                yield self._questionBuzzesToHTML(question, buzzesByQuestion[question.id])
+                continue
+            buzzes = sorted(buzzesByQuestion[question.id], key=lambda b: b.position)
+            # player names rather than IDs, since IDs depend on the order QBJs were loaded in
+            key = fragmentKey(
+                "buzzpoints", question.text, question.answer,
+                [(b.position, b.points, self.playerNames.name(b.player)) for b in buzzes],
+            )
+            yield fragments.get(key, lambda: self._questionBuzzesToHTML(question, buzzes))
+        yield from self._iterDistributions()
 
+    def _questionBuzzesToHTML(self, question: TossupText, buzzes: List[Buzz]) -> str:
+        """Shows where each buzz on a tossup was in its text."""
         # from https://geopard.tools/accessible-color-palette-generator/
         COLORS = [
             "#80E3C6", "#80CEE3", "#809DE3", "#9580E3",
             "#C680E3", "#E380CE", "#E3809D", "#E39580", "#E3C680"
         ]
         NUM_COLORS = len(COLORS)
-        for tu, buzzes in tossupToBuzz.items():
-            formatted_tu_chunks = tu.split(' ')
-            al = tu.split('ANSWER: ')[1].split('[')[0].split('(')[0]
-            legend = []
-            for i, buzz in enumerate(sorted(buzzes, key=lambda b: b.position)):
-                color = COLORS[i % NUM_COLORS]
-                if formatted_tu_chunks[buzz.position].startswith("<div "):
-                    sign = "+" if buzz.points > 0 else '-'
-                    formatted_tu_chunks[buzz.position] += f'  <small><small>{sign}{buzz.points} {buzz.player}</small></small>'
-                else:
-                    if buzz.points < 0:
-                        color += '; color: red;font-weight:bold'
-                    formatted_tu_chunks[buzz.position] = f"<span style='background-color:{color}'>{formatted_tu_chunks[buzz.position] }</span>"
-                    word = "powered" if buzz.points > 10 else ("negged" if buzz.points < 0 else "buzzed")
-                    legend.append(f"<li><span style='background-color:{color}'>{buzz.player} {word}</span></li>")
-            html += f"""<div id={toID(al)} style='display:flex;flex-direction:row;'>
+        formatted_tu_chunks = list(question.words)
+        legend = []
+        for i, buzz in enumerate(sorted(buzzes, key=lambda b: b.position)):
+            color = COLORS[i % NUM_COLORS]
+            if formatted_tu_chunks[buzz.position].startswith("<div "):
+                sign = "+" if buzz.points > 0 else '-'
+                formatted_tu_chunks[buzz.position] += f'  <small><small>{sign}{buzz.points} {self.playerNames.name(buzz.player)}</small></small>'
+            else:
+                if buzz.points < 0:
+                    color += '; color: red;font-weight:bold'
+                formatted_tu_chunks[buzz.position] = f"<span style='background-color:{color}'>{formatted_tu_chunks[buzz.position] }</span>"
+                word = "powered" if buzz.points > 10 else ("negged" if buzz.points < 0 else "buzzed")
+                legend.append(f"<li><span style='background-color:{color}'>{self.playerNames.name(buzz.player)} {word}</span></li>")
+        return f"""<div id={question.slug} style='display:flex;flex-direction:row;'>
             <div style='float:left;margin-right:1em;width:80%'>{' '.join(formatted_tu_chunks)}</div>
             <div style='float:right;border-left:1px solid black;width:20%;margin-left:1em;'><ol>{''.join(legend)}</ol></div></div><hr>"""
-            links.append(f"<a href='#{toID(al)}'>{al.strip()}</a>")
-        qbjtoolPyDir = path.dirname(path.realpath(__file__))
-        TEMPLATE = open(path.join(qbjtoolPyDir, "buzzpts_template.html")).read()
-        return TEMPLATE \
-            .replace("$$gen_date$$", datetime.today().strftime('%m/%d/%Y')) \
-            .replace("$$tour_name$$", name) \
-            .replace("$$html$$", html) \
-            .replace("$$navigation$$", " | ".join(links))
 
+    def _iterDistributions(self) -> Iterator[str]:
+        """Generates tables of where players got tossups, in each category and for each player."""
+        yield "<h1 id='distributions'>Where players buzz</h1>"
+        yield "Word indexes of correct buzzes; the percentiles are estimated to within a few words.<br/>"
+        overall = self.categoryNames.intern(OVERALL)
+        categories = [overall] + sorted(self.categories, key=self.categoryNames.name)
+        sections = [
+            ("Category", self.categoryNames, [(c, self.buzzDistributions.byCategory.get(c)) for c in categories]),
+            ("Player", self.playerNames, [(p, self.buzzDistributions.byPlayer.get(p)) for p in self.players]),
+        ]
+        for label, names, histograms in sections:
+            yield f"<h2>By {label.lower()}</h2>"
+            yield from self._iterDistributionTable(label, names, histograms)
+
+    @staticmethod
+    def _iterDistributionTable(
+        label: str, names: SymbolTable, histograms: List[Tuple[int, Optional[PositionHistogram]]]
+    ) -> Iterator[str]:
+        """Generates a table of buzz position distributions (skipping the None ones)."""
+        yield f"""<table><thead><tr>
+                <th>{label}</th>
+                <th>Gets</th>
+                <th>10th percentile</th>
+                <th>Median</th>
+                <th>90th percentile</th>
+                <th>Distribution</th></tr></thead>"""
+        for id, histogram in histograms:
+            if histogram is None:
+                continue
+            percentiles = "".join(f"<td>{round(histogram.quantile(q) or 0, 1)}</td>" for q in (0.1, 0.5, 0.9))
+            yield f"<tr><td>{names.name(id)}</td><td>{histogram.total}</td>{percentiles}<td>{histogram.toHTML()}</td></tr>"
+        yield "</table>"
 
+    def shards(self) -> List[Tuple[str, str]]:
+        """Lists the pages of the sharded output (see iterShardHTML), besides the index.
 
+        Returns:
+            List[Tuple[str, str]]: (kind, name) for each page: "categories" for each category
+                with stats, "players" for each player, and "packets" for each packet
+        """
+        categoryTables, _ = self._categoryTables(1)
+        return (
+            [("categories", category) for category, _ in categoryTables]
+            + [("players", self.playerNames.name(player)) for player in self.players]
+            + [("packets", packet) for packet in self._packetList()]
+        )
+
+    def _packetList(self) -> List[str]:
+        """Gets the name of every packet that was heard, in the order they were first heard."""
+        return list(dict.fromkeys(question.packet for question in self.questions.values()))
+
+    def iterShardIndexHTML(self, name: str) -> Iterator[str]:
+        """Generates the index page of the sharded output a piece at a time.
+
+        The index only has the navigation (linking to the pages listed by shards())
+        and the bonus conversion tables.
+
+        Args:
+            name (str): the name of the tournament, e.g. "ACF Summer 1926 @ U of Q"
+        Yields:
+            str: pieces of the HTML, in order
+        """
+        _, layout = self._categoryTables(1)
+        catstatsNavigation = self._categoryNavigation(layout, lambda category: shardPath("categories", category))
+        _, catstatsNavigation2 = self._playerNavigation(lambda playerName: shardPath("players", playerName))
+        packetNavigation = " | ".join(
+            f'<a href="{shardPath("packets", packet)}">{packet}</a>' for packet in self._packetList()
+        )
+        yield from renderTemplate("template.html", pageValues(
+            name, self._iterShardIndexBody(catstatsNavigation, catstatsNavigation2, packetNavigation),
+        ))
+
+    def _iterShardIndexBody(self, catstatsNavigation: str, catstatsNavigation2: str, packetNavigation: str) -> Iterator[str]:
+        yield '<h1 id="bycat">Best players and teams in each category</h1>'
+        bonusLink = ' | <a href="#bonuses">jump to bonus conversion</a>' if len(self.bonuses.byTeam) > 0 else ""
+        yield f'(<a href="#byplayer">jump to best categories for each player</a> | <a href="#bypacket">jump to buzzpoints</a>{bonusLink})<br /><br/>'
+        yield f'<br/>{catstatsNavigation}<hr/>'
+        yield '<h1 id="byplayer">Best categories for each player</h1>'
+        yield f'{catstatsNavigation2}<hr/>'
+        yield '<h1 id="bypacket">Buzzpoints in each packet</h1>'
+        yield f'{packetNavigation}<hr/>'
+        yield from self._iterBonuses()
+
+    def iterShardHTML(
+        self, name: str, kind: str, shard: str, buzzesByQuestion: Optional[List[List[Buzz]]] = None
+    ) -> Iterator[str]:
+        """Generates one page of the sharded output (see shards()) a piece at a time.
+
+        A category's page has the best players and teams in it, a player's page has
+        their best categories, and a packet's page shows where people buzzed on
+        each of its tossups. Category and player pages also have their line of
+        the "where players buzz" tables.
+
+        Args:
+            name (str): the name of the tournament, e.g. "ACF Summer 1926 @ U of Q"
+            kind (str): "categories", "players", or "packets"
+            shard (str): the name of the category, player, or packet
+            buzzesByQuestion (Optional[List[List[Buzz]]]): the result of buzzesByQuestion(), to save
+                working it out again for each packet when writing lots of them
+
+        Raises:
+            KeyError: if there's no such page
+
+        Returns:
+            Iterator[str]: pieces of the HTML, in order
+        """
+        template = "template.html"
+        if kind == "categories":
+            categoryId = self.categoryNames.get(shard)
+            if categoryId is None:
+                raise KeyError(shard)
+            body = self._iterCategoryShard(shard, categoryId)
+        elif kind == "players":
+            player = self.playerNames.get(shard)
+            if player is None or player not in self.players:
+                raise KeyError(shard)
+            body = self._iterPlayerShard(player)
+        elif kind == "packets":
+            questions = sorted(
+                (q for q in self.questions.values() if q.packet == shard), key=lambda q: (q.sortKey, q.id),
+            )
+            if len(questions) == 0:
+                raise KeyError(shard)
+            if buzzesByQuestion is None:
+                buzzesByQuestion = self.buzzesByQuestion()
+            body = self._iterPacketShard(shard, questions, buzzesByQuestion)
+            template = "buzzpts_template.html"
+        else:
+            raise KeyError(kind)
+        return renderTemplate(template, pageValues(name, body, dated=False))
+
+    def _iterCategoryShard(self, category: Category, categoryId: CategoryID) -> Iterator[str]:
+        yield '(<a href="../index.html#bycat">back to every category</a>)<br/>'
+        yield from self._iterCategoryTable(category, self.stats.categoryRows(categoryId), "../index.html#bycat")
+        yield from self._iterTeamTable(category, "../index.html#bycat")
+        histogram = self.buzzDistributions.byCategory.get(categoryId)
+        if histogram is not None:
+            yield "<h2 id='distributions'>Where players buzz</h2>"
+            yield from self._iterDistributionTable("Category", self.categoryNames, [(categoryId, histogram)])
+
+    def _iterPlayerShard(self, player: PlayerID) -> Iterator[str]:
+        yield '(<a href="../index.html#byplayer">back to every player</a>)<br/>'
+        yield from self._iterPlayerTable(player, self._playerCategories(), "../index.html#byplayer")
+        histogram = self.buzzDistributions.byPlayer.get(player)
+        if histogram is not None:
+            yield "<h2 id='distributions'>Where players buzz</h2>"
+            yield from self._iterDistributionTable("Player", self.playerNames, [(player, histogram)])
+
+    def _iterPacketShard(self, packet: str, questions: List[TossupText], buzzesByQuestion: List[List[Buzz]]) -> Iterator[str]:
+        yield f'<center><h1>Buzzpoints: {packet}</h1>'
+        yield '(<a href="../index.html#bypacket">back to every packet</a>)<br/>'
+        yield f'<br/>{self._questionNavigation(questions)}<hr/></center>'
+        for question in questions:
+            yield self._questionBuzzesToHTML(question, buzzesByQuestion[question.id])
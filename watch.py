@@ -0,0 +1,187 @@
+# This file contains watch mode: QBJtool keeps running, loads QBJs as rooms
+# upload them to a directory, and regenerates the pages shortly afterwards.
+
+import os
+import time
+from os import path
+from typing import Callable, Dict, List, Optional, Set, Tuple
+from diagnostics import Diagnostics
+from ingest import ingestParallel, ingestSerial
+from packets import PacketCache
+from snapshot import Snapshot, ingestWithSnapshot, packetSearch
+from tournament import Tournament
+
+FileSignature = Tuple[int, int]
+"""(size, modification time in nanoseconds) of a file"""
+
+def scanQBJs(directory: str) -> Dict[str, FileSignature]:
+    """Lists the QBJ files in a directory.
+
+    Returns:
+        Dict[str, FileSignature]: the signature of each QBJ, by path, in alphabetical order
+    """
+    found = {}
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.name.endswith(".qbj") and entry.is_file():
+                info = entry.stat()
+                found[entry.path] = (info.st_size, info.st_mtime_ns)
+    return dict(sorted(found.items()))
+
+class QBJWatcher:
+    """Keeps a tournament up to date with the QBJs in a directory."""
+
+    directory: str
+    tournament: Tournament
+
+    snapshot: Optional[Snapshot]
+    """If we're keeping a snapshot, the snapshot of the tournament."""
+    snapshotPath: Optional[str]
+
+    _jobs: int
+    _packets: PacketCache
+    _statsBackend: str
+
+    _attempted: Dict[str, FileSignature]
+    """Every QBJ we've tried to load, and what it looked like when we did."""
+    _loaded: List[str]
+    """The QBJs that are in the tournament, in the order they were loaded."""
+    _failed: Set[str]
+    """The QBJs that couldn't be loaded; they're tried again when they change or new packets turn up."""
+    _pending: Dict[str, FileSignature]
+    """New or changed QBJs, and what they looked like on the last scan; they're loaded once they stop changing."""
+
+    def __init__(
+        self, directory: str, jobs: int, packets: PacketCache,
+        statsBackend: str, snapshotPath: Optional[str] = None
+    ) -> None:
+        """Loads the QBJs that are already in the directory.
+
+        Args:
+            directory (str): the directory to watch for QBJs
+            jobs (int): the number of worker processes to use when (re)loading lots of QBJs
+            packets (PacketCache): where to load packets from
+            statsBackend (str): which stats backend the tournament should use
+            snapshotPath (Optional[str]): if set, where to keep a snapshot of the tournament
+        """
+        self.directory = directory
+        self.snapshotPath = snapshotPath
+        self._jobs = jobs
+        self._packets = packets
+        self._statsBackend = statsBackend
+        self._pending = {}
+
+        existing = scanQBJs(directory)
+        self.snapshot = None
+        if snapshotPath is not None:
+            self.snapshot = ingestWithSnapshot(snapshotPath, list(existing), jobs, packets, statsBackend)
+            self.tournament = self.snapshot.tournament
+            self._loaded = [p for p in existing if path.realpath(p) in self.snapshot.qbjs]
+        else:
+            self.tournament = Tournament(statsBackend)
+            self._loaded = [qbj for qbj, _ in ingestParallel(self.tournament, list(existing), jobs, packets)]
+        self._attempted = existing
+        self._failed = set(existing) - set(self._loaded)
+        for qbjPath in sorted(self._failed):
+            print(f"Warning: couldn't load {qbjPath}; it'll be tried again if it changes or new packets are added")
+
+    def poll(self) -> bool:
+        """Checks the directory, and loads any QBJs that have finished being written.
+
+        QBJs that couldn't be loaded before are tried again if new packets have
+        turned up. If a QBJ that's already in the tournament changes or is
+        deleted, the tournament is rebuilt from scratch.
+
+        Returns:
+            bool: whether the tournament changed
+        """
+        ready = []
+        found = scanQBJs(self.directory)
+        for qbjPath, signature in found.items():
+            if self._attempted.get(qbjPath) == signature:
+                continue
+            if self._pending.get(qbjPath) == signature:
+                # it hasn't changed since the last scan, so it's probably done uploading
+                del self._pending[qbjPath]
+                ready.append(qbjPath)
+                self._attempted[qbjPath] = signature
+                self._failed.discard(qbjPath)
+            else:
+                self._pending[qbjPath] = signature
+        removed = [qbjPath for qbjPath in self._attempted if qbjPath not in found]
+        for qbjPath in removed:
+            del self._attempted[qbjPath]
+            self._failed.discard(qbjPath)
+        for qbjPath in [p for p in self._pending if p not in found]:
+            del self._pending[qbjPath]
+
+        # packets may have been added since the last batch, or since a QBJ couldn't find its packet
+        packetsChanged = False
+        if self._packets.index is not None and (len(ready) > 0 or len(self._failed) > 0):
+            packetsChanged = self._packets.index.scan()
+        retry = sorted(self._failed) if packetsChanged else []
+        if len(ready) == 0 and len(retry) == 0 and not any(qbjPath in self._loaded for qbjPath in removed):
+            return False
+
+        if any(qbjPath in self._loaded for qbjPath in ready + removed):
+            # QBJs can't be taken back out of a tournament, so start over
+            toLoad = [qbjPath for qbjPath in self._loaded if qbjPath not in removed]
+            print(f"A QBJ that was already loaded has changed or been deleted; reloading all {len(toLoad)} QBJs")
+            toLoad += sorted(self._failed) + [qbjPath for qbjPath in ready if qbjPath not in toLoad]
+            self.tournament = Tournament(self._statsBackend)
+            if self.snapshot is not None:
+                self.snapshot = Snapshot(self.tournament, packetSearch(self._packets))
+            loaded = ingestParallel(self.tournament, toLoad, self._jobs, self._packets)
+            self._loaded = []
+        else:
+            toLoad = retry + ready
+            if len(retry) > 0:
+                # the failed QBJs record their problems again as they're retried
+                self.tournament.loadDiagnostics = Diagnostics()
+            loaded = ingestSerial(self.tournament, toLoad, self._packets)
+        self._loaded += [qbj for qbj, _ in loaded]
+        if self.snapshot is not None:
+            self.snapshot.record(toLoad, loaded)
+        for qbjPath in toLoad:
+            if qbjPath in self._loaded:
+                self._failed.discard(qbjPath)
+            elif qbjPath not in self._failed:
+                self._failed.add(qbjPath)
+                print(f"Warning: couldn't load {qbjPath}; it'll be tried again if it changes or new packets are added")
+        return len(loaded) > 0 or len(removed) > 0
+
+    def run(
+        self, regenerate: Callable[[Tournament], None],
+        interval: float = 0.5, debounce: float = 0.5, maxDelay: float = 5.0
+    ) -> None:
+        """Watches the directory until interrupted (e.g. with Ctrl+C).
+
+        Args:
+            regenerate (Callable[[Tournament], None]): writes out the pages for the tournament
+            interval (float): how often to check the directory, in seconds
+            debounce (float): how long to wait for more QBJs after one is loaded before regenerating, in seconds
+            maxDelay (float): regenerate at least this often while QBJs keep coming in, in seconds
+        """
+        regenerate(self.tournament)
+        print(f"Watching {self.directory} for QBJs (press Ctrl+C to stop)")
+        firstChange: Optional[float] = None
+        lastChange = 0.0
+        try:
+            while True:
+                time.sleep(interval)
+                now = time.monotonic()
+                if self.poll():
+                    lastChange = now
+                    if firstChange is None:
+                        firstChange = now
+                if firstChange is not None and (now - lastChange >= debounce or now - firstChange >= maxDelay):
+                    self._regenerate(regenerate)
+                    firstChange = None
+        except KeyboardInterrupt:
+            if firstChange is not None:
+                self._regenerate(regenerate)
+
+    def _regenerate(self, regenerate: Callable[[Tournament], None]) -> None:
+        regenerate(self.tournament)
+        if self.snapshot is not None and self.snapshotPath is not None:
+            self.snapshot.save(self.snapshotPath)